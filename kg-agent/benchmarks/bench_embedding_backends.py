@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+嵌入推理后端基准: 吞吐量与相对 fp32 模型的精度
+
+用法:
+    python benchmarks/bench_embedding_backends.py [--backends torch,int8,onnx] [--sample texts.txt]
+        [--size 512] [--batch-size 32] [--threads 0] [--onnx-path model.onnx]
+
+--sample 为每行一条文本的样本文件, 不指定时生成中英文混排的合成文本。
+精度以 torch (fp32) 输出为参考: 逐条余弦相似度的均值/最小值, 以及样本内 top-10 近邻的重合率。
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src/backend'))
+
+from app.config import get_settings
+from app.services.embedding_backends import BACKENDS, compare_embeddings, load_model
+
+settings = get_settings()
+
+SENTENCES = [
+    "知识图谱以实体和关系的形式组织领域知识。",
+    "检索增强生成将外部知识注入大模型的上下文。",
+    "向量检索负责召回语义相近的文本片段。",
+    "The ingestion pipeline extracts, chunks and indexes documents.",
+    "Embeddings are written to Milvus while full text goes to Elasticsearch.",
+    "Entities and relations are stored in NebulaGraph for multi-hop queries.",
+]
+
+
+def synthetic_texts(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(SENTENCES) for _ in range(rng.randint(1, 12))) for _ in range(count)]
+
+
+def bench(model, texts, batch_size: int):
+    model.encode(texts[:batch_size], batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+    started = time.perf_counter()
+    embeddings = model.encode(texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+    return embeddings, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="逗号分隔的后端列表")
+    parser.add_argument("--sample", help="每行一条文本的样本文件")
+    parser.add_argument("--size", type=int, default=512, help="合成样本条数")
+    parser.add_argument("--batch-size", type=int, default=settings.EMBEDDING_BATCH_SIZE)
+    parser.add_argument("--threads", type=int, default=settings.EMBEDDING_NUM_THREADS, help="CPU 推理线程数")
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL_PATH)
+    parser.add_argument("--onnx-path", default=settings.EMBEDDING_ONNX_PATH)
+    args = parser.parse_args()
+
+    if args.sample:
+        with open(args.sample, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        texts = synthetic_texts(args.size)
+
+    print(f"model: {args.model}, {len(texts)} texts, batch_size={args.batch_size}, threads={args.threads or 'default'}")
+    reference, elapsed = bench(load_model("torch", args.model, num_threads=args.threads), texts, args.batch_size)
+    print(f"{'torch':<8} {len(texts) / elapsed:>9.1f} texts/s  (fp32 reference)")
+
+    for backend in args.backends.split(","):
+        if backend == "torch":
+            continue
+        try:
+            model = load_model(backend, args.model, onnx_path=args.onnx_path, num_threads=args.threads)
+        except Exception as e:
+            print(f"{backend:<8} skipped ({e})")
+            continue
+        embeddings, backend_elapsed = bench(model, texts, args.batch_size)
+        accuracy = compare_embeddings(reference, embeddings)
+        print(
+            f"{backend:<8} {len(texts) / backend_elapsed:>9.1f} texts/s  x{elapsed / backend_elapsed:.2f}  "
+            f"cosine mean {accuracy['mean_cosine']:.4f} min {accuracy['min_cosine']:.4f}  "
+            f"top-10 overlap {accuracy['neighbour_overlap']:.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
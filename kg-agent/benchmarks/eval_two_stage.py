@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+两阶段检索评估: 以全部分块上的精确检索为基准, 报告不同候选文档数/候选分块数下的 recall@k 与检索延迟
+
+用法:
+    python benchmarks/eval_two_stage.py [--vectors chunks.npy --doc-ids doc_ids.npy]
+        [--docs 20000] [--chunks-per-doc 50] [--queries 200] [--top-k 10]
+        [--index flat|hnsw] [--doc-candidates 10,20,50,100,200] [--chunk-candidates 0,50]
+
+数据来源: --vectors 为 (n, dim) 的分块向量, --doc-ids 为长度 n 的所属文档; 都不指定时生成合成数据,
+每个文档的分块围绕文档主题分布, 主题之间再有聚类结构。查询向量为抽样分块加噪声。
+分块与文档向量 (分块向量均值) 分别写入两个进程内索引 (见 app.infrastructure.local_vector),
+第一行为直接检索全部分块的基线, 其余为两阶段检索 (第二阶段以 doc_id 过滤条件只检索候选文档的分块)。
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src/backend'))
+
+from app.config import get_settings
+from app.infrastructure.local_vector import LocalVectorIndex
+from app.utils.search_filters import FieldFilter
+from app.utils.vector_eval import exact_top_k, normalize_rows
+from helpers import int_list, measure, sample_queries
+
+settings = get_settings()
+
+
+def synthetic_documents(docs: int, chunks_per_doc: int, dim: int, topics: int = 256, seed: int = 42):
+    rng = np.random.RandomState(seed)
+    centers = rng.normal(size=(topics, dim)).astype(np.float32)
+    doc_topics = normalize_rows(centers[rng.randint(topics, size=docs)] + 0.5 * rng.normal(size=(docs, dim)).astype(np.float32))
+    doc_ids = np.repeat(np.arange(docs), chunks_per_doc)
+    vectors = doc_topics[doc_ids] + rng.normal(size=(len(doc_ids), dim)).astype(np.float32) / np.sqrt(dim)
+    return normalize_rows(vectors), doc_ids
+
+
+def document_centroids(vectors: np.ndarray, doc_ids: np.ndarray):
+    docs, inverse = np.unique(doc_ids, return_inverse=True)
+    sums = np.zeros((len(docs), vectors.shape[1]), dtype=np.float64)
+    np.add.at(sums, inverse, vectors)
+    return docs, (sums / np.bincount(inverse)[:, None]).astype(np.float32)
+
+
+def build_index(base_dir: str, vectors: np.ndarray, doc_ids: np.ndarray, index_type: str) -> LocalVectorIndex:
+    index = LocalVectorIndex(base_dir, vectors.shape[1], index_type=index_type)
+    order = np.argsort(doc_ids, kind="stable")
+    boundaries = np.flatnonzero(np.diff(doc_ids[order])) + 1
+    items = []
+    for rows in np.split(order, boundaries):
+        items.append((str(doc_ids[rows[0]]), [{"index": int(r), "content": ""} for r in rows], vectors[rows], None))
+        if len(items) >= 1000:
+            index.insert_batch(items)
+            items = []
+    if items:
+        index.insert_batch(items)
+    index.warmup()
+    return index
+
+
+def report(stage1: str, stage2: str, recall: float, p50: float, p95: float):
+    print(f"{stage1:<12} {stage2:<12} {recall:>8.4f} {p50:>9.2f} {p95:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", help="(n, dim) 的分块向量 .npy 文件")
+    parser.add_argument("--doc-ids", help="长度为 n 的分块所属文档 .npy 文件")
+    parser.add_argument("--docs", type=int, default=20000, help="合成数据的文档数")
+    parser.add_argument("--chunks-per-doc", type=int, default=50)
+    parser.add_argument("--dim", type=int, default=settings.MILVUS_DIMENSION)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--index", default="flat", choices=["flat", "hnsw"], help="两个索引使用的本地索引类型")
+    parser.add_argument("--doc-candidates", type=int_list, default=[10, 20, 50, 100, 200])
+    parser.add_argument("--chunk-candidates", type=int_list, default=[0, 50], help="0 表示取 top_k")
+    args = parser.parse_args()
+
+    if args.vectors:
+        if not args.doc_ids:
+            parser.error("--vectors requires --doc-ids")
+        corpus = normalize_rows(np.load(args.vectors))
+        doc_ids = np.load(args.doc_ids)
+    else:
+        corpus, doc_ids = synthetic_documents(args.docs, args.chunks_per_doc, args.dim)
+    docs, centroids = document_centroids(corpus, doc_ids)
+    queries = sample_queries(corpus, args.queries)
+
+    started = time.perf_counter()
+    truth = exact_top_k(corpus, queries, args.top_k)
+    print(f"{len(corpus)} chunks in {len(docs)} documents x {corpus.shape[1]} dims, {len(queries)} queries, "
+          f"exact top-{args.top_k} in {time.perf_counter() - started:.1f}s")
+
+    base_dir = tempfile.mkdtemp(prefix="two-stage-")
+    try:
+        started = time.perf_counter()
+        chunk_index = build_index(os.path.join(base_dir, "chunks"), corpus, doc_ids, args.index)
+        centroid_index = build_index(os.path.join(base_dir, "centroids"), centroids, docs, args.index)
+        print(f"built {args.index} indexes in {time.perf_counter() - started:.0f}s")
+        print(f"{'docs':<12} {'chunks':<12} {'recall@' + str(args.top_k):>8} {'p50 ms':>9} {'p95 ms':>9}")
+
+        def flat(q):
+            return [hit.entity.get("chunk_index") for hit in chunk_index.search(q, top_k=args.top_k)[0]]
+
+        report("all", str(args.top_k), *measure(flat, queries, truth, args.top_k))
+
+        for doc_candidates in args.doc_candidates:
+            for chunk_candidates in args.chunk_candidates:
+                limit = max(chunk_candidates, args.top_k)
+
+                def two_stage(q):
+                    candidates = [hit.entity.get("doc_id") for hit in centroid_index.search(q, top_k=doc_candidates)[0]]
+                    hits = chunk_index.search(q, top_k=limit, filters=[FieldFilter("doc_id", values=candidates)])[0]
+                    return [hit.entity.get("chunk_index") for hit in hits[:args.top_k]]
+
+                report(str(doc_candidates), str(limit), *measure(two_stage, queries, truth, args.top_k))
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+向量检索基准脚本共用的工具: 参数解析, 合成数据, 查询抽样与召回率/延迟测量
+
+由 benchmarks 下的脚本导入 (python benchmarks/<脚本>.py 运行时脚本目录在 sys.path 中)。
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src/backend'))
+
+from app.utils.vector_eval import normalize_rows, recall_at_k
+
+
+def int_list(value: str):
+    return [int(v) for v in value.split(",") if v]
+
+
+def synthetic_vectors(count: int, dim: int, clusters: int = 256, seed: int = 42) -> np.ndarray:
+    rng = np.random.RandomState(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    assign = rng.randint(clusters, size=count)
+    return normalize_rows(centers[assign] + 0.35 * rng.normal(size=(count, dim)).astype(np.float32))
+
+
+def sample_queries(corpus: np.ndarray, count: int, seed: int = 7) -> np.ndarray:
+    rng = np.random.RandomState(seed)
+    picked = corpus[rng.choice(len(corpus), size=min(count, len(corpus)), replace=False)]
+    return normalize_rows(picked + 0.1 * rng.normal(size=picked.shape).astype(np.float32) / np.sqrt(corpus.shape[1]))
+
+
+def measure(search_fn, queries: np.ndarray, truth: np.ndarray, top_k: int):
+    """
+    依次执行检索 (先预热一次), 返回 (recall@k, p50 毫秒, p95 毫秒)
+    """
+    search_fn(queries[0])
+    found, latencies = [], []
+    for query in queries:
+        started = time.perf_counter()
+        found.append(search_fn(query))
+        latencies.append((time.perf_counter() - started) * 1000)
+    return recall_at_k(found, truth, top_k), np.percentile(latencies, 50), np.percentile(latencies, 95)
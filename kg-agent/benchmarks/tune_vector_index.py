@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+向量索引调优: 扫描索引类型/构建参数/检索强度, 以精确检索为基准报告 recall@k 与检索延迟
+
+用法:
+    python benchmarks/tune_vector_index.py [--store milvus|local] [--vectors data.npy | --from-collection]
+        [--size 100000] [--queries 200] [--top-k 10]
+        [--index-types IVF_FLAT,IVF_SQ8,HNSW] [--nlist 128,1024] [--m 16,32] [--ef-construction 200]
+        [--nprobe 1,4,8,16,32,64] [--ef 16,32,64,128,256]
+
+数据来源: --vectors 为 (n, dim) 的 .npy 文件; --from-collection 从线上 Milvus 集合导出向量 (只读);
+都不指定时生成带聚类结构的合成向量。查询向量为语料中抽样的向量加噪声。
+milvus 模式在临时集合 <MILVUS_COLLECTION>_tune 中逐个建索引测试, 结束后删除; local 模式测试进程内 HNSW 索引。
+每个组合输出 recall@k、p50/p95 单查询延迟, 据此选择满足召回率要求且 p95 最低的参数写入配置。
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src/backend'))
+
+from app.config import get_settings
+from app.utils.vector_eval import exact_top_k, normalize_rows
+from helpers import int_list, measure, sample_queries, synthetic_vectors
+
+settings = get_settings()
+
+
+def export_collection(limit: int) -> np.ndarray:
+    from pymilvus import Collection
+    from app.infrastructure.milvus import milvus_client
+
+    collection = Collection(milvus_client.collection_name)
+    collection.load()
+    iterator = collection.query_iterator(batch_size=1000, expr="id >= 0", output_fields=["embedding"])
+    vectors = []
+    while len(vectors) < limit:
+        batch = iterator.next()
+        if not batch:
+            break
+        vectors.extend(row["embedding"] for row in batch)
+    iterator.close()
+    return normalize_rows(np.asarray(vectors[:limit], dtype=np.float32))
+
+
+def report(index: str, build: str, effort: str, recall: float, p50: float, p95: float):
+    print(f"{index:<9} {build:<22} {effort:<11} {recall:>8.4f} {p50:>9.2f} {p95:>9.2f}")
+
+
+def tune_local(args, corpus, queries, truth):
+    from app.infrastructure.local_vector import HNSWLIB_AVAILABLE, LocalVectorIndex
+
+    chunks = [{"index": i, "content": ""} for i in range(len(corpus))]
+
+    def run(index, **kwargs):
+        return lambda q: [hit.entity.get("chunk_index") for hit in index.search(q, top_k=args.top_k, **kwargs)[0]]
+
+    base_dir = tempfile.mkdtemp(prefix="tune-flat-")
+    try:
+        index = LocalVectorIndex(base_dir, corpus.shape[1])
+        index.insert_chunks("tune", chunks, corpus)
+        report("FLAT", "-", "exact", *measure(run(index), queries, truth, args.top_k))
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+    # 未安装 hnswlib 时 hnsw 模式退化为精确检索, 测出的结果不代表 HNSW
+    if not HNSWLIB_AVAILABLE:
+        print("hnswlib not installed, skipping the local HNSW sweep (pip install hnswlib)", file=sys.stderr)
+        return
+
+    for m in args.m:
+        for ef_construction in args.ef_construction:
+            base_dir = tempfile.mkdtemp(prefix="tune-hnsw-")
+            try:
+                index = LocalVectorIndex(base_dir, corpus.shape[1], index_type="hnsw", hnsw_m=m, ef_construction=ef_construction)
+                index.insert_chunks("tune", chunks, corpus)
+                started = time.perf_counter()
+                index.warmup()
+                build = f"M={m} efC={ef_construction} ({time.perf_counter() - started:.0f}s)"
+                for ef in args.ef:
+                    report("HNSW", build, f"ef={ef}", *measure(run(index, effort=ef), queries, truth, args.top_k))
+            finally:
+                shutil.rmtree(base_dir, ignore_errors=True)
+
+
+def tune_milvus(args, corpus, queries, truth):
+    from pymilvus import Collection, CollectionSchema, DataType, FieldSchema, utility
+    from app.infrastructure.milvus import build_index_params, build_search_params
+
+    name = f"{settings.MILVUS_COLLECTION}_tune"
+    if utility.has_collection(name):
+        utility.drop_collection(name)
+    schema = CollectionSchema([
+        FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=False),
+        FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=corpus.shape[1])
+    ], "Vector index tuning")
+    collection = Collection(name, schema)
+    try:
+        step = settings.MILVUS_INSERT_BATCH_SIZE
+        for start in range(0, len(corpus), step):
+            collection.insert([list(range(start, min(start + step, len(corpus)))), corpus[start:start + step]])
+        collection.flush()
+
+        configs = []
+        for index_type in args.index_types.split(","):
+            index_type = index_type.strip().upper()
+            if index_type == "HNSW":
+                configs += [(index_type, {"m": m, "ef_construction": efc}, args.ef) for m in args.m for efc in args.ef_construction]
+            else:
+                configs += [(index_type, {"nlist": nlist}, [p for p in args.nprobe if p <= nlist]) for nlist in args.nlist]
+
+        for index_type, build_args, efforts in configs:
+            collection.release()
+            collection.drop_index()
+            index_params = build_index_params(index_type, **build_args)
+            started = time.perf_counter()
+            collection.create_index("embedding", index_params)
+            utility.wait_for_index_building_complete(name)
+            collection.load()
+            build = " ".join(f"{k}={v}" for k, v in index_params["params"].items()) + f" ({time.perf_counter() - started:.0f}s)"
+
+            for effort in efforts:
+                params = build_search_params(index_type, args.top_k, effort, build_args.get("nlist"))
+
+                def run(q):
+                    hits = collection.search(data=[q], anns_field="embedding", param=params, limit=args.top_k)
+                    return [hit.id for hit in hits[0]]
+
+                label = ("ef" if index_type == "HNSW" else "nprobe") + f"={effort}"
+                report(index_type, build, label, *measure(run, queries, truth, args.top_k))
+    finally:
+        utility.drop_collection(name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", default=settings.VECTOR_STORE, choices=["milvus", "local"])
+    parser.add_argument("--vectors", help="(n, dim) 的 .npy 向量文件")
+    parser.add_argument("--from-collection", action="store_true", help="从线上 Milvus 集合导出向量")
+    parser.add_argument("--size", type=int, default=100000, help="合成/导出的向量条数")
+    parser.add_argument("--dim", type=int, default=settings.MILVUS_DIMENSION)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--index-types", default="IVF_FLAT,IVF_SQ8,HNSW")
+    parser.add_argument("--nlist", type=int_list, default=[128, 1024])
+    parser.add_argument("--m", type=int_list, default=[16, 32])
+    parser.add_argument("--ef-construction", type=int_list, default=[200])
+    parser.add_argument("--nprobe", type=int_list, default=[1, 4, 8, 16, 32, 64, 128])
+    parser.add_argument("--ef", type=int_list, default=[16, 32, 64, 128, 256])
+    args = parser.parse_args()
+
+    if args.vectors:
+        corpus = normalize_rows(np.load(args.vectors))
+    elif args.from_collection:
+        corpus = export_collection(args.size)
+    else:
+        corpus = synthetic_vectors(args.size, args.dim)
+    queries = sample_queries(corpus, args.queries)
+
+    started = time.perf_counter()
+    truth = exact_top_k(corpus, queries, args.top_k)
+    print(f"{len(corpus)} vectors x {corpus.shape[1]} dims, {len(queries)} queries, "
+          f"exact top-{args.top_k} in {time.perf_counter() - started:.1f}s")
+    print(f"{'index':<9} {'build':<22} {'effort':<11} {'recall@' + str(args.top_k):>8} {'p50 ms':>9} {'p95 ms':>9}")
+
+    if args.store == "local":
+        tune_local(args, corpus, queries, truth)
+    else:
+        tune_milvus(args, corpus, queries, truth)
+
+
+if __name__ == "__main__":
+    main()
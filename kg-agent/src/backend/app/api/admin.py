@@ -1,4 +1,5 @@
 from flask import Blueprint, request, jsonify
+from app.models import DocumentAttributes
 from app.services import document_service
 from app.exceptions import ValidationError
 
@@ -19,6 +20,18 @@ def upload_document():
         type: file
         required: true
         description: 要上传的文档文件
+      - in: formData
+        name: tenant
+        type: string
+        maxLength: 64
+        required: false
+        description: 所属租户/部门, 可用于检索过滤
+      - in: formData
+        name: source
+        type: string
+        maxLength: 128
+        required: false
+        description: 文档来源, 可用于检索过滤
     responses:
       200:
         description: 上传成功
@@ -38,10 +51,163 @@ def upload_document():
             details={"field": "file", "filename": ""}
         )
 
-    content = file.read()
-    doc = document_service.upload_document(content, file.filename)
+    attributes = DocumentAttributes(
+        tenant=request.form.get('tenant') or None,
+        source=request.form.get('source') or None
+    )
+    doc = document_service.upload_document(
+        file.stream,
+        file.filename,
+        tenant=attributes.tenant,
+        source=attributes.source
+    )
+    return jsonify(doc.model_dump())
+
+@admin_bp.route('/upload/batch', methods=['POST'])
+def upload_batch():
+    """
+    批量导入文档
+    ---
+    tags:
+      - Admin
+    consumes:
+      - multipart/form-data
+      - application/json
+    parameters:
+      - in: formData
+        name: files
+        type: file
+        required: false
+        description: 要上传的多个文档文件
+      - in: formData
+        name: tenant
+        type: string
+        maxLength: 64
+        required: false
+        description: 批次内文档所属租户/部门
+      - in: formData
+        name: source
+        type: string
+        maxLength: 128
+        required: false
+        description: 批次内文档的来源
+      - in: body
+        name: body
+        required: false
+        schema:
+          properties:
+            directory:
+              type: string
+              description: 相对于批量导入根目录的目录路径
+            paths:
+              type: array
+              items:
+                type: string
+              description: 相对于批量导入根目录的文件路径列表
+            recursive:
+              type: boolean
+              default: true
+            tenant:
+              type: string
+              maxLength: 64
+              description: 批次内文档所属租户/部门
+            source:
+              type: string
+              maxLength: 128
+              description: 批次内文档的来源
+    responses:
+      200:
+        description: 批次已创建, 返回批次ID及聚合进度
+    """
+    files = [f for f in request.files.getlist('files') if f.filename]
+    if files:
+        attributes = DocumentAttributes(
+            tenant=request.form.get('tenant') or None,
+            source=request.form.get('source') or None
+        )
+        result = document_service.upload_batch(
+            [(f.stream, f.filename) for f in files],
+            tenant=attributes.tenant,
+            source=attributes.source
+        )
+        return jsonify(result)
+
+    manifest = request.get_json(silent=True) or {}
+    if not manifest.get('directory') and not manifest.get('paths'):
+        raise ValidationError(
+            message="请求中未包含文件或导入清单",
+            details={"expected": "multipart/form-data with files field, or JSON with directory/paths"}
+        )
+
+    attributes = DocumentAttributes(tenant=manifest.get('tenant') or None, source=manifest.get('source') or None)
+    result = document_service.import_manifest(
+        directory=manifest.get('directory'),
+        paths=manifest.get('paths'),
+        recursive=manifest.get('recursive', True),
+        tenant=attributes.tenant,
+        source=attributes.source
+    )
+    return jsonify(result)
+
+@admin_bp.route('/document/<doc_id>', methods=['PUT'])
+def update_document(doc_id: str):
+    """
+    上传文档新版本 (增量重建索引)
+    ---
+    tags:
+      - Admin
+    consumes:
+      - multipart/form-data
+    parameters:
+      - in: path
+        name: doc_id
+        type: string
+        required: true
+        description: 文档ID
+      - in: formData
+        name: file
+        type: file
+        required: true
+        description: 文档的新版本文件
+    responses:
+      200:
+        description: 更新已提交, 只有变化的分块会重新索引
+        schema:
+          $ref: '#/definitions/Document'
+      404:
+        description: 文档未找到
+    """
+    file = request.files.get('file')
+    if file is None or file.filename == '':
+        raise ValidationError(
+            message="请求中未包含文件部分",
+            details={"field": "file", "expected": "multipart/form-data with file field"}
+        )
+
+    doc = document_service.update_document(doc_id, file.stream, file.filename)
     return jsonify(doc.model_dump())
 
+@admin_bp.route('/batch/<batch_id>/status', methods=['GET'])
+def batch_status(batch_id: str):
+    """
+    获取批量导入进度
+    ---
+    tags:
+      - Admin
+    parameters:
+      - in: path
+        name: batch_id
+        type: string
+        required: true
+        description: 批次ID
+    responses:
+      200:
+        description: 批次聚合进度 (total/completed/failed/pending/progress)
+      404:
+        description: 批次未找到
+    """
+    return jsonify(document_service.get_batch_status(batch_id))
+
 @admin_bp.route('/status', methods=['GET'])
 def system_status():
     """
@@ -69,6 +235,116 @@ def system_status():
         }
     })
 
+@admin_bp.route('/embedding/stats', methods=['GET'])
+def embedding_stats():
+    """
+    获取向量编码统计
+    ---
+    tags:
+      - Admin
+    responses:
+      200:
+        description: 当前 API 进程的向量缓存命中率, 以及本机嵌入服务的队列深度与批次大小
+    """
+    from app.services.embedding_service import embedding_service
+
+    return jsonify({
+        "cache": embedding_service.cache_stats(),
+        "server": embedding_service.server_stats()
+    })
+
+def _partitioned_vector_store():
+    from app.config import get_settings
+    from app.infrastructure.vector_store import vector_store
+
+    settings = get_settings()
+    if settings.VECTOR_STORE != "milvus" or not settings.MILVUS_PARTITION_FIELD:
+        raise ValidationError(
+            message="向量存储未启用分区",
+            details={"expected": "VECTOR_STORE=milvus and MILVUS_PARTITION_FIELD set"}
+        )
+    return vector_store
+
+def _partition_values():
+    values = (request.get_json(silent=True) or {}).get('values')
+    if not isinstance(values, list) or not values or not all(isinstance(v, str) for v in values):
+        raise ValidationError(
+            message="请求中未包含分区取值",
+            details={"field": "values", "expected": "non-empty list of strings"}
+        )
+    return values
+
+@admin_bp.route('/vector/partitions', methods=['GET'])
+def vector_partitions():
+    """
+    列出向量集合的分区
+    ---
+    tags:
+      - Admin
+    responses:
+      200:
+        description: 各分区对应的属性取值, 行数和加载状态
+      400:
+        description: 未启用分区
+    """
+    return jsonify({"partitions": _partitioned_vector_store().list_partitions()})
+
+@admin_bp.route('/vector/partitions/load', methods=['POST'])
+def load_vector_partitions():
+    """
+    加载向量分区
+    ---
+    tags:
+      - Admin
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          properties:
+            values:
+              type: array
+              items:
+                type: string
+              description: 分区字段的取值, 如租户名
+    responses:
+      200:
+        description: 已加载的分区
+      400:
+        description: 未启用分区或参数错误
+    """
+    store = _partitioned_vector_store()
+    return jsonify({"loaded": store.load_partitions(_partition_values())})
+
+@admin_bp.route('/vector/partitions/release', methods=['POST'])
+def release_vector_partitions():
+    """
+    释放向量分区, 回收内存; 之后的检索用到时会重新加载
+    ---
+    tags:
+      - Admin
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          properties:
+            values:
+              type: array
+              items:
+                type: string
+              description: 分区字段的取值, 如租户名
+    responses:
+      200:
+        description: 已释放的分区
+      400:
+        description: 未启用分区或参数错误
+    """
+    store = _partitioned_vector_store()
+    return jsonify({"released": store.release_partitions(_partition_values())})
+
 @admin_bp.route('/document/<doc_id>/status', methods=['GET'])
 def document_status(doc_id: str):
     """
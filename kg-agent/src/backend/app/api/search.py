@@ -29,6 +29,21 @@ def search():
             top_k:
               type: integer
               default: 10
+            threshold:
+              type: number
+              description: 向量结果的相似度阈值 (0-1), 低于该值的向量结果被丢弃, 不指定时不过滤
+            filters:
+              type: object
+              description: 过滤条件, 如 {"tenant": "hr", "created_at": {"gte": "2024-01-01"}}
+            search_effort:
+              type: integer
+              description: 向量检索强度 (IVF 的 nprobe / HNSW 的 ef), 越小越快召回率越低
+            candidate_docs:
+              type: integer
+              description: 两阶段向量检索第一阶段的候选文档数, 0 表示直接检索全部分块 (需要启用文档级向量)
+            candidate_chunks:
+              type: integer
+              description: 两阶段向量检索第二阶段在候选文档中检索的分块数
     responses:
       200:
         description: 检索成功
@@ -10,7 +10,8 @@ def make_celery(app_name=__name__):
         backend=settings.CELERY_RESULT_BACKEND,
         include=[
             "app.tasks.document",
-            "app.tasks.index"
+            "app.tasks.index",
+            "app.tasks.worker_hooks"
         ]
     )
     
@@ -21,10 +22,28 @@ def make_celery(app_name=__name__):
         timezone="UTC",
         enable_utc=True,
         task_track_started=True,
-        # 任务路由配置 (可选)
+        # 默认路由; 流水线各阶段在编排时按文档调度级别显式指定队列和优先级 (见 app.tasks.routing)
         task_routes={
             'app.tasks.document.*': {'queue': 'document_processing'},
             'app.tasks.index.*': {'queue': 'indexing'},
+        },
+        # Redis 按优先级分桶, 同一队列内交互式任务先于批量任务出队
+        broker_transport_options={
+            'priority_steps': list(range(10)),
+            'sep': ':',
+            'queue_order_strategy': 'priority',
+        },
+        task_default_priority=5,
+        # 每个 worker 进程只预取一条消息, 长任务不会扣住排在后面的短任务
+        worker_prefetch_multiplier=1,
+        # 子进程启动时要做一次模型预热 (见 app.tasks.worker_hooks), 放宽默认 4 秒的就绪超时
+        worker_proc_alive_timeout=60,
+        # 定时清理流水线遗留的中间结果
+        beat_schedule={
+            'gc-spill-store': {
+                'task': 'app.tasks.document.gc_spill_store',
+                'schedule': 3600.0,
+            },
         }
     )
     
@@ -1,7 +1,7 @@
 import os
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
-from typing import Optional
+from typing import Any, Dict, Optional
 
 class Settings(BaseSettings):
     # App Config
@@ -28,6 +28,33 @@ class Settings(BaseSettings):
     MILVUS_PORT: int = 19530
     MILVUS_COLLECTION: str = "kg_documents"
     MILVUS_DIMENSION: int = 768  # Depends on embedding model
+    MILVUS_INSERT_BATCH_SIZE: int = 2048  # 每次 insert 请求的最大行数, 大文档分片写入以限制单个 gRPC 消息大小
+    MILVUS_WRITE_BUFFER_ROWS: int = 8192  # 进程内写入缓冲累计到该行数时立即写入
+    MILVUS_WRITE_BUFFER_MAX_WAIT: float = 1.0  # 缓冲中的行最多等待的秒数, 超时后由后台线程写入
+    MILVUS_FLUSH_INTERVAL: float = 0.0  # 显式 flush (封存段) 的最小间隔秒数, 0 表示交给 Milvus 自动 flush
+    MILVUS_INDEX_TYPE: str = "IVF_FLAT"  # 新建集合的向量索引类型: IVF_FLAT / IVF_SQ8 / HNSW
+    MILVUS_IVF_NLIST: int = 128  # IVF 索引的聚类数, 通常取 4 * sqrt(分块数)
+    MILVUS_HNSW_M: int = 16  # HNSW 每个节点的邻居数
+    MILVUS_HNSW_EF_CONSTRUCTION: int = 200  # HNSW 构建时的候选集大小
+    MILVUS_SEARCH_NPROBE: int = 10  # IVF 索引默认检索的聚类数
+    MILVUS_SEARCH_EF: int = 64  # HNSW 索引默认检索的候选集大小
+    MILVUS_PARTITION_FIELD: str = ""  # 按该文档属性 (tenant / doc_type) 将分块写入各自分区, 带该字段过滤的检索只加载和检索对应分区; 空表示不分区
+    MILVUS_MAX_PARTITIONS: int = 1024  # 集合的分区数上限 (不超过 Milvus 的 rootCoord.maxPartitionNum), 达到后新取值的分块写入 _default 分区
+    MILVUS_LOAD_ON_DEMAND: bool = False  # 启动时不加载整个集合, 检索时按需加载用到的分区 (分区可通过管理接口 load / release 控制内存)
+
+    # Vector Store Config
+    VECTOR_STORE: str = "milvus"  # milvus: Milvus 服务; local: 进程内向量索引 (小规模部署/召回率基线)
+    VECTOR_STORE_WARMUP: bool = True  # API 启动时在后台加载向量集合 (Milvus load / 本地索引映射)
+    LOCAL_VECTOR_DIR: str = "./data/vector_index"  # 进程内向量索引的存储目录, 所有 worker 与 API 共享
+    LOCAL_VECTOR_INDEX: str = "flat"  # flat: 精确检索; hnsw: 近似图索引 (需要 hnswlib)
+    LOCAL_HNSW_M: int = 16  # HNSW 每个节点的邻居数
+    LOCAL_HNSW_EF_CONSTRUCTION: int = 200  # HNSW 构建时的候选集大小
+    LOCAL_HNSW_EF_SEARCH: int = 64  # HNSW 检索时的候选集大小, 越大召回率越高
+    LOCAL_VECTOR_QUANTIZATION: str = "none"  # flat 索引第一阶段的内存编码: none / binary (符号位, 1/32) / int8 (约 1/4), float32 向量留在磁盘上用于重新打分
+    VECTOR_RESCORE_FACTOR: int = 4  # 量化检索第一阶段取 top_k 的倍数作为候选, 用 float32 向量重新打分 (本地量化索引与 Milvus IVF_SQ8)
+    DOC_CENTROIDS_ENABLED: bool = False  # 入库时维护文档级向量 (分块向量的均值) 的独立索引, 两阶段检索需要
+    TWO_STAGE_DOC_CANDIDATES: int = 0  # 两阶段检索第一阶段按文档向量选出的候选文档数, 0 表示直接检索全部分块
+    TWO_STAGE_CHUNK_CANDIDATES: int = 0  # 第二阶段在候选文档的分块中检索的条数 (不小于 top_k), 0 表示取 top_k
     
     # NebulaGraph Config
     NEBULA_HOST: str = "localhost"
@@ -35,10 +62,33 @@ class Settings(BaseSettings):
     NEBULA_USER: str = "root"
     NEBULA_PASSWORD: str = "nebula"
     NEBULA_SPACE: str = "kg_agent_space"
+    NEBULA_INSERT_BATCH_SIZE: int = 256  # 多行 INSERT 语句每条的最大行数
     
     # Celery Config
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/0"
+    # 各 worker 组消费的队列及并发数 (python -m app.worker <组名> 启动), 交互式上传与批量/大文档互不阻塞
+    CELERY_WORKER_GROUPS: Dict[str, Dict[str, Any]] = {
+        "interactive": {"queues": ["document_processing", "ingest_interactive", "indexing"], "concurrency": 4},
+        "bulk": {"queues": ["ingest_bulk", "indexing_bulk"], "concurrency": 4},
+        # threads 池允许大 PDF 在任务内使用进程池并行解析
+        "large": {"queues": ["ingest_large", "indexing_large"], "concurrency": 2, "pool": "threads"},
+    }
+    
+    # Ingestion Pipeline Config
+    PIPELINE_MAX_RETRIES: int = 3  # 每个阶段的最大重试次数
+    PIPELINE_FUSE_MAX_BYTES: int = 2 * 1024 * 1024  # 小于该大小的文件在同一任务内完成提取+分块, 0 表示禁用
+    CELERY_PRELOAD_EMBEDDING: bool = True  # worker 主进程在 fork 前加载嵌入模型, 子进程共享权重并在启动时预热
+    INGEST_LARGE_COST: int = 50 * 1024 * 1024  # 预估代价 (按类型加权的字节数) 达到该值的文档路由到 large 队列
+    SPILL_DIR: str = "./data/spill"  # 阶段中间结果落盘目录, 所有 worker 必须共享
+    SPILL_TTL_SECONDS: int = 24 * 3600  # 未被清理的中间结果最长保留时间
+    BATCH_MICRO_SIZE: int = 32  # 批量导入时每个微批次包含的文档数 (一次 ES bulk / Milvus insert)
+    BATCH_IMPORT_ROOT: str = "./data/import"  # 目录清单导入只允许访问该目录下的文件
+    EXTRACT_PREFETCH_PAGES: int = 8  # 流式提取时后台线程预解析的最大页数
+    PDF_EXTRACT_WORKERS: int = 4  # PDF 按页码区间并行解析的进程数, 1 表示串行
+    PDF_PARALLEL_MIN_PAGES: int = 64  # 页数达到该值的 PDF 才使用进程池解析
+    PARSE_CACHE_DIR: str = "./data/parse_cache"  # 解析结果缓存目录 (按文件哈希寻址), 所有 worker 共享
+    PARSE_CACHE_MAX_BYTES: int = 10 * 1024 ** 3  # 解析结果缓存大小上限, 超出后按最近访问淘汰, 0 表示禁用
     
     # File Storage Config
     STORAGE_TYPE: str = "local"  # local or minio
@@ -53,6 +103,20 @@ class Settings(BaseSettings):
     
     # Model Config
     EMBEDDING_MODEL_PATH: str = "all-MiniLM-L6-v2"  # or local path
+    EMBEDDING_BACKEND: str = "torch"  # 推理后端: torch (fp32) / int8 (动态量化) / onnx (onnxruntime)
+    EMBEDDING_ONNX_PATH: Optional[str] = None  # onnx 后端的模型文件, 默认为 <EMBEDDING_MODEL_PATH>/onnx/model.onnx
+    EMBEDDING_NUM_THREADS: int = 0  # CPU 推理线程数, 0 表示使用运行时默认值
+    EMBEDDING_BATCH_SIZE: int = 32  # 向量编码的微批次大小 (文本按 token 长度排序后分批)
+    EMBEDDING_CACHE_DIR: str = "./data/embedding_cache"  # 向量磁盘缓存目录 (按模型 + 规范化文本哈希寻址), 所有 worker 共享
+    EMBEDDING_CACHE_LRU_SIZE: int = 10000  # 每个进程内存中缓存的向量条数, 0 表示禁用
+    EMBEDDING_CACHE_MAX_BYTES: int = 4 * 1024 ** 3  # 向量磁盘缓存大小上限, 达到后停止写入, 0 表示禁用
+    QUERY_EMBEDDING_CACHE_SIZE: int = 4096  # 每个 API 进程内存中缓存的查询向量条数, 0 表示禁用
+    QUERY_EMBEDDING_REDIS_TTL: int = 24 * 3600  # 查询向量在 Redis 中共享的过期时间 (秒), 0 表示不共享
+    EMBEDDING_WARMUP: bool = True  # API 启动时在后台预加载嵌入模型 (配置了嵌入服务时不加载)
+    EMBEDDING_SERVER_SOCKET: Optional[str] = None  # 本机嵌入服务的 Unix socket, 设置后 API 进程通过它编码查询
+    EMBEDDING_SERVER_MAX_BATCH: int = 64  # 嵌入服务每个微批次的最大文本数
+    EMBEDDING_SERVER_MAX_WAIT_MS: float = 5.0  # 嵌入服务收到首个请求后等待合并后续请求的时间 (毫秒)
+    EMBEDDING_SERVER_TIMEOUT: float = 10.0  # 客户端等待嵌入服务响应的超时 (秒)
 
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=True, extra="ignore")
 
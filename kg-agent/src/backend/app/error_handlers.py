@@ -1,6 +1,7 @@
 from flask import jsonify
 from werkzeug.exceptions import HTTPException
 from pydantic import ValidationError
+from app.exceptions import AppException
 
 def register_error_handlers(app):
     @app.errorhandler(HTTPException)
@@ -24,6 +25,11 @@ def register_error_handlers(app):
         }
         return jsonify(response), 400
 
+    @app.errorhandler(AppException)
+    def handle_app_exception(e):
+        """处理应用异常, 按异常自带的 HTTP 状态码返回 (参数错误 400, 资源不存在 404 等)"""
+        return jsonify(e.to_response_dict()), e.http_status
+
     @app.errorhandler(Exception)
     def handle_generic_exception(e):
         """处理未捕获的通用异常"""
@@ -1,10 +1,26 @@
 from elasticsearch import Elasticsearch, helpers
 from app.config import get_settings
 from app.utils.logger import logger
-from typing import List, Dict, Any
+from app.utils.search_filters import ATTRIBUTE_FIELDS, FieldFilter, es_filter_clauses
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional
 
 settings = get_settings()
 
+# 可过滤的文档属性字段
+ATTRIBUTE_MAPPINGS = {
+    "doc_type": {"type": "keyword"},
+    "tenant": {"type": "keyword"},
+    "source": {"type": "keyword"},
+    "created_at": {"type": "date"}
+}
+
+def _attribute_fields(attributes: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    fields = {k: v for k, v in (attributes or {}).items() if k in ATTRIBUTE_FIELDS}
+    if fields.get("created_at") is not None:
+        fields["created_at"] = datetime.fromtimestamp(fields["created_at"], tz=timezone.utc).isoformat()
+    return fields
+
 class ESClient:
     _instance = None
 
@@ -41,34 +57,73 @@ class ESClient:
                         "filename": {"type": "keyword"},
                         "content": {"type": "text", "analyzer": "standard"}, # Use standard for now, switch to ik_max_word if plugin available
                         "metadata": {"type": "object"},
-                        "created_at": {"type": "date"}
+                        **ATTRIBUTE_MAPPINGS
                     }
                 }
                 self.client.indices.create(index=self.index_name, mappings=mappings)
             else:
+                # 早于过滤字段创建的索引补充映射, 避免动态映射为 text
+                self.client.indices.put_mapping(index=self.index_name, properties=ATTRIBUTE_MAPPINGS)
                 logger.info(f"ES index {self.index_name} already exists.")
         except Exception as e:
             logger.error(f"ES index check failed: {e}")
 
-    def index_document(self, doc_id: str, content: str, metadata: Dict[str, Any]):
-        """Index full document content"""
+    def index_document(self, doc_id: str, content: str, metadata: Dict[str, Any],
+                       attributes: Optional[Dict[str, Any]] = None):
+        """Index full document content with its filterable attributes"""
         if not self.client: return
         try:
             doc = {
                 "doc_id": doc_id,
                 "content": content,
-                "metadata": metadata
+                "metadata": metadata,
+                **_attribute_fields(attributes)
             }
             res = self.client.index(index=self.index_name, id=doc_id, document=doc)
             logger.info(f"Indexed document {doc_id} to ES: {res['result']}")
         except Exception as e:
             logger.error(f"Failed to index document to ES: {e}")
 
-    def search(self, query: str, top_k: int = 10):
+    def bulk_index_documents(self, docs: List[Dict[str, Any]]) -> int:
+        """
+        Index many documents with a single bulk request
+
+        Each item: {"doc_id", "content", "metadata", "attributes"}
+        """
+        if not self.client or not docs: return 0
+        actions = (
+            {
+                "_index": self.index_name,
+                "_id": doc["doc_id"],
+                "_source": {
+                    "doc_id": doc["doc_id"],
+                    "content": doc["content"],
+                    "metadata": doc.get("metadata", {}),
+                    **_attribute_fields(doc.get("attributes"))
+                }
+            }
+            for doc in docs
+        )
+        try:
+            success, errors = helpers.bulk(self.client, actions, raise_on_error=False)
+            if errors:
+                logger.error(f"ES bulk indexing had {len(errors)} errors: {errors[:3]}")
+            logger.info(f"Bulk indexed {success} documents to ES")
+            return success
+        except Exception as e:
+            logger.error(f"Failed to bulk index documents to ES: {e}")
+            return 0
+
+    def search(self, query: str, top_k: int = 10, filters: Optional[List[FieldFilter]] = None):
+        """
+        filters 转换为 bool 查询的 filter 子句, 不参与打分
+        """
+        match = {"match": {"content": query}}
+        clauses = es_filter_clauses(filters or [])
         try:
             res = self.client.search(
                 index=self.index_name,
-                query={"match": {"content": query}},
+                query={"bool": {"must": [match], "filter": clauses}} if clauses else match,
                 size=top_k
             )
             return res['hits']['hits']
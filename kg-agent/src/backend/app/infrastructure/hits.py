@@ -0,0 +1,16 @@
+"""
+向量检索结果条目, 供不直接返回 pymilvus 结果的检索路径使用 (进程内向量索引, Milvus 量化索引的重新打分)
+"""
+from typing import Any, Dict
+
+
+class SearchHit:
+    """
+    与 pymilvus 检索结果相同的访问方式: hit.id / hit.distance / hit.entity.get(field)
+    """
+    __slots__ = ("id", "distance", "entity")
+
+    def __init__(self, id: int, distance: float, entity: Dict[str, Any]):
+        self.id = id
+        self.distance = distance
+        self.entity = entity
@@ -0,0 +1,555 @@
+"""
+进程内向量索引, 与 MilvusClient 相同的接口 (insert_chunks / insert_batch / search / delete_documents ...)
+
+小规模部署可以不依赖 Milvus 服务 (VECTOR_STORE=local), 也可以作为调优 Milvus 索引时的召回率基线。
+
+- flat: 精确检索, 分块计算 float32 内积 (向量写入时已归一化, 内积即余弦相似度)
+- hnsw: 近似检索, 基于 hnswlib 的图索引, 每个进程从向量文件增量构建, 并在目录中保存快照以加速启动
+- flat + quantization (binary / int8): 第一阶段在内存中的紧凑编码上近似打分 (见 app.utils.quantization),
+  只对前 top_k * rescore_factor 个候选读取 float32 向量重新打分; 向量文件只按需映射, 不常驻内存
+
+存储布局 (LOCAL_VECTOR_DIR/gen-N/):
+- vectors.f32: 按行追加的归一化 float32 向量, 以内存映射方式读取
+- rows.jsonl: 与向量行一一对应的 doc_id / chunk_index / content 及可过滤的文档属性
+- deletes.i64: 已删除的行号
+多个进程 (Celery worker 写, API 读) 共享同一目录: 写入在文件锁内先写向量再写行信息,
+读取方按文件长度增量加载其他进程追加的内容; 删除超过一半时在新的 generation 目录中压缩重写。
+"""
+import fcntl
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.infrastructure.hits import SearchHit
+from app.utils.logger import logger
+from app.utils.quantization import QUANTIZATION_TYPES, QuantizedVectors
+from app.utils.search_filters import ATTRIBUTE_FIELDS, FieldFilter
+
+try:
+    import hnswlib
+    HNSWLIB_AVAILABLE = True
+except ImportError:
+    HNSWLIB_AVAILABLE = False
+    hnswlib = None
+
+ROW_DTYPE = np.float32
+SEARCH_BLOCK_ROWS = 65536
+COMPACT_MIN_ROWS = 1000
+# 过滤后剩余行数低于该比例时直接对这些行做精确检索, 否则在 HNSW 图上带过滤条件检索
+FILTER_EXACT_RATIO = 0.1
+KEYWORD_ATTRIBUTES = tuple(f for f in ATTRIBUTE_FIELDS if f != "created_at")
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=ROW_DTYPE)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+class LocalVectorIndex:
+    def __init__(self, base_dir: str, dim: int, index_type: str = "flat", hnsw_m: int = 16,
+                 ef_construction: int = 200, ef_search: int = 64, quantization: str = "none",
+                 rescore_factor: int = 4):
+        if index_type not in ("flat", "hnsw"):
+            raise ValueError(f"Unknown local vector index type '{index_type}', expected flat or hnsw")
+        if quantization not in QUANTIZATION_TYPES:
+            raise ValueError(f"Unknown quantization '{quantization}', expected one of: {', '.join(QUANTIZATION_TYPES)}")
+        if index_type == "hnsw" and not HNSWLIB_AVAILABLE:
+            logger.warning("hnswlib is not installed, local vector index falls back to exact (flat) search")
+            index_type = "flat"
+        if index_type == "hnsw" and quantization != "none":
+            # hnswlib 的图中保存完整的 float32 向量, 量化编码不能减少其内存
+            logger.warning(f"Quantization '{quantization}' only applies to the flat local index, ignored for hnsw")
+            quantization = "none"
+        self.base_dir = Path(base_dir).resolve()
+        self.dim = dim
+        self.index_type = index_type
+        self.hnsw_m = hnsw_m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.quantization = quantization
+        self.rescore_factor = max(int(rescore_factor), 1)
+        self._lock = threading.RLock()
+        self._generation: Optional[str] = None
+        self._reset_state()
+
+    def _reset_state(self):
+        self._row_count = 0
+        self._rows_read = 0
+        self._deletes_read = 0
+        self._doc_ids: List[str] = []
+        self._chunk_indexes: List[int] = []
+        self._offsets: List[int] = []
+        self._by_doc: Dict[str, List[int]] = {}
+        # 关键字属性按字典编码保存, created_at 为 Unix 秒; 检索过滤时转换为数组
+        self._vocab: Dict[str, Dict[str, int]] = {f: {} for f in KEYWORD_ATTRIBUTES}
+        self._codes: Dict[str, List[int]] = {f: [] for f in KEYWORD_ATTRIBUTES}
+        self._created_at: List[int] = []
+        self._attr_arrays: Optional[Dict[str, np.ndarray]] = None
+        self._deleted = np.zeros(0, dtype=bool)
+        self._vectors: Optional[np.memmap] = None
+        self._hnsw = None
+        self._hnsw_count = 0
+        self._hnsw_saved = 0
+        self._quantized: Optional[QuantizedVectors] = None
+
+    # ---- 文件与增量加载 ----
+
+    def _gen_dir(self) -> Path:
+        return self.base_dir / self._generation
+
+    def _read_current(self) -> Optional[str]:
+        try:
+            return (self.base_dir / "CURRENT").read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _write_current(self, generation: str):
+        tmp = self.base_dir / f".CURRENT.{os.getpid()}.tmp"
+        tmp.write_text(generation)
+        os.replace(tmp, self.base_dir / "CURRENT")
+
+    @contextmanager
+    def _file_lock(self):
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.base_dir / ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _refresh(self):
+        """
+        加载其他进程追加的行和删除记录; generation 变化 (压缩) 时重新加载
+        """
+        current = self._read_current()
+        if current != self._generation:
+            self._reset_state()
+            self._generation = current
+        if current is None:
+            return
+
+        gen_dir = self._gen_dir()
+        try:
+            size = (gen_dir / "rows.jsonl").stat().st_size
+        except FileNotFoundError:
+            size = 0
+        if size > self._rows_read:
+            with open(gen_dir / "rows.jsonl", "rb") as f:
+                f.seek(self._rows_read)
+                data = f.read(size - self._rows_read)
+            # 只接受完整的行, 写入中的尾部留到下次
+            data = data[:data.rfind(b"\n") + 1]
+            offset = self._rows_read
+            for line in data.splitlines(keepends=True):
+                row = json.loads(line)
+                self._by_doc.setdefault(row["doc_id"], []).append(len(self._doc_ids))
+                self._doc_ids.append(row["doc_id"])
+                self._chunk_indexes.append(int(row["chunk_index"]))
+                for field in KEYWORD_ATTRIBUTES:
+                    vocab = self._vocab[field]
+                    self._codes[field].append(vocab.setdefault(row.get(field) or "", len(vocab)))
+                self._created_at.append(int(row.get("created_at") or 0))
+                self._offsets.append(offset)
+                offset += len(line)
+            self._rows_read = offset
+            new_rows = len(self._doc_ids) - self._row_count
+            if new_rows:
+                self._row_count = len(self._doc_ids)
+                self._deleted = np.concatenate([self._deleted, np.zeros(new_rows, dtype=bool)])
+                self._vectors = None
+                self._attr_arrays = None
+
+        try:
+            count = (gen_dir / "deletes.i64").stat().st_size // 8
+        except FileNotFoundError:
+            count = 0
+        if count > self._deletes_read:
+            with open(gen_dir / "deletes.i64", "rb") as f:
+                f.seek(self._deletes_read * 8)
+                rows = np.frombuffer(f.read((count - self._deletes_read) * 8), dtype=np.int64)
+            rows = rows[rows < self._row_count]
+            self._deleted[rows] = True
+            self._deletes_read = count
+            if self._hnsw is not None:
+                self._hnsw_mark_deleted(rows[rows < self._hnsw_count])
+
+    def _vector_rows(self) -> np.ndarray:
+        if self._vectors is None and self._row_count:
+            self._vectors = np.memmap(
+                self._gen_dir() / "vectors.f32", dtype=ROW_DTYPE, mode="r", shape=(self._row_count, self.dim)
+            )
+        return self._vectors if self._vectors is not None else np.empty((0, self.dim), dtype=ROW_DTYPE)
+
+    def _read_content(self, row: int) -> str:
+        try:
+            with open(self._gen_dir() / "rows.jsonl", "rb") as f:
+                f.seek(self._offsets[row])
+                return json.loads(f.readline()).get("content", "")
+        except (OSError, ValueError):
+            # 读取期间被压缩删除
+            return ""
+
+    def _live_rows(self, doc_id: str, chunk_indexes: Optional[Iterable[int]] = None) -> List[int]:
+        wanted = None if chunk_indexes is None else {int(i) for i in chunk_indexes}
+        return [
+            row for row in self._by_doc.get(doc_id, [])
+            if not self._deleted[row] and (wanted is None or self._chunk_indexes[row] in wanted)
+        ]
+
+    # ---- 写入 ----
+
+    def insert_chunks(self, doc_id: str, chunks: List[Dict[str, Any]], embeddings: np.ndarray,
+                      attributes: Optional[Dict[str, Any]] = None):
+        """
+        写入一个文档的分块向量
+        """
+        return self.insert_batch([(doc_id, chunks, embeddings, attributes)])
+
+    def insert_batch(self, items: List[Tuple[str, List[Dict[str, Any]], np.ndarray, Optional[Dict[str, Any]]]]) -> List[int]:
+        """
+        写入多个文档的分块向量 [(doc_id, chunks, embeddings, attributes), ...], 返回新行的行号
+        """
+        lines, arrays = [], []
+        for doc_id, chunks, embeddings, attributes in items:
+            if not chunks:
+                continue
+            arrays.append(_normalize(embeddings).reshape(len(chunks), self.dim))
+            attributes = {k: v for k, v in (attributes or {}).items() if k in ATTRIBUTE_FIELDS}
+            for chunk in chunks:
+                lines.append(json.dumps(
+                    {"doc_id": doc_id, "chunk_index": chunk["index"], "content": chunk["content"][:4000], **attributes},
+                    ensure_ascii=False
+                ).encode("utf-8") + b"\n")
+        if not lines:
+            return []
+        vectors = arrays[0] if len(arrays) == 1 else np.concatenate(arrays)
+
+        with self._lock, self._file_lock():
+            if self._read_current() is None:
+                (self.base_dir / "gen-0").mkdir(parents=True, exist_ok=True)
+                self._write_current("gen-0")
+            self._refresh()
+            start = self._row_count
+            gen_dir = self._gen_dir()
+            # 截掉中断的写入留下的残行, 保证向量行与行信息一一对应
+            with open(gen_dir / "vectors.f32", "ab") as f:
+                f.truncate(start * self.dim * np.dtype(ROW_DTYPE).itemsize)
+                f.write(np.ascontiguousarray(vectors).tobytes())
+            with open(gen_dir / "rows.jsonl", "ab") as f:
+                f.truncate(self._rows_read)
+                f.write(b"".join(lines))
+            self._refresh()
+        logger.info(f"Inserted {len(lines)} chunks of {len(items)} documents into local vector index")
+        return list(range(start, start + len(lines)))
+
+    def insert_batch_async(self, items: List[Tuple[str, List[Dict[str, Any]], np.ndarray]]) -> Future:
+        """
+        与 MilvusClient 相同的接口; 本地追加写入开销很小, 同步写入后返回已完成的 Future
+        """
+        future = Future()
+        try:
+            future.set_result(self.insert_batch(items))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def close(self):
+        """
+        写入均为同步完成, 无缓冲数据需要处理
+        """
+
+    def _delete_rows(self, doc_ids: List[str], chunk_indexes: Optional[Iterable[int]] = None) -> int:
+        """
+        在同一个文件锁临界区内刷新, 解析出要删除的行并写入删除记录, 返回删除的行数
+
+        行号只在当前 generation 内有效, 必须在锁内解析, 否则其他进程在两者之间压缩后会删错行
+        """
+        with self._lock, self._file_lock():
+            self._refresh()
+            if self._generation is None:
+                return 0
+            rows = [row for doc_id in doc_ids for row in self._live_rows(doc_id, chunk_indexes)]
+            if not rows:
+                return 0
+            path = self._gen_dir() / "deletes.i64"
+            with open(path, "ab") as f:
+                f.truncate(self._deletes_read * 8)
+                f.write(np.asarray(rows, dtype=np.int64).tobytes())
+            self._refresh()
+            deleted = int(self._deleted.sum())
+            if self._row_count >= COMPACT_MIN_ROWS and deleted * 2 >= self._row_count:
+                self._compact()
+        return len(rows)
+
+    def delete_documents(self, doc_ids: List[str]):
+        """
+        删除文档的全部分块
+        """
+        if self._delete_rows(doc_ids):
+            logger.info(f"Deleted local vector index chunks for {len(doc_ids)} documents")
+
+    def delete_chunks(self, doc_id: str, chunk_indexes: List[int]):
+        """
+        删除文档的指定分块
+        """
+        if not chunk_indexes:
+            return
+        self._delete_rows([doc_id], chunk_indexes)
+
+    def _compact(self):
+        """
+        在文件锁内把存活行重写到新的 generation 目录并切换, 删除旧目录
+        """
+        old_dir = self._gen_dir()
+        live = np.flatnonzero(~self._deleted)
+        generation = f"gen-{int(self._generation.split('-')[1]) + 1}"
+        new_dir = self.base_dir / generation
+        new_dir.mkdir(parents=True, exist_ok=True)
+
+        vectors = self._vector_rows()
+        with open(new_dir / "vectors.f32", "wb") as f:
+            for start in range(0, len(live), SEARCH_BLOCK_ROWS):
+                f.write(np.ascontiguousarray(vectors[live[start:start + SEARCH_BLOCK_ROWS]]).tobytes())
+        with open(old_dir / "rows.jsonl", "rb") as src, open(new_dir / "rows.jsonl", "wb") as dst:
+            for row in live:
+                src.seek(self._offsets[row])
+                dst.write(src.readline())
+
+        self._write_current(generation)
+        logger.info(f"Compacted local vector index: {len(live)} of {self._row_count} rows kept in {generation}")
+        self._refresh()
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    # ---- 读取 ----
+
+    def get_chunk_vectors(self, doc_id: str, chunk_indexes: List[int],
+                          attributes: Optional[Dict[str, Any]] = None) -> Dict[int, np.ndarray]:
+        """
+        读取指定分块的向量 (已归一化), 以 chunk_index 为键; attributes 仅用于 Milvus 的分区定位, 此处忽略
+        """
+        if not chunk_indexes:
+            return {}
+        with self._lock:
+            self._refresh()
+            vectors = self._vector_rows()
+            return {self._chunk_indexes[row]: np.array(vectors[row]) for row in self._live_rows(doc_id, chunk_indexes)}
+
+    def count(self) -> int:
+        """
+        存活的分块数
+        """
+        with self._lock:
+            self._refresh()
+            return int(self._row_count - self._deleted.sum())
+
+    def memory_bytes(self) -> int:
+        """
+        第一阶段检索的向量表示字节数: 量化编码 (未量化时为 float32 向量本身)
+        """
+        with self._lock:
+            self._refresh()
+            if self.quantization != "none":
+                return self._ensure_quantized().nbytes
+            return self._row_count * self.dim * np.dtype(np.float32).itemsize
+
+    def warmup(self):
+        """
+        预先映射向量文件 (hnsw 模式下构建/加载索引图), 使第一次检索不承担加载耗时
+        """
+        with self._lock:
+            self._refresh()
+            if self.index_type == "hnsw" and self._row_count:
+                self._ensure_hnsw()
+            if self.quantization != "none":
+                self._ensure_quantized()
+
+    def search(self, query_embedding, top_k: int = 5, exact: bool = False, effort: Optional[int] = None,
+               filters: Optional[List[FieldFilter]] = None) -> List[List[SearchHit]]:
+        """
+        检索最相似的分块, 返回与 pymilvus 相同结构的结果 ([[hit, ...]]), distance 为余弦相似度
+
+        exact=True 时无论索引类型和量化方式都做精确检索 (召回率基线); effort 为 hnsw 模式下本次检索的 ef;
+        filters 为过滤条件 (见 app.utils.search_filters), 在检索前按行属性预过滤
+        """
+        query = _normalize(query_embedding).reshape(self.dim)
+        with self._lock:
+            self._refresh()
+            live = ~self._deleted
+            if filters:
+                live &= self._filter_mask(filters)
+            live_count = int(live.sum())
+            k = min(top_k, live_count)
+            if k <= 0:
+                return [[]]
+            rows, scores = None, None
+            # 过滤后剩余行很少时精确检索这些行比在图上检索更快也更准
+            if self.index_type == "hnsw" and not exact and not (filters and live_count < FILTER_EXACT_RATIO * self._row_count):
+                rows, scores = self._search_hnsw(query, k, effort or self.ef_search, live if filters else None)
+            if rows is None and self.quantization != "none" and not exact:
+                rows, scores = self._search_quantized(query, k, live)
+            if rows is None:
+                rows, scores = self._search_flat(query, k, live)
+            hits = [
+                SearchHit(int(row), float(score), {
+                    "doc_id": self._doc_ids[row],
+                    "chunk_index": self._chunk_indexes[row],
+                    "content": self._read_content(row)
+                })
+                for row, score in zip(rows, scores)
+            ]
+        return [hits]
+
+    def _filter_mask(self, filters: List[FieldFilter]) -> np.ndarray:
+        """
+        满足全部过滤条件的行
+        """
+        if self._attr_arrays is None:
+            self._attr_arrays = {f: np.asarray(self._codes[f], dtype=np.int32) for f in KEYWORD_ATTRIBUTES}
+            self._attr_arrays["created_at"] = np.asarray(self._created_at, dtype=np.int64)
+        mask = np.ones(self._row_count, dtype=bool)
+        for condition in filters:
+            if condition.field == "doc_id":
+                selected = np.zeros(self._row_count, dtype=bool)
+                for doc_id in condition.values:
+                    selected[self._by_doc.get(doc_id, [])] = True
+                mask &= selected
+            elif condition.field in KEYWORD_ATTRIBUTES:
+                vocab = self._vocab[condition.field]
+                codes = [vocab[v] for v in condition.values if v in vocab]
+                mask &= np.isin(self._attr_arrays[condition.field], codes)
+            else:
+                values = self._attr_arrays[condition.field]
+                if condition.gte is not None:
+                    mask &= values >= condition.gte
+                if condition.lte is not None:
+                    mask &= values <= condition.lte
+        return mask
+
+    def _search_flat(self, query: np.ndarray, k: int, live: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        vectors = self._vector_rows()
+        candidates = np.flatnonzero(live)
+        if len(candidates) < self._row_count // 2:
+            # 只计算候选行
+            scores = np.empty(len(candidates), dtype=ROW_DTYPE)
+            for start in range(0, len(candidates), SEARCH_BLOCK_ROWS):
+                scores[start:start + SEARCH_BLOCK_ROWS] = vectors[candidates[start:start + SEARCH_BLOCK_ROWS]] @ query
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return candidates[top], scores[top]
+
+        scores = np.empty(self._row_count, dtype=ROW_DTYPE)
+        for start in range(0, self._row_count, SEARCH_BLOCK_ROWS):
+            scores[start:start + SEARCH_BLOCK_ROWS] = vectors[start:start + SEARCH_BLOCK_ROWS] @ query
+        scores[~live] = -np.inf
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return top, scores[top]
+
+    # ---- 量化 ----
+
+    def _ensure_quantized(self) -> QuantizedVectors:
+        """
+        为新追加的行计算量化编码 (按块读取向量文件); generation 变化时随状态一起重建
+        """
+        if self._quantized is None:
+            self._quantized = QuantizedVectors(self.quantization, self.dim)
+        start = len(self._quantized)
+        if start < self._row_count:
+            vectors = self._vector_rows()
+            for block in range(start, self._row_count, SEARCH_BLOCK_ROWS):
+                self._quantized.append(np.asarray(vectors[block:min(block + SEARCH_BLOCK_ROWS, self._row_count)]))
+        return self._quantized
+
+    def _search_quantized(self, query: np.ndarray, k: int, live: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        第一阶段按量化编码取 k * rescore_factor 个候选, 第二阶段读取候选的 float32 向量精确打分
+        """
+        quantized = self._ensure_quantized()
+        candidates = np.flatnonzero(live)
+        if len(candidates) < self._row_count // 2:
+            scores = quantized.scores(query, candidates)
+        else:
+            scores = quantized.scores(query)
+            scores[~live] = -np.inf
+            candidates = None
+        count = min(k * self.rescore_factor, len(scores))
+        top = np.argpartition(-scores, count - 1)[:count] if count < len(scores) else np.arange(len(scores))
+        rows = np.sort(top if candidates is None else candidates[top])
+        if candidates is None:
+            rows = rows[live[rows]]
+
+        exact = np.asarray(self._vector_rows()[rows]) @ query
+        best = np.argsort(-exact, kind="stable")[:k]
+        return rows[best], exact[best]
+
+    # ---- HNSW ----
+
+    def _hnsw_path(self) -> Path:
+        return self._gen_dir() / "hnsw.bin"
+
+    def _hnsw_mark_deleted(self, rows: Iterable[int]):
+        for row in rows:
+            try:
+                self._hnsw.mark_deleted(int(row))
+            except RuntimeError:
+                # 已标记删除
+                pass
+
+    def _ensure_hnsw(self):
+        """
+        构建或增量扩展 HNSW 图: 优先加载目录中的快照, 再补入快照之后追加的行
+        """
+        if self._hnsw is None:
+            index = hnswlib.Index(space="ip", dim=self.dim)
+            path = self._hnsw_path()
+            loaded = False
+            if path.exists():
+                try:
+                    index.load_index(str(path), max_elements=max(self._row_count, 1024))
+                    loaded = index.get_current_count() <= self._row_count
+                except RuntimeError as e:
+                    logger.warning(f"Failed to load HNSW snapshot {path}: {e}")
+            if not loaded:
+                index = hnswlib.Index(space="ip", dim=self.dim)
+                index.init_index(max_elements=max(self._row_count, 1024), ef_construction=self.ef_construction, M=self.hnsw_m)
+            self._hnsw = index
+            self._hnsw_count = self._hnsw_saved = index.get_current_count()
+            self._hnsw_mark_deleted(np.flatnonzero(self._deleted[:self._hnsw_count]))
+
+        if self._hnsw_count < self._row_count:
+            if self._row_count > self._hnsw.get_max_elements():
+                self._hnsw.resize_index(max(self._row_count, self._hnsw.get_max_elements() * 2))
+            vectors = self._vector_rows()
+            start = self._hnsw_count
+            self._hnsw.add_items(np.asarray(vectors[start:self._row_count]), np.arange(start, self._row_count))
+            self._hnsw_mark_deleted(start + np.flatnonzero(self._deleted[start:self._row_count]))
+            self._hnsw_count = self._row_count
+
+        # 新增超过 10% 时保存快照, 其他进程和重启后无需从头构建
+        if self._hnsw_count - self._hnsw_saved >= max(COMPACT_MIN_ROWS, self._hnsw_saved // 10):
+            tmp = self._gen_dir() / f".hnsw.{os.getpid()}.tmp"
+            try:
+                self._hnsw.save_index(str(tmp))
+                os.replace(tmp, self._hnsw_path())
+                self._hnsw_saved = self._hnsw_count
+            except (OSError, RuntimeError) as e:
+                logger.warning(f"Failed to save HNSW snapshot: {e}")
+
+    def _search_hnsw(self, query: np.ndarray, k: int, ef: int,
+                     live: Optional[np.ndarray] = None) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        self._ensure_hnsw()
+        self._hnsw.set_ef(max(ef, k))
+        try:
+            if live is None:
+                labels, distances = self._hnsw.knn_query(query, k=k)
+            else:
+                labels, distances = self._hnsw.knn_query(query, k=k, num_threads=1, filter=lambda label: bool(live[label]))
+        except RuntimeError as e:
+            # 删除标记过多时可能凑不满 k 个结果, 退化为精确检索
+            logger.warning(f"HNSW search failed, falling back to exact search: {e}")
+            return None, None
+        return labels[0].astype(np.int64), 1.0 - distances[0]
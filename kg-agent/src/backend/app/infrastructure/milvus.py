@@ -1,4 +1,8 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+import hashlib
+import json
+import threading
+import numpy as np
 from pymilvus import (
     connections,
     utility,
@@ -6,23 +10,130 @@ from pymilvus import (
     CollectionSchema, 
     DataType, 
     Collection,
+    MilvusException,
 )
+from pymilvus.exceptions import ParamError
+from pymilvus.grpc_gen import common_pb2
+from concurrent.futures import Future
 from app.config import get_settings
+from app.exceptions import ValidationError
+from app.models.document import TENANT_MAX_LENGTH, SOURCE_MAX_LENGTH
+from app.infrastructure.hits import SearchHit
+from app.infrastructure.write_buffer import WriteBuffer
+from app.utils.search_filters import ATTRIBUTE_FIELDS, FieldFilter, milvus_expr
 from app.utils.logger import logger
 
 settings = get_settings()
 
+INDEX_TYPES = ("IVF_FLAT", "IVF_SQ8", "HNSW")
+# 索引中只保存量化编码的类型, 检索结果按 float32 原向量重新打分
+QUANTIZED_INDEX_TYPES = ("IVF_SQ8",)
+# Milvus 单次检索的 limit 上限
+MAX_SEARCH_LIMIT = 16384
+# 可用于划分分区的文档属性 (取值个数有限的关键字字段); source 为自由文本, 取值没有上限, 不能用于分区
+PARTITION_FIELDS = ("tenant", "doc_type")
+DEFAULT_PARTITION = "_default"
+# 服务端参数非法的错误码 (Milvus 2.3 起; 更早的版本只有 compatible_code=IllegalArgument)
+PARAMETER_INVALID_CODE = 1100
+
+def partition_name(field: str, value: Any) -> str:
+    """
+    属性取值对应的分区名; 分区名只允许字母/数字/下划线, 取值 (可能为中文) 用摘要表示, 原值记录在分区描述中
+    """
+    return f"{field}_{hashlib.sha1(str(value).encode('utf-8')).hexdigest()[:16]}"
+
+def _take(column, rows: List[int]):
+    return column[rows] if isinstance(column, np.ndarray) else [column[i] for i in rows]
+
+def build_index_params(index_type: Optional[str] = None, nlist: Optional[int] = None, m: Optional[int] = None,
+                       ef_construction: Optional[int] = None) -> Dict[str, Any]:
+    """
+    向量字段的索引参数, 未指定的构建参数取配置值
+    """
+    index_type = (index_type or settings.MILVUS_INDEX_TYPE).upper()
+    if index_type == "HNSW":
+        params = {"M": m or settings.MILVUS_HNSW_M, "efConstruction": ef_construction or settings.MILVUS_HNSW_EF_CONSTRUCTION}
+    elif index_type in ("IVF_FLAT", "IVF_SQ8"):
+        params = {"nlist": nlist or settings.MILVUS_IVF_NLIST}
+    else:
+        raise ValueError(f"Unsupported Milvus index type '{index_type}', expected one of: {', '.join(INDEX_TYPES)}")
+    return {"metric_type": "COSINE", "index_type": index_type, "params": params}
+
+def build_search_params(index_type: str, top_k: int, effort: Optional[int] = None,
+                        nlist: Optional[int] = None) -> Dict[str, Any]:
+    """
+    检索参数: effort 为 IVF 索引的 nprobe 或 HNSW 索引的 ef (不小于 top_k), 未指定时取配置默认值
+
+    IVF 的 nprobe 不能超过索引的聚类数 nlist (未知时取 MILVUS_IVF_NLIST), 超出时 Milvus 拒绝请求, 因此截断到 nlist
+    """
+    if index_type == "HNSW":
+        params = {"ef": max(effort or settings.MILVUS_SEARCH_EF, top_k)}
+    else:
+        nprobe = effort or settings.MILVUS_SEARCH_NPROBE
+        params = {"nprobe": max(min(nprobe, nlist or settings.MILVUS_IVF_NLIST), 1)}
+    return {"metric_type": "COSINE", "params": params}
+
+def collection_index_params(collection: Collection, field: str = "embedding") -> Optional[Dict[str, Any]]:
+    """
+    读取集合上已建立的向量索引参数 {"index_type", "metric_type", "params"} (可能与当前配置不同)
+    """
+    for index in collection.indexes:
+        if index.field_name == field:
+            params = dict(index.params)
+            # 服务端返回的构建参数可能是 JSON 字符串
+            if isinstance(params.get("params"), str):
+                params["params"] = json.loads(params["params"])
+            return params
+    return None
+
+def collection_index_type(collection: Collection, field: str = "embedding") -> Optional[str]:
+    """
+    读取集合上已建立的向量索引类型 (可能与当前配置不同)
+    """
+    return (collection_index_params(collection, field) or {}).get("index_type")
+
+def is_parameter_error(e: MilvusException) -> bool:
+    """
+    请求参数非法 (客户端校验的 ParamError, 服务端的参数错误码): 与集合句柄无关, 重新获取句柄重试也不会成功
+    """
+    return isinstance(e, ParamError) or e.code == PARAMETER_INVALID_CODE \
+        or e.compatible_code == common_pb2.IllegalArgument
+
 class MilvusClient:
-    _instance = None
+    # 每个集合一个实例: 分块向量集合, 以及文档级向量集合 (见 app.services.centroid_service)
+    _instances: Dict[str, "MilvusClient"] = {}
     
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(MilvusClient, cls).__new__(cls)
-        return cls._instance
+    def __new__(cls, collection_name: Optional[str] = None):
+        name = collection_name or settings.MILVUS_COLLECTION
+        if name not in cls._instances:
+            cls._instances[name] = super(MilvusClient, cls).__new__(cls)
+        return cls._instances[name]
 
-    def __init__(self):
+    def __init__(self, collection_name: Optional[str] = None):
         self.alias = "default"
-        self.collection_name = settings.MILVUS_COLLECTION
+        self.collection_name = collection_name or settings.MILVUS_COLLECTION
+        # 常驻的集合句柄及其加载状态, 仅在集合被删除/重建或调用出错时失效重取
+        self._collection = None
+        self._loaded = False
+        self._collection_lock = threading.Lock()
+        # 集合上实际建立的索引类型及 IVF 聚类数, 决定检索参数
+        self.index_type = settings.MILVUS_INDEX_TYPE.upper()
+        self.nlist = None
+        # 分区字段, 以及已确认存在/已加载的分区名 (随集合句柄一起失效)
+        self.partition_field = settings.MILVUS_PARTITION_FIELD
+        if self.partition_field and self.partition_field not in PARTITION_FIELDS:
+            logger.error(
+                f"MILVUS_PARTITION_FIELD={self.partition_field} is not supported, expected one of: "
+                f"{', '.join(PARTITION_FIELDS)}; partitioning disabled"
+            )
+            self.partition_field = ""
+        self._partitions = set()
+        self._loaded_partitions = set()
+        self._default_has_rows = None
+        # 分区数达到上限后写入 _default 分区的取值
+        self._overflow = set()
+        # 进程内共享的写入缓冲, 首次写入时创建
+        self._writer = None
         if self._connect():
             try:
                 self._ensure_collection()
@@ -50,60 +161,476 @@ class MilvusClient:
                 FieldSchema(name="doc_id", dtype=DataType.VARCHAR, max_length=64),
                 FieldSchema(name="chunk_index", dtype=DataType.INT64),
                 FieldSchema(name="content", dtype=DataType.VARCHAR, max_length=4096), # Limit content stored in vector DB
-                FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=settings.MILVUS_DIMENSION)
+                FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=settings.MILVUS_DIMENSION),
+                # 文档级属性, 用于检索过滤 (见 app.utils.search_filters)
+                FieldSchema(name="doc_type", dtype=DataType.VARCHAR, max_length=32),
+                FieldSchema(name="tenant", dtype=DataType.VARCHAR, max_length=TENANT_MAX_LENGTH),
+                FieldSchema(name="source", dtype=DataType.VARCHAR, max_length=SOURCE_MAX_LENGTH),
+                FieldSchema(name="created_at", dtype=DataType.INT64)
             ]
             schema = CollectionSchema(fields, "KG Document Chunks")
             collection = Collection(self.collection_name, schema)
             
             # Create Index
-            index_params = {
-                "metric_type": "COSINE",
-                "index_type": "IVF_FLAT",
-                "params": {"nlist": 128}
-            }
+            index_params = build_index_params()
             collection.create_index("embedding", index_params)
-            logger.info("Milvus collection created and indexed.")
+            # 过滤字段的标量索引
+            for field in ATTRIBUTE_FIELDS:
+                collection.create_index(field, index_name=f"{field}_idx")
+            self._collection = collection
+            logger.info(f"Milvus collection created and indexed ({index_params['index_type']} {index_params['params']}).")
         else:
             logger.info(f"Milvus collection {self.collection_name} already exists.")
 
-    def insert_chunks(self, doc_id: str, chunks: List[Dict[str, Any]], embeddings: List[List[float]]):
+    def _get_collection(self, load: bool = False) -> Optional[Collection]:
+        """
+        获取常驻的集合句柄, 首次使用时检查集合是否存在; load=True 时确保集合已加载到 QueryNode (只加载一次)
+        """
+        collection = self._collection
+        if collection is not None and (self._loaded or not load):
+            return collection
+        with self._collection_lock:
+            if self._collection is None:
+                if not utility.has_collection(self.collection_name, using=self.alias):
+                    return None
+                self._collection = Collection(self.collection_name, using=self.alias)
+                self._loaded = False
+                index_params = collection_index_params(self._collection) or {}
+                index_type = index_params.get("index_type")
+                if index_type and index_type != settings.MILVUS_INDEX_TYPE.upper():
+                    logger.warning(
+                        f"Milvus collection {self.collection_name} has a {index_type} index, "
+                        f"MILVUS_INDEX_TYPE={settings.MILVUS_INDEX_TYPE} only applies to new collections"
+                    )
+                self.index_type = index_type or self.index_type
+                nlist = (index_params.get("params") or {}).get("nlist")
+                self.nlist = int(nlist) if nlist else None
+            if load and not self._loaded:
+                self._collection.load()
+                self._loaded = True
+                self._loaded_partitions = {p.name for p in self._collection.partitions}
+                logger.info(f"Milvus collection {self.collection_name} loaded")
+            return self._collection
+
+    def invalidate(self):
+        """
+        丢弃缓存的集合句柄和加载状态, 下次调用时重新获取 (集合被删除/重建或 schema 变更后)
+        """
+        with self._collection_lock:
+            self._collection = None
+            self._loaded = False
+            self._partitions = set()
+            self._loaded_partitions = set()
+            self._default_has_rows = None
+            self._overflow = set()
+
+    def _call(self, fn, load: bool = False, retry: bool = True):
+        """
+        在缓存的集合句柄上执行操作; 集合不存在时返回 None。
+        Milvus 报错时 (集合被删除重建, 被 release, schema 变更等) 丢弃句柄, 重新获取后重试一次;
+        retry=False 用于非幂等操作 (insert), 只丢弃句柄并抛出异常。参数错误直接抛出, 保留句柄
+        """
+        collection = self._get_collection(load)
+        if collection is None:
+            return None
+        try:
+            return fn(collection)
+        except MilvusException as e:
+            if is_parameter_error(e):
+                raise
+            logger.warning(f"Milvus call on {self.collection_name} failed ({e}), reloading collection handle")
+            self.invalidate()
+            if not retry:
+                raise
+            collection = self._get_collection(load)
+            if collection is None:
+                return None
+            return fn(collection)
+
+    def warmup(self):
+        """
+        预先获取并加载集合, 使第一次检索不承担加载耗时; API 启动时在后台线程调用
+        """
+        try:
+            # 按需加载时只获取句柄, 分区在第一次检索到时加载
+            if self._get_collection(load=not settings.MILVUS_LOAD_ON_DEMAND) is None:
+                logger.warning(f"Milvus collection {self.collection_name} not found, skipping warmup")
+        except Exception as e:
+            logger.warning(f"Milvus collection warmup failed: {e}")
+
+    # ---- 分区 ----
+
+    def _partitioned(self, collection: Collection) -> bool:
+        # 早于属性字段创建的集合没有分区字段, 不分区
+        return bool(self.partition_field) and any(f.name == self.partition_field for f in collection.schema.fields)
+
+    def _ensure_partition(self, collection: Collection, value: str) -> str:
+        """
+        返回取值对应的分区名, 分区不存在时创建 (多个 worker 并发创建时以已存在的为准);
+        集合的分区数达到 MILVUS_MAX_PARTITIONS 时不再创建, 返回 _default 分区 (检索时由表达式过滤)
+        """
+        name = partition_name(self.partition_field, value)
+        if name in self._partitions:
+            return name
+        if value in self._overflow:
+            return DEFAULT_PARTITION
+        with self._collection_lock:
+            if name not in self._partitions:
+                if not collection.has_partition(name):
+                    if len(collection.partitions) >= settings.MILVUS_MAX_PARTITIONS:
+                        logger.warning(
+                            f"Milvus collection {self.collection_name} reached MILVUS_MAX_PARTITIONS="
+                            f"{settings.MILVUS_MAX_PARTITIONS}, writing {self.partition_field}={value} to {DEFAULT_PARTITION}"
+                        )
+                        self._overflow.add(value)
+                        return DEFAULT_PARTITION
+                    description = json.dumps({"field": self.partition_field, "value": value}, ensure_ascii=False)
+                    try:
+                        collection.create_partition(name, description=description)
+                        logger.info(f"Created Milvus partition {name} for {self.partition_field}={value}")
+                    except MilvusException:
+                        if not collection.has_partition(name):
+                            raise
+                self._partitions.add(name)
+        return name
+
+    def _has_partition(self, collection: Collection, name: str) -> bool:
+        # 只缓存存在的分区, 其他进程随时可能创建新分区
+        if name in self._partitions:
+            return True
+        if collection.has_partition(name):
+            self._partitions.add(name)
+            return True
+        return False
+
+    def _partitions_for(self, collection: Collection, filters: Optional[List[FieldFilter]]) -> Optional[List[str]]:
+        """
+        过滤条件涉及的分区: 条件中没有分区字段时返回 None (检索整个集合)。
+        没有自己分区的取值 (尚未写入, 或分区数达到上限后写入 _default) 检索 _default 分区;
+        分区前写入的数据也留在 _default 分区, 其中有数据时一并检索 (均由表达式过滤)
+        """
+        if not self._partitioned(collection):
+            return None
+        values = next((f.values for f in filters or [] if f.field == self.partition_field and f.values is not None), None)
+        if values is None:
+            return None
+        names = list(dict.fromkeys(partition_name(self.partition_field, v) for v in values))
+        existing = [name for name in names if self._has_partition(collection, name)]
+        if len(existing) == len(names):
+            if self._default_has_rows is None:
+                self._default_has_rows = collection.partition(DEFAULT_PARTITION).num_entities > 0
+            if not self._default_has_rows:
+                return existing
+        return existing + [DEFAULT_PARTITION]
+
+    def _load_partitions(self, collection: Collection, names: List[str]):
+        """
+        加载尚未加载的分区 (整个集合已加载时, 之后新建的分区仍需单独加载)
+        """
+        if all(name in self._loaded_partitions for name in names):
+            return
+        with self._collection_lock:
+            missing = [name for name in names if name not in self._loaded_partitions]
+            if missing:
+                collection.load(partition_names=missing)
+                self._loaded_partitions.update(missing)
+                logger.info(f"Loaded Milvus partitions {missing}")
+
+    def _partition_names(self, values: List[str]) -> List[str]:
+        if not self.partition_field:
+            raise ValueError("MILVUS_PARTITION_FIELD is not configured")
+        return [partition_name(self.partition_field, v) for v in values]
+
+    def list_partitions(self) -> List[Dict[str, Any]]:
+        """
+        列出集合的分区: 分区名, 对应的属性取值, 行数 (已 flush 的部分) 和加载状态
+        """
+        def describe(collection):
+            partitions = []
+            for partition in collection.partitions:
+                try:
+                    value = json.loads(partition.description).get("value")
+                except (ValueError, AttributeError):
+                    value = None
+                state = utility.load_state(self.collection_name, partition_names=[partition.name], using=self.alias)
+                partitions.append({
+                    "name": partition.name,
+                    "field": self.partition_field if value is not None else None,
+                    "value": value,
+                    "rows": partition.num_entities,
+                    "load_state": getattr(state, "name", str(state))
+                })
+            return partitions
+
+        return self._call(describe) or []
+
+    def load_partitions(self, values: List[str]) -> List[str]:
+        """
+        加载指定取值的分区 (不存在的分区忽略), 返回加载的分区名
+        """
+        names = self._partition_names(values)
+
+        def load(collection):
+            existing = [name for name in names if self._has_partition(collection, name)]
+            if existing:
+                with self._collection_lock:
+                    collection.load(partition_names=existing)
+                    self._loaded_partitions.update(existing)
+            return existing
+
+        return self._call(load) or []
+
+    def release_partitions(self, values: List[str]) -> List[str]:
+        """
+        释放指定取值的分区以回收 QueryNode 内存, 返回释放的分区名; 之后的检索用到时会重新加载
+        """
+        names = self._partition_names(values)
+
+        def release(collection):
+            existing = [name for name in names if self._has_partition(collection, name)]
+            if existing:
+                with self._collection_lock:
+                    for name in existing:
+                        collection.partition(name).release()
+                    self._loaded_partitions.difference_update(existing)
+                    self._loaded = False
+            return existing
+
+        released = self._call(release) or []
+        if released:
+            logger.info(f"Released Milvus partitions {released}")
+        return released
+
+    def insert_chunks(self, doc_id: str, chunks: List[Dict[str, Any]], embeddings: np.ndarray,
+                      attributes: Optional[Dict[str, Any]] = None):
         """
         Insert chunks and embeddings into Milvus
         """
-        if not utility.has_collection(self.collection_name):
+        return self.insert_batch([(doc_id, chunks, embeddings, attributes)])
+
+    def insert_batch(self, items: List[Tuple[str, List[Dict[str, Any]], np.ndarray]]):
+        """
+        Insert chunks of many documents right away and return their primary keys
+
+        items: [(doc_id, chunks, embeddings, attributes), ...], embeddings 为 (len(chunks), dim) 的 float32 数组,
+        attributes 为文档的可过滤属性 (见 app.utils.search_filters.document_attributes), 可以为 None
+        """
+        future = self.insert_batch_async(items)
+        self._get_writer().drain()
+        return future.result()
+
+    def insert_batch_async(self, items: List[Tuple[str, List[Dict[str, Any]], np.ndarray]]) -> Future:
+        """
+        Buffer chunks of many documents for a batched insert shared by all tasks of this process
+
+        返回的 Future 在这些行被 Milvus 确认写入后得到主键, 写入失败时得到异常;
+        调用方在标记文档完成前等待它, 放弃写入时 (任务失败) 调用 cancel()
+        """
+        columns = {name: [] for name in ("doc_id", "chunk_index", "content") + ATTRIBUTE_FIELDS}
+        arrays = []
+        for doc_id, chunks, embeddings, attributes in items:
+            if not chunks:
+                continue
+            columns["doc_id"].extend([doc_id] * len(chunks))
+            columns["chunk_index"].extend(c['index'] for c in chunks)
+            columns["content"].extend(c['content'][:4000] for c in chunks) # content (truncated)
+            attributes = attributes or {}
+            for name in ATTRIBUTE_FIELDS:
+                columns[name].extend([attributes.get(name, 0 if name == "created_at" else "")] * len(chunks))
+            arrays.append(np.asarray(embeddings, dtype=np.float32))
+        if not arrays:
+            return self._get_writer().write({})
+        # 单个文档直接使用原数组, 不产生复制
+        columns["embedding"] = arrays[0] if len(arrays) == 1 else np.concatenate(arrays)
+        return self._get_writer().write(columns)
+
+    def _get_writer(self) -> WriteBuffer:
+        if self._writer is None:
+            with self._collection_lock:
+                if self._writer is None:
+                    self._writer = WriteBuffer(
+                        self._insert_rows,
+                        max_rows=settings.MILVUS_WRITE_BUFFER_ROWS,
+                        max_wait=settings.MILVUS_WRITE_BUFFER_MAX_WAIT,
+                        batch_rows=settings.MILVUS_INSERT_BATCH_SIZE,
+                        flush_fn=lambda: self._call(lambda collection: collection.flush()),
+                        flush_interval=settings.MILVUS_FLUSH_INTERVAL,
+                        name=f"milvus-writer-{self.collection_name}"
+                    )
+        return self._writer
+
+    def _insert_rows(self, columns: Dict[str, Any]) -> Optional[List[int]]:
+        """
+        写入一批按列组织的行, 不 flush, 段的封存交给 Milvus 自动完成
+
+        按集合 schema 的字段顺序取列, 早于属性字段创建的集合只写入其已有的字段;
+        配置了分区字段时按取值所在的分区分组写入, 主键按原行顺序返回
+        """
+        def insert(collection):
+            names = [f.name for f in collection.schema.fields if not f.auto_id]
+            if not self._partitioned(collection):
+                return list(collection.insert([columns[name] for name in names]).primary_keys)
+            partitions = {}
+            groups = {}
+            for row, value in enumerate(columns[self.partition_field]):
+                if value not in partitions:
+                    partitions[value] = self._ensure_partition(collection, value)
+                groups.setdefault(partitions[value], []).append(row)
+            if len(groups) == 1:
+                res = collection.insert([columns[name] for name in names], partition_name=next(iter(groups)))
+                return list(res.primary_keys)
+            keys = [None] * len(columns["doc_id"])
+            for partition, rows in groups.items():
+                res = collection.insert([_take(columns[name], rows) for name in names], partition_name=partition)
+                for row, key in zip(rows, res.primary_keys):
+                    keys[row] = key
+            return keys
+
+        keys = self._call(insert, retry=False)
+        if keys is None:
             logger.warning("Milvus collection not found, skipping insertion")
-            return []
+            return None
+        logger.info(f"Inserted {len(columns['doc_id'])} buffered chunks into Milvus")
+        return keys
+
+    def _drain_writes(self):
+        # 删除/读取前先写入本进程缓冲的行, 保证与写入的先后顺序
+        if self._writer is not None:
+            self._writer.drain()
 
-        collection = Collection(self.collection_name)
-        
-        data = [
-            [doc_id] * len(chunks),  # doc_id
-            [c['index'] for c in chunks], # chunk_index
-            [c['content'][:4000] for c in chunks], # content (truncated)
-            embeddings # embedding
+    def close(self):
+        """
+        写入剩余的缓冲行 (worker 进程退出前调用)
+        """
+        if self._writer is not None:
+            self._writer.close()
+
+    def write_stats(self) -> Dict[str, Any]:
+        return self._writer.stats() if self._writer is not None else {}
+
+    def delete_documents(self, doc_ids: List[str]):
+        """
+        Delete all chunks belonging to the given documents
+        """
+        if not doc_ids:
+            return
+        self._drain_writes()
+        expr = f"doc_id in {json.dumps(list(doc_ids))}"
+        if self._call(lambda collection: collection.delete(expr)) is None:
+            return
+        logger.info(f"Deleted Milvus chunks for {len(doc_ids)} documents")
+
+    def _chunk_expr(self, doc_id: str, chunk_indexes: List[int]) -> str:
+        return f"doc_id == {json.dumps(doc_id)} and chunk_index in {json.dumps([int(i) for i in chunk_indexes])}"
+
+    def get_chunk_vectors(self, doc_id: str, chunk_indexes: List[int],
+                          attributes: Optional[Dict[str, Any]] = None) -> Dict[int, np.ndarray]:
+        """
+        Fetch stored embeddings of the given chunks, keyed by chunk_index
+
+        attributes: 文档属性, 给出时只查询 (并按需加载) 文档所在的分区
+        """
+        if not chunk_indexes:
+            return {}
+        self._drain_writes()
+        filters = None
+        if self.partition_field and (attributes or {}).get(self.partition_field) is not None:
+            filters = [FieldFilter(self.partition_field, values=[attributes[self.partition_field]])]
+
+        def query(collection):
+            names = self._partitions_for(collection, filters)
+            if names is not None:
+                self._load_partitions(collection, names)
+            elif not self._loaded:
+                # 不能确定分区时加载整个集合
+                collection = self._get_collection(load=True)
+            return collection.query(
+                expr=self._chunk_expr(doc_id, chunk_indexes),
+                output_fields=["chunk_index", "embedding"],
+                partition_names=names
+            )
+
+        rows = self._call(query) or []
+        return {row["chunk_index"]: np.asarray(row["embedding"], dtype=np.float32) for row in rows}
+
+    def delete_chunks(self, doc_id: str, chunk_indexes: List[int]):
+        """
+        Delete the given chunks of a document
+        """
+        if not chunk_indexes:
+            return
+        self._drain_writes()
+        if self._call(lambda collection: collection.delete(self._chunk_expr(doc_id, chunk_indexes))) is None:
+            return
+        logger.info(f"Deleted {len(chunk_indexes)} Milvus chunks of document {doc_id}")
+
+    def _rescore(self, collection: Collection, query_embedding: List[float], hits, top_k: int,
+                 partition_names: Optional[List[str]] = None) -> List[SearchHit]:
+        """
+        读取候选的 float32 向量重新计算余弦相似度, 返回前 top_k 个 (与 pymilvus 的 hit 相同的访问方式)
+        """
+        hits = list(hits)
+        if not hits:
+            return []
+        rows = collection.query(
+            expr=f"id in {json.dumps([hit.id for hit in hits])}",
+            output_fields=["id", "embedding"],
+            partition_names=partition_names
+        )
+        vectors = {row["id"]: row["embedding"] for row in rows}
+        hits = [hit for hit in hits if hit.id in vectors]
+        if not hits:
+            return []
+        matrix = np.asarray([vectors[hit.id] for hit in hits], dtype=np.float32)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        scores = (matrix @ query) / np.clip(np.linalg.norm(matrix, axis=1) * np.linalg.norm(query), 1e-12, None)
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return [
+            SearchHit(hits[i].id, float(scores[i]), {f: hits[i].entity.get(f) for f in ("doc_id", "chunk_index", "content")})
+            for i in order
         ]
-        
-        res = collection.insert(data)
-        collection.flush()
-        logger.info(f"Inserted {len(chunks)} chunks into Milvus. IDs: {res.primary_keys}")
-        return res.primary_keys
 
-    def search(self, query_embedding: List[float], top_k: int = 5):
-        if not utility.has_collection(self.collection_name):
+    def search(self, query_embedding: List[float], top_k: int = 5, effort: Optional[int] = None,
+               filters: Optional[List[FieldFilter]] = None):
+        """
+        effort: 单次检索的强度 (IVF 的 nprobe / HNSW 的 ef), 越小越快, 召回率越低; None 时取配置默认值
+        filters: 过滤条件 (见 app.utils.search_filters), 转换为布尔表达式在 ANN 检索时预过滤;
+                 包含分区字段的条件时只加载和检索对应的分区
+        量化索引 (IVF_SQ8) 取 top_k * VECTOR_RESCORE_FACTOR 个候选, 按 float32 原向量重新打分后取前 top_k 个
+        """
+        expr = milvus_expr(filters or [])
+        rescore = self.index_type in QUANTIZED_INDEX_TYPES and settings.VECTOR_RESCORE_FACTOR > 1
+        limit = min(top_k * settings.VECTOR_RESCORE_FACTOR, MAX_SEARCH_LIMIT) if rescore else top_k
+
+        def search(collection):
+            missing = {f.field for f in filters or []} - {f.name for f in collection.schema.fields}
+            if missing:
+                raise ValidationError(
+                    message="向量集合不支持按这些字段过滤, 需要重建集合并重新索引文档",
+                    details={"collection": self.collection_name, "fields": sorted(missing)}
+                )
+            names = self._partitions_for(collection, filters)
+            if names is not None:
+                self._load_partitions(collection, names)
+            elif not self._loaded:
+                collection = self._get_collection(load=True)
+            results = collection.search(
+                data=[query_embedding], 
+                anns_field="embedding", 
+                param=build_search_params(self.index_type, limit, effort, self.nlist), 
+                limit=limit, 
+                expr=expr or None,
+                output_fields=["doc_id", "chunk_index", "content"],
+                partition_names=names
+            )
+            if rescore:
+                return [self._rescore(collection, query_embedding, hits, top_k, names) for hits in results]
+            return results
+
+        results = self._call(search)
+        if results is None:
             logger.warning("Milvus collection not found, returning empty results")
             return []
-            
-        collection = Collection(self.collection_name)
-        collection.load()
-        
-        search_params = {"metric_type": "COSINE", "params": {"nprobe": 10}}
-        results = collection.search(
-            data=[query_embedding], 
-            anns_field="embedding", 
-            param=search_params, 
-            limit=top_k, 
-            output_fields=["doc_id", "chunk_index", "content"]
-        )
         return results
 
 milvus_client = MilvusClient()
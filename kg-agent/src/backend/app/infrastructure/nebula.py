@@ -2,7 +2,8 @@ from nebula3.gclient.net import ConnectionPool
 from nebula3.Config import Config
 from app.config import get_settings
 from app.utils.logger import logger
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import json
 
 settings = get_settings()
 
@@ -70,32 +71,84 @@ class NebulaClient:
         except Exception as e:
             logger.error(f"Nebula schema init failed: {e}")
 
-    def insert_structure(self, doc_id: str, chunks: List[Dict[str, Any]]):
+    @staticmethod
+    def quote(value: Any) -> str:
+        """Quote a value as an nGQL string literal"""
+        return json.dumps(str(value), ensure_ascii=False)
+
+    def insert_rows(self, prefix: str, rows: List[str], batch_size: Optional[int] = None):
+        """
+        Execute multi-row INSERT statements in a single session
+
+        e.g. prefix='INSERT VERTEX Chunk(index)', rows=['"c1":(0)', '"c2":(1)']
+        """
+        if not rows:
+            return
+        batch_size = batch_size or settings.NEBULA_INSERT_BATCH_SIZE
+        with self.pool.session_context(settings.NEBULA_USER, settings.NEBULA_PASSWORD) as session:
+            session.execute(f"USE {settings.NEBULA_SPACE};")
+            for i in range(0, len(rows), batch_size):
+                query = f"{prefix} VALUES {', '.join(rows[i:i + batch_size])};"
+                resp = session.execute(query)
+                if not resp.is_succeeded():
+                    logger.error(f"Nebula query failed: {resp.error_msg()}")
+                    raise Exception(resp.error_msg())
+
+    def insert_structure(self, doc_id: str, chunks: List[Dict[str, Any]], filename: str = "unknown", doc_type: str = "txt"):
         """
         Insert Document -> Chunk structure
         """
+        self.insert_structure_batch([
+            {"doc_id": doc_id, "chunks": chunks, "filename": filename, "doc_type": doc_type}
+        ])
+
+    def insert_structure_batch(self, docs: List[Dict[str, Any]]):
+        """
+        Insert Document -> Chunk structure for many documents with multi-row statements
+
+        Each item: {"doc_id", "chunks", "filename"?, "doc_type"?}
+        """
         try:
-            with self.pool.session_context(settings.NEBULA_USER, settings.NEBULA_PASSWORD) as session:
-                session.execute(f"USE {settings.NEBULA_SPACE};")
-                
-                # Insert Document Vertex
-                # VERTEX Document VALUES "doc_id":("filename", "type")
-                # TODO: Pass filename/type
-                session.execute(f'INSERT VERTEX Document(filename, type) VALUES "{doc_id}":("unknown", "txt");')
-                
-                # Insert Chunk Vertices and Edges
-                # INSERT VERTEX Chunk(index) VALUES "chunk_id":(0)
-                # INSERT EDGE HAS_CHUNK() VALUES "doc_id"->"chunk_id":()
-                
-                for chunk in chunks:
-                    chunk_id = f"{doc_id}_c{chunk['index']}"
-                    session.execute(f'INSERT VERTEX Chunk(index) VALUES "{chunk_id}":({chunk["index"]});')
-                    session.execute(f'INSERT EDGE HAS_CHUNK() VALUES "{doc_id}"->"{chunk_id}":();')
-                    
-            logger.info(f"Inserted graph structure for {doc_id}")
+            doc_rows = []
+            chunk_rows = []
+            edge_rows = []
+            for doc in docs:
+                doc_id = doc["doc_id"]
+                doc_rows.append(
+                    f'{self.quote(doc_id)}:({self.quote(doc.get("filename") or "unknown")}, {self.quote(doc.get("doc_type") or "txt")})'
+                )
+                for chunk in doc["chunks"]:
+                    chunk_id = self.quote(f"{doc_id}_c{chunk['index']}")
+                    chunk_rows.append(f'{chunk_id}:({int(chunk["index"])})')
+                    edge_rows.append(f'{self.quote(doc_id)}->{chunk_id}:()')
+
+            self.insert_rows("INSERT VERTEX Document(filename, type)", doc_rows)
+            self.insert_rows("INSERT VERTEX Chunk(index)", chunk_rows)
+            self.insert_rows("INSERT EDGE HAS_CHUNK()", edge_rows)
+
+            logger.info(f"Inserted graph structure for {len(docs)} documents ({len(chunk_rows)} chunks)")
         except Exception as e:
             logger.error(f"Failed to insert graph structure: {e}")
     
+    def delete_chunks(self, doc_id: str, chunk_indexes: List[int]):
+        """
+        Delete Chunk vertices (and their HAS_CHUNK edges) of a document
+        """
+        if not chunk_indexes:
+            return
+        try:
+            vids = [self.quote(f"{doc_id}_c{int(index)}") for index in chunk_indexes]
+            with self.pool.session_context(settings.NEBULA_USER, settings.NEBULA_PASSWORD) as session:
+                session.execute(f"USE {settings.NEBULA_SPACE};")
+                batch_size = settings.NEBULA_INSERT_BATCH_SIZE
+                for i in range(0, len(vids), batch_size):
+                    resp = session.execute(f"DELETE VERTEX {', '.join(vids[i:i + batch_size])} WITH EDGE;")
+                    if not resp.is_succeeded():
+                        raise Exception(resp.error_msg())
+            logger.info(f"Deleted {len(vids)} chunk vertices of document {doc_id}")
+        except Exception as e:
+            logger.error(f"Failed to delete chunk vertices: {e}")
+
     def query_entities(self, keywords: List[str], depth: int = 2, limit: int = 50):
         """
         Query entities and their relationships based on keywords
@@ -0,0 +1,37 @@
+"""
+向量存储选择: VECTOR_STORE=milvus 使用 Milvus 服务, local 使用进程内向量索引 (见 app.infrastructure.local_vector)
+
+两者提供相同的接口: insert_chunks / insert_batch / search / delete_documents / delete_chunks / get_chunk_vectors
+"""
+import os
+from typing import Optional
+
+from app.config import get_settings
+
+settings = get_settings()
+
+def create_vector_store(name: Optional[str] = None):
+    """
+    按配置创建向量存储; 延迟导入, local 模式下不需要安装或连接 Milvus
+
+    name: 独立的附加索引名 (如文档级向量 "centroids"), 对应 Milvus 集合 <MILVUS_COLLECTION>_<name>
+          或本地目录 LOCAL_VECTOR_DIR/<name>; 不指定时为分块向量存储
+    """
+    if settings.VECTOR_STORE == "local":
+        from app.infrastructure.local_vector import LocalVectorIndex
+        return LocalVectorIndex(
+            os.path.join(settings.LOCAL_VECTOR_DIR, name) if name else settings.LOCAL_VECTOR_DIR,
+            settings.MILVUS_DIMENSION,
+            index_type=settings.LOCAL_VECTOR_INDEX,
+            hnsw_m=settings.LOCAL_HNSW_M,
+            ef_construction=settings.LOCAL_HNSW_EF_CONSTRUCTION,
+            ef_search=settings.LOCAL_HNSW_EF_SEARCH,
+            quantization=settings.LOCAL_VECTOR_QUANTIZATION,
+            rescore_factor=settings.VECTOR_RESCORE_FACTOR
+        )
+    if settings.VECTOR_STORE != "milvus":
+        raise ValueError(f"Unknown VECTOR_STORE '{settings.VECTOR_STORE}', expected milvus or local")
+    from app.infrastructure.milvus import MilvusClient, milvus_client
+    return MilvusClient(f"{settings.MILVUS_COLLECTION}_{name}") if name else milvus_client
+
+vector_store = create_vector_store()
@@ -0,0 +1,201 @@
+"""
+向量写入缓冲: 在一个进程内跨文档汇聚分块行, 按行数/等待时间阈值批量写入
+
+每次 flush() 都会封存一个段, 逐文档 flush 会产生大量小段并拖慢检索。缓冲区改为:
+- 累计行数达到 max_rows 时由写入方线程立即写入, 否则由后台线程在最早的一行等待 max_wait 秒后写入
+- 写入 RPC 被确认即视为持久 (Milvus 在确认 insert 前已写入日志存储), 段的封存交给 Milvus 自动 flush;
+  flush_interval > 0 时额外按间隔显式 flush
+- write() 接收按列组织的行 ({字段: 列表或数组}), 返回 concurrent.futures.Future, 行写入确认后得到这些行的主键, 写入失败时得到异常;
+  调用方在标记文档完成前等待 Future, 尚未写入的 Future 可以 cancel() 撤回
+"""
+import atexit
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.utils.logger import logger
+
+class WriteBuffer:
+    def __init__(self, insert_fn: Callable[[Dict[str, Any]], Optional[Sequence[Any]]], max_rows: int = 8192,
+                 max_wait: float = 1.0, batch_rows: int = 2048, flush_fn: Optional[Callable[[], None]] = None,
+                 flush_interval: float = 0.0, name: str = "write-buffer"):
+        """
+        Args:
+            insert_fn: 写入一批按列组织的行 {字段: 列}, 返回主键列表 (目标不存在时返回 None)
+            max_rows: 缓冲行数达到该值时立即写入
+            max_wait: 缓冲中最早的行最多等待的秒数
+            batch_rows: 单次 insert_fn 调用的最大行数
+            flush_fn: 显式封存段的回调, flush_interval > 0 时使用
+            flush_interval: 两次显式 flush 的最小间隔秒数, 0 表示不显式 flush
+        """
+        self.insert_fn = insert_fn
+        self.max_rows = max_rows
+        self.max_wait = max_wait
+        self.batch_rows = batch_rows
+        self.flush_fn = flush_fn
+        self.flush_interval = flush_interval
+        self.name = name
+
+        self._cond = threading.Condition()
+        # 保证各批按提交顺序写入
+        self._insert_lock = threading.Lock()
+        self._pending = []
+        self._pending_rows = 0
+        self._oldest = 0.0
+        self._last_flush = time.monotonic()
+        self._thread = None
+        self._pid = None
+        self._closed = False
+        self._stats = {"writes": 0, "rows": 0, "inserts": 0, "flushes": 0, "failures": 0}
+
+    def write(self, columns: Dict[str, Any]) -> Future:
+        """
+        缓冲一组行 ({字段: 等长的列表或数组}), 返回在这些行写入确认后完成的 Future
+        """
+        future = Future()
+        rows = len(next(iter(columns.values()))) if columns else 0
+        if not rows:
+            future.set_result([])
+            return future
+
+        with self._cond:
+            self._ensure_thread()
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.append((future, rows, columns))
+            self._pending_rows += rows
+            self._stats["writes"] += 1
+            full = self._pending_rows >= self.max_rows
+            self._cond.notify()
+        if full:
+            self.drain()
+        return future
+
+    def drain(self):
+        """
+        立即写入当前缓冲的全部行 (删除/读取已写入数据前调用, 保证顺序)
+        """
+        with self._insert_lock:
+            with self._cond:
+                entries, self._pending, self._pending_rows = self._pending, [], 0
+            # 已被调用方撤回的行不再写入
+            entries = [e for e in entries if e[0].set_running_or_notify_cancel()]
+            if entries:
+                self._insert(entries)
+            if self.flush_fn is not None and self.flush_interval > 0 \
+                    and time.monotonic() - self._last_flush >= self.flush_interval:
+                self._last_flush = time.monotonic()
+                try:
+                    self.flush_fn()
+                    self._stats["flushes"] += 1
+                except Exception as e:
+                    logger.warning(f"{self.name}: periodic flush failed: {e}")
+
+    def _insert(self, entries: List[tuple]):
+        columns = {}
+        for name in entries[0][2]:
+            parts = [entry[2][name] for entry in entries]
+            if isinstance(parts[0], np.ndarray):
+                columns[name] = parts[0] if len(parts) == 1 else np.concatenate(parts)
+            else:
+                columns[name] = [value for part in parts for value in part]
+        total = sum(entry[1] for entry in entries)
+
+        primary_keys = []
+        try:
+            found = self._insert_columns(columns, total, primary_keys)
+        except Exception as e:
+            self._stats["failures"] += 1
+            if len(entries) == 1:
+                logger.error(f"{self.name}: failed to write {total} buffered rows: {e}")
+                entries[0][0].set_exception(e)
+                return
+            # 一组行的数据有问题 (如字段超长) 会使整批失败, 逐组重试, 只让出问题的一组失败
+            logger.warning(f"{self.name}: failed to write {total} buffered rows ({e}), retrying {len(entries)} writes one by one")
+            self._retry_entries(entries, primary_keys)
+            return
+
+        self._stats["rows"] += total
+        offset = 0
+        for future, count, _ in entries:
+            future.set_result(list(primary_keys[offset:offset + count]) if found else [])
+            offset += count
+
+    def _insert_columns(self, columns: Dict[str, Any], total: int, primary_keys: List[Any]) -> bool:
+        """
+        按 batch_rows 分片写入, 主键追加到 primary_keys (失败时其中为已确认写入的前缀); 目标不存在时返回 False
+        """
+        for start in range(0, total, self.batch_rows):
+            end = start + self.batch_rows
+            keys = self.insert_fn({name: column[start:end] for name, column in columns.items()})
+            self._stats["inserts"] += 1
+            if keys is None:
+                return False
+            primary_keys.extend(keys)
+        return True
+
+    def _retry_entries(self, entries: List[tuple], written: List[Any]):
+        """
+        整批写入失败后逐组重试: 已确认写入的前缀不再重复写入, 跨越失败分片的一组只写入剩余的行
+        """
+        offset = 0
+        for future, count, columns in entries:
+            done = min(max(len(written) - offset, 0), count)
+            primary_keys = list(written[offset:offset + done])
+            offset += count
+            if done < count:
+                try:
+                    remaining = {name: column[done:] for name, column in columns.items()}
+                    if not self._insert_columns(remaining, count - done, primary_keys):
+                        primary_keys = []
+                except Exception as e:
+                    self._stats["failures"] += 1
+                    logger.error(f"{self.name}: failed to write {count} buffered rows: {e}")
+                    future.set_exception(e)
+                    continue
+            self._stats["rows"] += count
+            future.set_result(primary_keys)
+
+    def _ensure_thread(self):
+        # 延迟到首次写入时启动, fork 出的子进程各自启动自己的后台线程
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        if self._pid != os.getpid():
+            atexit.register(self.close)
+        self._pid = os.getpid()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                remaining = self._oldest + self.max_wait - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+            try:
+                self.drain()
+            except Exception as e:
+                logger.error(f"{self.name}: background drain failed: {e}")
+
+    def close(self):
+        """
+        写入剩余的缓冲行并停止后台线程 (进程退出前调用)
+        """
+        self.drain()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return dict(self._stats, pending_rows=self._pending_rows)
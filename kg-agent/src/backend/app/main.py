@@ -1,3 +1,4 @@
+import threading
 from flask import Flask
 from app.api import blueprint as api_blueprint
 from app.config import get_settings
@@ -17,6 +18,19 @@ def create_app():
     
     # Initialize storage connections
     init_storage()
+
+    # 后台预加载嵌入模型, 常驻内存供查询使用
+    if settings.EMBEDDING_WARMUP and not settings.EMBEDDING_SERVER_SOCKET:
+        from app.services.embedding_service import embedding_service
+        threading.Thread(target=embedding_service.warmup, name="embedding-warmup", daemon=True).start()
+
+    # 后台加载向量集合, 第一次检索无需等待 load
+    if settings.VECTOR_STORE_WARMUP:
+        from app.infrastructure.vector_store import vector_store
+        threading.Thread(target=vector_store.warmup, name="vector-store-warmup", daemon=True).start()
+        if settings.DOC_CENTROIDS_ENABLED:
+            from app.services.centroid_service import centroid_service
+            threading.Thread(target=lambda: centroid_service.store.warmup(), name="centroid-store-warmup", daemon=True).start()
     
     return app
 
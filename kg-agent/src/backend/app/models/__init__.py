@@ -1,10 +1,10 @@
-from app.models.document import Document, DocumentMetadata, Chunk, DocumentType, ProcessingStatus
+from app.models.document import Document, DocumentMetadata, DocumentAttributes, Chunk, DocumentType, ProcessingStatus, PipelineStage
 from app.models.search import SearchQuery, SearchResponse, SearchResultItem, SearchMode
 from app.models.graph import GraphEntity, GraphRelation, GraphData, GraphQuery, GraphResult
 from app.models.task import TaskStatus, TaskResult
 
 __all__ = [
-    "Document", "DocumentMetadata", "Chunk", "DocumentType", "ProcessingStatus",
+    "Document", "DocumentMetadata", "DocumentAttributes", "Chunk", "DocumentType", "ProcessingStatus", "PipelineStage",
     "SearchQuery", "SearchResponse", "SearchResultItem", "SearchMode",
     "GraphEntity", "GraphRelation", "GraphData", "GraphQuery", "GraphResult",
     "TaskStatus", "TaskResult"
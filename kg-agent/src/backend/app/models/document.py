@@ -16,6 +16,22 @@ class ProcessingStatus(str, Enum):
     COMPLETED = "completed"
     FAILED = "failed"
 
+class PipelineStage(str, Enum):
+    QUEUED = "queued"
+    EXTRACTING = "extracting"
+    CHUNKING = "chunking"
+    INDEXING = "indexing"
+    DONE = "done"
+
+# 文档可过滤属性的最大长度, 与 Milvus 集合中对应 VARCHAR 字段的 max_length 一致
+TENANT_MAX_LENGTH = 64
+SOURCE_MAX_LENGTH = 128
+
+class DocumentAttributes(BaseModel):
+    """文档可过滤属性 (上传/批量导入时指定)"""
+    tenant: Optional[str] = Field(None, max_length=TENANT_MAX_LENGTH, description="所属租户/部门")
+    source: Optional[str] = Field(None, max_length=SOURCE_MAX_LENGTH, description="文档来源")
+
 class DocumentMetadata(BaseModel):
     """文档元数据模型"""
     title: str = Field(..., description="文档标题")
@@ -44,6 +60,7 @@ class Document(BaseModel):
     type: DocumentType = Field(..., description="文档类型")
     metadata: DocumentMetadata = Field(..., description="文档元数据")
     status: ProcessingStatus = Field(default=ProcessingStatus.PENDING, description="处理状态")
+    stage: Optional[PipelineStage] = Field(None, description="当前流水线阶段")
     chunks: List[Chunk] = Field(default_factory=list, description="文档分块列表")
     error_message: Optional[str] = Field(None, description="错误信息")
     processed_at: Optional[datetime] = Field(None, description="处理完成时间")
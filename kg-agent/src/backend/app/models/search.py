@@ -14,9 +14,12 @@ class SearchQuery(BaseModel):
     query: str = Field(..., min_length=1, description="搜索关键词或问题")
     mode: SearchMode = Field(default=SearchMode.HYBRID, description="检索模式")
     top_k: int = Field(default=10, ge=1, le=100, description="返回结果数量")
-    threshold: float = Field(default=0.5, ge=0.0, le=1.0, description="相关性阈值")
+    threshold: Optional[float] = Field(default=None, ge=0.0, le=1.0, description="向量结果的相似度阈值 (余弦相似度), 低于该值的向量结果在融合前丢弃, 不指定时不过滤")
     filters: Optional[Dict[str, Any]] = Field(default=None, description="过滤条件")
     rerank: bool = Field(default=True, description="是否启用重排序")
+    search_effort: Optional[int] = Field(default=None, ge=1, le=4096, description="向量检索强度 (IVF 的 nprobe / HNSW 的 ef), 越小越快召回率越低, 不指定时使用配置默认值")
+    candidate_docs: Optional[int] = Field(default=None, ge=0, le=10000, description="两阶段向量检索第一阶段的候选文档数, 0 表示直接检索全部分块, 不指定时使用配置默认值")
+    candidate_chunks: Optional[int] = Field(default=None, ge=1, le=1000, description="两阶段向量检索第二阶段在候选文档中检索的分块数, 不指定时使用配置默认值")
 
 class SearchResultItem(BaseModel):
     """单条检索结果"""
@@ -0,0 +1,147 @@
+"""
+文档级向量 (文档全部分块向量的均值) 与两阶段检索
+
+入库时在 Redis 中按文档记录分块向量之和与分块数, 文档更新时按新增/删除的分块增量修正;
+均值写入独立的小索引 (Milvus 集合 <MILVUS_COLLECTION>_centroids 或本地目录 LOCAL_VECTOR_DIR/centroids, 每个文档一行)。
+检索时第一阶段在文档向量上选出候选文档, 第二阶段只在这些文档的分块中检索 (doc_id 过滤条件下推到向量存储)。
+"""
+import base64
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import get_settings
+from app.infrastructure.vector_store import create_vector_store, vector_store
+from app.utils.cache_manager import get_redis_client
+from app.utils.logger import logger
+from app.utils.search_filters import FieldFilter
+
+settings = get_settings()
+
+CENTROID_INDEX = "centroids"
+
+
+class CentroidService:
+    KEY_PREFIX = "kg:centroid"
+
+    def __init__(self):
+        self._store = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.DOC_CENTROIDS_ENABLED
+
+    @property
+    def store(self):
+        """
+        文档级向量索引, 首次使用时创建
+        """
+        if self._store is None:
+            self._store = create_vector_store(CENTROID_INDEX)
+        return self._store
+
+    def _key(self, doc_id: str) -> str:
+        return f"{self.KEY_PREFIX}:{doc_id}"
+
+    def _load_state(self, doc_id: str) -> Optional[Tuple[np.ndarray, int]]:
+        try:
+            state = get_redis_client().hgetall(self._key(doc_id))
+        except Exception as e:
+            logger.warning(f"Failed to read centroid state for document {doc_id}: {e}")
+            return None
+        if not state:
+            return None
+        return np.frombuffer(base64.b64decode(state["sum"]), dtype=np.float64).copy(), int(state["count"])
+
+    def _save(self, docs: List[Tuple[str, np.ndarray, int, Optional[Dict[str, Any]]]]):
+        """
+        覆盖写入文档向量 (分块数为 0 的文档只删除), 写入确认后再记录分块向量之和与分块数
+        """
+        store = self.store
+        store.delete_documents([doc_id for doc_id, _, _, _ in docs])
+        items = [
+            (doc_id, [{"index": 0, "content": ""}], (total / count).astype(np.float32)[None, :], attributes)
+            for doc_id, total, count, attributes in docs if count > 0
+        ]
+        if items:
+            store.insert_batch(items)
+        try:
+            pipe = get_redis_client().pipeline()
+            for doc_id, total, count, _ in docs:
+                if count > 0:
+                    pipe.hset(self._key(doc_id), mapping={
+                        "sum": base64.b64encode(total.astype(np.float64).tobytes()).decode("ascii"),
+                        "count": count
+                    })
+                else:
+                    pipe.delete(self._key(doc_id))
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to store centroid state for {len(docs)} documents: {e}")
+
+    def set_documents(self, docs: Sequence[Tuple[str, Any, Optional[Dict[str, Any]]]]):
+        """
+        按文档的全部分块向量计算文档向量 (首次入库 / 全量重建)
+
+        docs: [(doc_id, 分块向量 (n, dim), attributes), ...]
+        """
+        if not self.enabled or not docs:
+            return
+        states = []
+        for doc_id, embeddings, attributes in docs:
+            vectors = np.asarray(embeddings, dtype=np.float64)
+            total = vectors.sum(axis=0) if len(vectors) else np.zeros(0)
+            states.append((doc_id, total, len(vectors), attributes))
+        self._save(states)
+
+    def update_document(self, doc_id: str, added: Sequence[Any], removed: Sequence[Any],
+                        attributes: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        按新增/删除分块的向量增量修正文档向量
+
+        没有之前的状态 (文档在启用前入库, 或 Redis 数据丢失) 时返回 False, 由调用方按全部分块调用 set_documents
+        """
+        if not self.enabled:
+            return True
+        state = self._load_state(doc_id)
+        if state is None:
+            return False
+        total, count = state
+        for vectors, sign in ((added, 1), (removed, -1)):
+            if len(vectors):
+                vectors = np.asarray(vectors, dtype=np.float64)
+                if vectors.shape[1] != total.shape[0]:
+                    return False
+                total += sign * vectors.sum(axis=0)
+                count += sign * len(vectors)
+        self._save([(doc_id, total, max(count, 0), attributes)])
+        return True
+
+    def candidate_documents(self, embedding: List[float], count: int, filters: Optional[List[FieldFilter]] = None,
+                            effort: Optional[int] = None) -> List[str]:
+        """
+        第一阶段: 与查询最相近的 count 个文档
+        """
+        results = self.store.search(embedding, top_k=count, effort=effort, filters=filters)
+        return [hit.entity.get("doc_id") for hits in results for hit in hits]
+
+    def search(self, embedding: List[float], top_k: int, doc_candidates: int, chunk_candidates: int = 0,
+               effort: Optional[int] = None, filters: Optional[List[FieldFilter]] = None):
+        """
+        两阶段检索, 返回与 vector_store.search 相同结构的结果
+
+        doc_candidates: 第一阶段选出的候选文档数
+        chunk_candidates: 第二阶段在候选文档的分块中检索的条数 (不小于 top_k), 结果取前 top_k 条
+        """
+        doc_ids = self.candidate_documents(embedding, doc_candidates, filters, effort)
+        if not doc_ids:
+            return []
+        results = vector_store.search(
+            embedding,
+            top_k=max(chunk_candidates, top_k),
+            effort=effort,
+            filters=list(filters or []) + [FieldFilter("doc_id", values=doc_ids)]
+        )
+        return [list(hits)[:top_k] for hits in results]
+
+centroid_service = CentroidService()
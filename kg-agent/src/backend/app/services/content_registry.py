@@ -0,0 +1,106 @@
+"""
+内容哈希注册表，记录 (租户, 文件内容哈希) -> 文档ID 的映射，用于上传去重；
+以及 文档ID -> 分块内容哈希序列，用于文档更新时的增量重建索引
+
+去重按租户隔离: 不同租户上传相同内容时各自建立文档, 检索按 tenant 过滤时都能命中
+"""
+import json
+from typing import List, Optional
+
+from app.utils.cache_manager import get_redis_client
+from app.utils.logger import logger
+
+
+class ContentRegistry:
+    KEY_PREFIX = "kg:content"
+    CHUNKS_KEY_PREFIX = "kg:chunks"
+    # 仍由 expected 持有 (或已不存在) 时改为登记给新文档, 返回最终持有者
+    REPLACE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current == false or current == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2])
+    return ARGV[2]
+end
+return current
+"""
+
+    def _key(self, content_hash: str, tenant: Optional[str] = None) -> str:
+        # 未指定租户的文档沿用原有的键
+        if tenant:
+            return f"{self.KEY_PREFIX}:{tenant}:{content_hash}"
+        return f"{self.KEY_PREFIX}:{content_hash}"
+
+    def _chunks_key(self, doc_id: str) -> str:
+        return f"{self.CHUNKS_KEY_PREFIX}:{doc_id}"
+
+    def lookup(self, content_hash: str, tenant: Optional[str] = None) -> Optional[str]:
+        """
+        查找租户内内容哈希对应的文档ID, 不存在时返回 None
+        """
+        try:
+            return get_redis_client().get(self._key(content_hash, tenant))
+        except Exception as e:
+            logger.warning(f"Content registry lookup failed: {e}")
+            return None
+
+    def claim(self, content_hash: str, doc_id: str, tenant: Optional[str] = None) -> str:
+        """
+        为文档登记租户内的内容哈希 (SETNX), 返回最终持有该哈希的文档ID
+
+        并发上传相同内容时只有一个文档登记成功, 其余调用方拿到胜出者的ID。
+        Redis 不可用时视为登记成功, 退化为不去重。
+        """
+        key = self._key(content_hash, tenant)
+        try:
+            client = get_redis_client()
+            if client.set(key, doc_id, nx=True):
+                return doc_id
+            return client.get(key) or doc_id
+        except Exception as e:
+            logger.warning(f"Content registry claim failed: {e}")
+            return doc_id
+
+    def replace(self, content_hash: str, expected_id: str, doc_id: str, tenant: Optional[str] = None) -> str:
+        """
+        接管过期的内容哈希登记 (比较并设置), 返回最终持有该哈希的文档ID
+
+        只有登记仍属于 expected_id 时才改为 doc_id; 并发接管同一登记时只有一个调用方成功。
+        Redis 不可用时视为接管成功, 退化为不去重。
+        """
+        try:
+            owner = get_redis_client().eval(self.REPLACE_SCRIPT, 1, self._key(content_hash, tenant), expected_id, doc_id)
+            return owner or doc_id
+        except Exception as e:
+            logger.warning(f"Content registry replace failed: {e}")
+            return doc_id
+
+    def release(self, content_hash: str, tenant: Optional[str] = None):
+        """
+        移除内容哈希登记 (对应文档处理失败或已不存在时)
+        """
+        try:
+            get_redis_client().delete(self._key(content_hash, tenant))
+        except Exception as e:
+            logger.warning(f"Content registry release failed: {e}")
+
+    def get_chunk_hashes(self, doc_id: str) -> Optional[List[str]]:
+        """
+        获取文档当前已索引版本的分块哈希序列, 不存在时返回 None
+        """
+        try:
+            raw = get_redis_client().get(self._chunks_key(doc_id))
+        except Exception as e:
+            logger.warning(f"Failed to read chunk hashes for document {doc_id}: {e}")
+            return None
+        return json.loads(raw) if raw else None
+
+    def set_chunk_hashes(self, doc_id: str, hashes: List[str]):
+        """
+        记录文档已索引版本的分块哈希序列 (按分块索引排列)
+        """
+        try:
+            get_redis_client().set(self._chunks_key(doc_id), json.dumps(hashes))
+        except Exception as e:
+            logger.warning(f"Failed to store chunk hashes for document {doc_id}: {e}")
+
+content_registry = ContentRegistry()
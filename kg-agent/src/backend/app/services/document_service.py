@@ -1,45 +1,332 @@
-from typing import List, Optional
-from app.models import Document, DocumentType, ProcessingStatus, DocumentMetadata
+from typing import List, Optional, Dict, Any, Tuple, BinaryIO, Union
+from pathlib import Path
+from app.models import Document, DocumentType, ProcessingStatus, PipelineStage, DocumentMetadata
+from app.models.document import TENANT_MAX_LENGTH, SOURCE_MAX_LENGTH
 from app.utils.logger import logger
+from app.utils.file_handler import safe_filename, save_and_hash
+from app.utils.spill_store import spill_store
+from app.services.status_service import status_service
+from app.services.content_registry import content_registry
+from app.exceptions import ValidationError, ResourceNotFoundError
 from app.config import get_settings
+import io
 import uuid
 import os
+from datetime import datetime
 
 settings = get_settings()
 
+SUPPORTED_EXTENSIONS = {"pdf", "doc", "docx", "md", "html", "txt"}
+
 class DocumentService:
-    def upload_document(self, file_content: bytes, filename: str) -> Document:
+    def upload_document(self, file_content: Union[bytes, BinaryIO], filename: str,
+                        tenant: Optional[str] = None, source: Optional[str] = None) -> Document:
         """
         上传文档并触发处理流程
+
+        上传内容边写入边计算 SHA-256, 与已处理(或处理中)的文档内容完全相同时
+        直接返回已有文档, 不再入队处理; tenant / source 随分块写入索引, 供检索过滤
         """
+        if not self._is_supported(filename):
+            raise ValidationError(
+                message="不支持的文件类型",
+                details={"filename": filename, "supported_extensions": sorted(SUPPORTED_EXTENSIONS)}
+            )
+        attributes = self._attributes(tenant, source)
+        stream = io.BytesIO(file_content) if isinstance(file_content, (bytes, bytearray)) else file_content
         doc_id = str(uuid.uuid4())
-        logger.info(f"Uploading document: {filename} (ID: {doc_id})")
-        
+
         # Ensure upload directory exists
         os.makedirs(settings.UPLOAD_FOLDER, exist_ok=True)
         
-        file_path = os.path.join(settings.UPLOAD_FOLDER, f"{doc_id}_{filename}")
+        file_path = os.path.join(settings.UPLOAD_FOLDER, f"{doc_id}_{safe_filename(filename)}")
         
-        # Save file synchronously
-        with open(file_path, 'wb') as f:
-            f.write(file_content)
-            
+        # Save file synchronously, hashing while streaming
+        content_hash, file_size = save_and_hash(stream, file_path)
+
+        # 状态记录先于内容哈希登记创建, 见 claim_content
+        doc_type = self._detect_file_type(filename)
+        status_service.init(
+            doc_id,
+            filename=filename,
+            file_path=file_path,
+            doc_type=doc_type.value,
+            file_size=file_size,
+            content_hash=content_hash,
+            **attributes
+        )
+        existing_id = self.claim_content(content_hash, doc_id, tenant)
+        if existing_id:
+            os.remove(file_path)
+            status_service.delete(doc_id)
+            logger.info(f"Duplicate upload {filename} matches document {existing_id}, skipping processing")
+            return self._duplicate_document(existing_id, filename, content_hash)
+
+        logger.info(f"Uploading document: {filename} (ID: {doc_id})")
+
         # Trigger Celery task
         from app.tasks.document import process_document_pipeline
-        process_document_pipeline.delay(doc_id, os.path.abspath(file_path))
+        process_document_pipeline.delay(doc_id, os.path.abspath(file_path), content_hash=content_hash)
         
         return Document(
             id=doc_id,
             filename=filename,
             file_path=file_path,
-            type=self._detect_file_type(filename),
+            type=doc_type,
             metadata=DocumentMetadata(
                 title=filename,
-                file_size=len(file_content)
+                source=source,
+                file_size=file_size,
+                extra={"content_hash": content_hash, **({"tenant": tenant} if tenant else {})}
             ),
-            status=ProcessingStatus.PENDING
+            status=ProcessingStatus.PENDING,
+            stage=PipelineStage.QUEUED
         )
 
+    def update_document(self, doc_id: str, file_content: Union[bytes, BinaryIO], filename: str) -> Document:
+        """
+        上传文档的新版本, 保留原文档ID并增量重建索引
+
+        新版本分块后与上一版本按分块内容哈希比对, 只有新增/变化的分块会重新向量化写入
+        """
+        record = status_service.get(doc_id)
+        if record is None:
+            raise ResourceNotFoundError("文档", doc_id)
+        if record.get("status") in (ProcessingStatus.PENDING.value, ProcessingStatus.PROCESSING.value):
+            raise ValidationError(
+                message="文档正在处理中, 请稍后再更新",
+                details={"doc_id": doc_id, "status": record.get("status"), "stage": record.get("stage")}
+            )
+
+        stream = io.BytesIO(file_content) if isinstance(file_content, (bytes, bytearray)) else file_content
+        os.makedirs(settings.UPLOAD_FOLDER, exist_ok=True)
+        file_path = os.path.join(settings.UPLOAD_FOLDER, f"{doc_id}_{safe_filename(filename)}")
+        tmp_path = os.path.join(settings.UPLOAD_FOLDER, f".{doc_id}.{uuid.uuid4().hex}.part")
+        content_hash, file_size = save_and_hash(stream, tmp_path)
+
+        old_hash = record.get("content_hash")
+        if content_hash == old_hash and record.get("status") == ProcessingStatus.COMPLETED.value:
+            os.remove(tmp_path)
+            logger.info(f"Update of document {doc_id} has identical content, skipping re-index")
+            return self.get_status(doc_id)
+
+        os.replace(tmp_path, file_path)
+        # 只清理上传目录中的旧版本, 批量导入的源文件不属于本服务
+        old_path = os.path.abspath(record.get("file_path") or file_path)
+        upload_root = os.path.abspath(settings.UPLOAD_FOLDER)
+        if old_path != os.path.abspath(file_path) and old_path.startswith(upload_root + os.sep) and os.path.exists(old_path):
+            os.remove(old_path)
+
+        # 内容哈希登记随版本迁移 (文档的租户不随更新改变)
+        tenant = record.get("tenant")
+        if old_hash and content_registry.lookup(old_hash, tenant) == doc_id:
+            content_registry.release(old_hash, tenant)
+        content_registry.claim(content_hash, doc_id, tenant)
+
+        logger.info(f"Updating document {doc_id} with new version {filename}")
+        status_service.update(
+            doc_id,
+            status=ProcessingStatus.PENDING,
+            stage=PipelineStage.QUEUED,
+            filename=filename,
+            file_path=file_path,
+            doc_type=self._detect_file_type(filename).value,
+            file_size=file_size,
+            content_hash=content_hash,
+            retries=0,
+            error=None
+        )
+
+        from app.tasks.document import process_document_pipeline
+        process_document_pipeline.delay(doc_id, os.path.abspath(file_path), update=True, content_hash=content_hash)
+
+        return self.get_status(doc_id)
+
+    def claim_content(self, content_hash: str, doc_id: str, tenant: Optional[str] = None) -> Optional[str]:
+        """
+        为新文档登记租户内的内容哈希 (不同租户的相同内容不去重)
+
+        调用方须先创建 doc_id 的状态记录: 登记的持有者没有状态记录 (登记后进程中断, 或记录已丢失)
+        或处理失败时, 视为过期登记, 以比较并设置接管, 并发接管时只有一个调用方成功
+
+        Returns:
+            已存在的同内容文档ID; 登记成功 (无重复) 时返回 None
+        """
+        owner = content_registry.claim(content_hash, doc_id, tenant)
+        if owner == doc_id:
+            return None
+        record = status_service.get(owner)
+        if record is not None and record.get("status") != ProcessingStatus.FAILED.value:
+            return owner
+        logger.info(f"Taking over stale content claim of document {owner} for {doc_id}")
+        owner = content_registry.replace(content_hash, owner, doc_id, tenant)
+        return None if owner == doc_id else owner
+
+    def _duplicate_document(self, existing_id: str, filename: str, content_hash: str) -> Document:
+        doc = self.get_status(existing_id)
+        doc.metadata.extra.update({
+            "duplicate_of": existing_id,
+            "uploaded_filename": filename,
+            "content_hash": content_hash
+        })
+        return doc
+
+    def upload_batch(self, files: List[Tuple[BinaryIO, str]], tenant: Optional[str] = None,
+                     source: Optional[str] = None) -> Dict[str, Any]:
+        """
+        批量上传文档, 返回批次ID及聚合进度
+
+        files: [(文件流, 文件名), ...]; tenant / source 应用于批次内全部文档
+        """
+        attributes = self._attributes(tenant, source)
+        os.makedirs(settings.UPLOAD_FOLDER, exist_ok=True)
+
+        docs = []
+        duplicates = []
+        unsupported = []
+        for stream, filename in files:
+            if not self._is_supported(filename):
+                unsupported.append(filename)
+                continue
+            doc_id = str(uuid.uuid4())
+            file_path = os.path.abspath(os.path.join(settings.UPLOAD_FOLDER, f"{doc_id}_{safe_filename(filename)}"))
+            content_hash, _ = save_and_hash(stream, file_path)
+
+            entry = self._batch_entry(doc_id, filename, file_path, attributes) | {"content_hash": content_hash}
+            status_service.init(doc_id, **{k: v for k, v in entry.items() if k != "doc_id"})
+            existing_id = self.claim_content(content_hash, doc_id, tenant)
+            if existing_id:
+                os.remove(file_path)
+                status_service.delete(doc_id)
+                duplicates.append({"filename": filename, "doc_id": existing_id})
+                continue
+
+            docs.append(entry)
+
+        if not docs and duplicates:
+            return {"batch_id": None, "total": 0, "duplicates": duplicates, "unsupported": unsupported}
+
+        result = self._dispatch_batch(docs, source="upload")
+        result["duplicates"] = duplicates
+        result["unsupported"] = unsupported
+        return result
+
+    def import_manifest(
+        self,
+        directory: Optional[str] = None,
+        paths: Optional[List[str]] = None,
+        recursive: bool = True,
+        tenant: Optional[str] = None,
+        source: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        按目录或文件清单批量导入服务端已有的文件 (限定在 BATCH_IMPORT_ROOT 下)
+        """
+        attributes = self._attributes(tenant, source)
+        root = Path(settings.BATCH_IMPORT_ROOT).resolve()
+
+        def resolve(path: str) -> Path:
+            # resolve() 展开符号链接, 指向根目录之外的链接同样被拒绝
+            full_path = (root / path).resolve()
+            if not full_path.is_relative_to(root):
+                raise ValidationError(
+                    message="导入路径必须位于批量导入根目录下",
+                    details={"path": path, "root": str(root)}
+                )
+            return full_path
+
+        candidates: List[Path] = []
+        if directory is not None:
+            base = resolve(directory)
+            if not base.is_dir():
+                raise ValidationError(message="导入目录不存在", details={"directory": directory})
+            for p in (base.rglob("*") if recursive else base.iterdir()):
+                target = p.resolve()
+                if not target.is_relative_to(root):
+                    logger.warning(f"Skipping {p}: symlink target {target} is outside the batch import root")
+                elif target.is_file():
+                    candidates.append(target)
+        for path in paths or []:
+            full_path = resolve(path)
+            if not full_path.is_file():
+                raise ValidationError(message="导入文件不存在", details={"path": path})
+            candidates.append(full_path)
+
+        docs = [
+            self._batch_entry(str(uuid.uuid4()), p.name, str(p), attributes)
+            for p in sorted(set(candidates))
+            if self._is_supported(p.name)
+        ]
+        return self._dispatch_batch(docs, source="manifest")
+
+    def _batch_entry(self, doc_id: str, filename: str, file_path: str, attributes: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "doc_id": doc_id,
+            "filename": filename,
+            "file_path": file_path,
+            "doc_type": self._detect_file_type(filename).value,
+            "file_size": os.path.getsize(file_path),
+            **attributes
+        }
+
+    def _attributes(self, tenant: Optional[str], source: Optional[str]) -> Dict[str, Any]:
+        """
+        文档的可过滤属性, 记录在状态中, 索引阶段随分块写入 (见 app.utils.search_filters)
+
+        超过 Milvus 字段长度的取值会使整批向量写入失败, 在接收文件前拒绝
+        """
+        for field, value, max_length in (("tenant", tenant, TENANT_MAX_LENGTH), ("source", source, SOURCE_MAX_LENGTH)):
+            if value is not None and len(value) > max_length:
+                raise ValidationError(
+                    message="文档属性过长",
+                    details={"field": field, "length": len(value), "max_length": max_length}
+                )
+        attributes = {"created_at": datetime.utcnow().isoformat()}
+        if tenant:
+            attributes["tenant"] = tenant
+        if source:
+            attributes["source"] = source
+        return attributes
+
+    def _dispatch_batch(self, docs: List[Dict[str, Any]], source: str) -> Dict[str, Any]:
+        if not docs:
+            raise ValidationError(
+                message="批量导入未包含可处理的文件",
+                details={"supported_extensions": sorted(SUPPORTED_EXTENSIONS)}
+            )
+
+        batch_id = str(uuid.uuid4())
+        logger.info(f"Creating ingestion batch {batch_id} with {len(docs)} documents ({source})")
+
+        # 清单可能很大, 通过落盘存储传递给 worker
+        manifest_ref = spill_store.write(batch_id, "manifest", docs)
+        status_service.init_batch(batch_id, total=len(docs), source=source)
+
+        from app.tasks.document import process_batch
+        process_batch.delay(batch_id, manifest_ref)
+
+        return status_service.get_batch(batch_id) or {
+            "batch_id": batch_id,
+            "total": len(docs),
+            "completed": 0,
+            "failed": 0,
+            "pending": len(docs),
+            "progress": 0.0,
+            "status": ProcessingStatus.PENDING.value
+        }
+
+    def get_batch_status(self, batch_id: str) -> Dict[str, Any]:
+        """
+        获取批量导入的聚合进度
+        """
+        record = status_service.get_batch(batch_id)
+        if record is None:
+            raise ResourceNotFoundError("批量导入任务", batch_id)
+        return record
+
+    def _is_supported(self, filename: str) -> bool:
+        return Path(filename).suffix.lower().lstrip('.') in SUPPORTED_EXTENSIONS
+
     def _detect_file_type(self, filename: str) -> DocumentType:
         ext = filename.lower().split('.')[-1]
         if ext == 'pdf': return DocumentType.PDF
@@ -52,6 +339,28 @@ class DocumentService:
         """
         获取文档处理状态
         """
+        record = status_service.get(doc_id)
+        if record is not None:
+            filename = record.get("filename") or doc_id
+            extra = {k: record[k] for k in ("content_hash", "tenant") if record.get(k)}
+            return Document(
+                id=doc_id,
+                filename=filename,
+                file_path=record.get("file_path") or "",
+                type=record.get("doc_type") or self._detect_file_type(filename),
+                metadata=DocumentMetadata(
+                    title=filename,
+                    source=record.get("source"),
+                    file_size=record.get("file_size") or 0,
+                    extra=extra,
+                    **({"created_at": record["created_at"]} if record.get("created_at") else {})
+                ),
+                status=record.get("status", ProcessingStatus.PENDING),
+                stage=record.get("stage"),
+                error_message=record.get("error"),
+                processed_at=record.get("processed_at")
+            )
+
         # TODO: 从数据库获取文档状态
         # 临时返回模拟数据
         return Document(
@@ -0,0 +1,194 @@
+"""
+嵌入模型推理后端
+
+- torch: sentence-transformers 全精度 (fp32) 模型
+- int8: 对 torch 模型的 Linear 层做动态 int8 量化, 无需导出, CPU 上通常快 1.5-2 倍
+- onnx: 用 onnxruntime 运行导出的 ONNX 模型 (可以是 int8 量化后的文件), 分词和池化在本模块完成
+
+所有后端都提供与 SentenceTransformer 相同的 encode(texts, batch_size=..., convert_to_numpy=..., show_progress_bar=...) 接口。
+切换后端前用 compare_embeddings (或 benchmarks/bench_embedding_backends.py) 在样本集上与 fp32 模型比对精度。
+"""
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.logger import logger
+
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+    ort = None
+
+BACKENDS = ("torch", "int8", "onnx")
+
+def fork_safe(backend: str) -> bool:
+    """
+    后端加载后能否在 fork 出的子进程中继续使用 (onnxruntime 会话的线程池在 fork 后失效)
+    """
+    return backend != "onnx"
+
+def _read_model_file(model_path: str, filename: str) -> Optional[Any]:
+    """
+    读取 sentence-transformers 模型目录 (本地或 Hugging Face Hub) 中的 JSON 配置, 不存在时返回 None
+    """
+    path = os.path.join(model_path, filename)
+    if not os.path.isdir(model_path):
+        try:
+            from huggingface_hub import hf_hub_download
+            repo_id = model_path if "/" in model_path else f"sentence-transformers/{model_path}"
+            path = hf_hub_download(repo_id, filename)
+        except Exception:
+            return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _pooling_config(model_path: str) -> Tuple[str, bool, Optional[int]]:
+    """
+    从 sentence-transformers 模型配置中读取 (池化方式, 是否归一化, 最大序列长度)
+    """
+    modules = _read_model_file(model_path, "modules.json") or []
+    normalize = any(m.get("type", "").endswith("Normalize") for m in modules)
+    pooling = "mean"
+    for module in modules:
+        if module.get("type", "").endswith("Pooling"):
+            config = _read_model_file(model_path, f"{module.get('path', '1_Pooling')}/config.json") or {}
+            if config.get("pooling_mode_cls_token"):
+                pooling = "cls"
+            elif config.get("pooling_mode_max_tokens"):
+                pooling = "max"
+    max_seq_length = (_read_model_file(model_path, "sentence_bert_config.json") or {}).get("max_seq_length")
+    return pooling, normalize, max_seq_length
+
+class OnnxEmbeddingModel:
+    """
+    onnxruntime 推理的句向量模型, 输出与对应的 sentence-transformers 模型一致
+    """
+    def __init__(self, onnx_path: str, model_path: str, num_threads: int = 0):
+        if not ONNXRUNTIME_AVAILABLE:
+            raise RuntimeError("onnxruntime is not installed, cannot use the onnx embedding backend")
+        from transformers import AutoTokenizer
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        tokenizer_path = model_path
+        if not os.path.isdir(model_path) and "/" not in model_path:
+            tokenizer_path = f"sentence-transformers/{model_path}"
+        self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_path)
+        self.pooling, self.normalize, max_seq_length = _pooling_config(model_path)
+        self.max_seq_length = max_seq_length or min(self.tokenizer.model_max_length, 512)
+
+    def get_sentence_embedding_dimension(self) -> Optional[int]:
+        dim = self.session.get_outputs()[0].shape[-1]
+        return dim if isinstance(dim, int) else None
+
+    def _pool(self, hidden: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        if hidden.ndim == 2:
+            # 导出时已包含池化
+            return hidden
+        if self.pooling == "cls":
+            return hidden[:, 0]
+        mask = mask[..., None].astype(hidden.dtype)
+        if self.pooling == "max":
+            return np.where(mask > 0, hidden, -1e9).max(axis=1)
+        return (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def encode(self, texts: List[str], batch_size: int = 32, convert_to_numpy: bool = True,
+               show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            feeds = {name: encoded[name].astype(np.int64) for name in self.input_names if name in encoded}
+            if "token_type_ids" in self.input_names and "token_type_ids" not in feeds:
+                feeds["token_type_ids"] = np.zeros_like(encoded["input_ids"], dtype=np.int64)
+            hidden = self.session.run(None, feeds)[0]
+            embeddings = self._pool(hidden, encoded["attention_mask"]).astype(np.float32)
+            if self.normalize:
+                embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+            outputs.append(embeddings)
+        if not outputs:
+            return np.empty((0, self.get_sentence_embedding_dimension() or 0), dtype=np.float32)
+        return np.concatenate(outputs)
+
+def load_model(backend: str, model_path: str, onnx_path: Optional[str] = None, num_threads: int = 0):
+    """
+    按后端加载嵌入模型
+
+    Args:
+        backend: torch / int8 / onnx
+        model_path: sentence-transformers 模型名称或本地路径 (onnx 后端从这里读取分词器和池化配置)
+        onnx_path: ONNX 模型文件, 默认为 model_path/onnx/model.onnx
+        num_threads: CPU 推理线程数, 0 表示使用运行时默认值
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}', expected one of: {', '.join(BACKENDS)}")
+
+    if backend == "onnx":
+        onnx_path = onnx_path or os.path.join(model_path, "onnx", "model.onnx")
+        logger.info(f"Loading ONNX embedding model {onnx_path} ({num_threads or 'default'} threads)")
+        return OnnxEmbeddingModel(onnx_path, model_path, num_threads)
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+    model = SentenceTransformer(model_path, device="cpu" if backend == "int8" else None)
+    if backend == "int8":
+        model.eval()
+        torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+        logger.info(f"Applied dynamic int8 quantization to {model_path}")
+    return model
+
+def compare_embeddings(reference: np.ndarray, candidate: np.ndarray, top_k: int = 10) -> Dict[str, float]:
+    """
+    比对候选后端与 fp32 参考模型在同一样本集上的向量
+
+    Args:
+        reference: fp32 模型输出 (n, dim)
+        candidate: 候选后端输出 (n, dim)
+        top_k: 近邻重合率统计的 k
+
+    Returns:
+        Dict[str, float]: 逐条余弦相似度的均值/最小值, 以及样本内 top_k 近邻的平均重合率
+    """
+    def unit(x):
+        x = np.asarray(x, dtype=np.float32)
+        return x / np.clip(np.linalg.norm(x, axis=1, keepdims=True), 1e-12, None)
+
+    reference, candidate = unit(reference), unit(candidate)
+    cosine = (reference * candidate).sum(axis=1)
+
+    k = min(top_k, len(reference) - 1)
+    overlap = 1.0
+    if k > 0:
+        def neighbours(x):
+            sims = x @ x.T
+            np.fill_diagonal(sims, -np.inf)
+            return np.argsort(-sims, axis=1)[:, :k]
+
+        ref_nn, cand_nn = neighbours(reference), neighbours(candidate)
+        overlap = float(np.mean([len(set(a) & set(b)) / k for a, b in zip(ref_nn, cand_nn)]))
+
+    return {
+        "mean_cosine": float(cosine.mean()),
+        "min_cosine": float(cosine.min()),
+        "neighbour_overlap": overlap
+    }
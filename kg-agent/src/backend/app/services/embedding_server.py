@@ -0,0 +1,276 @@
+"""
+本机嵌入服务: 单个进程加载模型, 通过 Unix socket 为多个 API 进程编码查询
+
+并发到达的请求在 EMBEDDING_SERVER_MAX_WAIT_MS 内汇聚成一个批次 (不超过 EMBEDDING_SERVER_MAX_BATCH 条文本),
+一次模型调用后按请求拆分结果返回。API 进程设置 EMBEDDING_SERVER_SOCKET 后不再各自加载模型。
+
+启动:
+    python -m app.services.embedding_server [--socket /path/to/embedding.sock]
+
+协议: 每帧为 4 字节大端长度 + 内容。请求为 JSON ({"op": "encode", "texts": [...]} 或 {"op": "stats"}),
+响应先返回 JSON 头; encode 成功时紧跟一帧 float32 行优先的向量数据, 形状由头中的 shape 给出。
+"""
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.config import get_settings
+from app.utils.logger import logger
+
+settings = get_settings()
+
+_HEADER = struct.Struct("!I")
+
+def send_frame(sock: socket.socket, payload: bytes):
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    buf = bytearray()
+    while len(buf) < size:
+        data = sock.recv(size - len(buf))
+        if not data:
+            if buf:
+                raise ConnectionError("Connection closed mid-frame")
+            return None
+        buf.extend(data)
+    return bytes(buf)
+
+def recv_frame(sock: socket.socket) -> Optional[bytes]:
+    """
+    读取一帧, 对端在帧边界关闭连接时返回 None
+    """
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    (size,) = _HEADER.unpack(header)
+    payload = _recv_exact(sock, size)
+    if payload is None:
+        raise ConnectionError("Connection closed mid-frame")
+    return payload
+
+class _Request:
+    __slots__ = ("texts", "future", "enqueued_at")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+
+class MicroBatcher:
+    """
+    动态微批次: 收到第一个请求后最多等待 max_wait 秒收集后续请求, 合并为一次编码调用
+    """
+    def __init__(self, encode_fn: Callable[[List[str]], np.ndarray], max_batch: int, max_wait: float):
+        self.encode_fn = encode_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.requests = 0
+        self.texts = 0
+        self.batches = 0
+        self.max_batch_seen = 0
+        self.queue_wait = 0.0
+        self.encode_time = 0.0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join()
+
+    def submit(self, texts: List[str]) -> Future:
+        request = _Request(texts)
+        self._queue.put(request)
+        return request.future
+
+    def _collect(self) -> Optional[List[_Request]]:
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        count = len(first.texts)
+        deadline = time.monotonic() + self.max_wait
+        while count < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                # 处理完当前批次后退出
+                self._queue.put(None)
+                break
+            batch.append(request)
+            count += len(request.texts)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            started = time.monotonic()
+            texts = [text for request in batch for text in request.texts]
+            try:
+                vectors = self.encode_fn(texts)
+            except Exception as e:
+                logger.error(f"Embedding batch of {len(texts)} texts failed: {e}")
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+
+            offset = 0
+            for request in batch:
+                request.future.set_result(vectors[offset:offset + len(request.texts)])
+                offset += len(request.texts)
+
+            with self._lock:
+                self.requests += len(batch)
+                self.texts += len(texts)
+                self.batches += 1
+                self.max_batch_seen = max(self.max_batch_seen, len(texts))
+                self.queue_wait += sum(started - request.enqueued_at for request in batch)
+                self.encode_time += time.monotonic() - started
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "requests": self.requests,
+                "texts": self.texts,
+                "batches": self.batches,
+                "avg_batch_size": self.texts / self.batches if self.batches else 0.0,
+                "max_batch_size": self.max_batch_seen,
+                "avg_queue_wait_ms": self.queue_wait * 1000 / self.requests if self.requests else 0.0,
+                "avg_encode_ms": self.encode_time * 1000 / self.batches if self.batches else 0.0
+            }
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        batcher: MicroBatcher = self.server.batcher
+        while True:
+            try:
+                frame = recv_frame(self.request)
+            except (OSError, ConnectionError):
+                return
+            if frame is None:
+                return
+            try:
+                message = json.loads(frame)
+                if message.get("op") == "stats":
+                    send_frame(self.request, json.dumps({"ok": True, "stats": batcher.stats()}).encode("utf-8"))
+                    continue
+                vectors = np.ascontiguousarray(batcher.submit(list(message["texts"])).result(), dtype=np.float32)
+            except Exception as e:
+                send_frame(self.request, json.dumps({"ok": False, "error": str(e)}).encode("utf-8"))
+                continue
+            send_frame(self.request, json.dumps({"ok": True, "shape": list(vectors.shape)}).encode("utf-8"))
+            send_frame(self.request, vectors.tobytes())
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, batcher: MicroBatcher):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        os.makedirs(os.path.dirname(os.path.abspath(socket_path)), exist_ok=True)
+        self.batcher = batcher
+        super().__init__(socket_path, _Handler)
+
+class EmbeddingClient:
+    """
+    嵌入服务客户端, 每个线程复用一条连接, 连接断开时重连一次
+    """
+    def __init__(self, socket_path: str, timeout: float = 10.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def _request(self, message: Dict[str, Any]):
+        payload = json.dumps(message, ensure_ascii=False).encode("utf-8")
+        for attempt in range(2):
+            try:
+                sock = self._connect()
+                send_frame(sock, payload)
+                header = recv_frame(sock)
+                if header is None:
+                    raise ConnectionError("Embedding server closed the connection")
+                header = json.loads(header)
+                data = recv_frame(sock) if header.get("shape") else None
+                break
+            except (OSError, ConnectionError):
+                self._close()
+                if attempt:
+                    raise
+        if not header.get("ok"):
+            raise RuntimeError(f"Embedding server error: {header.get('error')}")
+        return header, data
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        header, data = self._request({"op": "encode", "texts": texts})
+        return np.frombuffer(data, dtype=np.float32).reshape(header["shape"])
+
+    def stats(self) -> Dict[str, Any]:
+        header, _ = self._request({"op": "stats"})
+        return header["stats"]
+
+def main():
+    parser = argparse.ArgumentParser(description="KG Agent embedding server")
+    parser.add_argument("--socket", default=settings.EMBEDDING_SERVER_SOCKET or "./data/run/embedding.sock")
+    args = parser.parse_args()
+
+    from app.services.embedding_service import embedding_service
+
+    embedding_service.warmup()
+    batcher = MicroBatcher(
+        embedding_service.encode_uncached,
+        max_batch=settings.EMBEDDING_SERVER_MAX_BATCH,
+        max_wait=settings.EMBEDDING_SERVER_MAX_WAIT_MS / 1000
+    )
+    batcher.start()
+    with EmbeddingServer(args.socket, batcher) as server:
+        logger.info(f"Embedding server listening on {args.socket}")
+        try:
+            server.serve_forever()
+        finally:
+            batcher.stop()
+            os.unlink(args.socket)
+
+if __name__ == "__main__":
+    main()
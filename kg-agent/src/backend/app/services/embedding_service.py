@@ -1,14 +1,40 @@
 import os
+import time
+import base64
+import threading
+import numpy as np
 from app.config import get_settings
 from app.utils.logger import logger
-from sentence_transformers import SentenceTransformer
-from typing import List
+from app.utils.cache_manager import get_redis_client
+from app.utils.embedding_cache import EmbeddingCache, embedding_cache, cache_model_id
+from app.services.embedding_server import EmbeddingClient
+from app.services.embedding_backends import load_model
+from typing import Any, Dict, List, Optional
 
 settings = get_settings()
 
 class EmbeddingService:
     _instance = None
     _model = None
+    _tokenizer = None
+    _model_lock = threading.Lock()
+    cache: Optional[EmbeddingCache] = embedding_cache
+    # 查询向量只保留在内存中, 不写入磁盘缓存
+    query_cache: Optional[EmbeddingCache] = EmbeddingCache(
+        settings.EMBEDDING_CACHE_DIR,
+        cache_model_id(),
+        lru_size=settings.QUERY_EMBEDDING_CACHE_SIZE
+    )
+    QUERY_KEY_PREFIX = "kg:qemb"
+    _redis = None
+    _redis_retry_at = 0.0
+    # 配置了本机嵌入服务时, 查询向量由嵌入服务编码, 本进程不加载模型
+    server: Optional[EmbeddingClient] = (
+        EmbeddingClient(settings.EMBEDDING_SERVER_SOCKET, settings.EMBEDDING_SERVER_TIMEOUT)
+        if settings.EMBEDDING_SERVER_SOCKET else None
+    )
+    _server_retry_at = 0.0
+    last_stats: Dict[str, Any] = {}
 
     def __new__(cls):
         if cls._instance is None:
@@ -17,28 +43,287 @@ class EmbeddingService:
 
     def _get_model(self):
         if self._model is None:
-            logger.info(f"Loading embedding model: {settings.EMBEDDING_MODEL_PATH}")
+            with self._model_lock:
+                if self._model is None:
+                    self._load_model()
+        return self._model
+
+    def _load_model(self):
+        backend = settings.EMBEDDING_BACKEND
+        logger.info(f"Loading embedding model: {settings.EMBEDDING_MODEL_PATH} (backend: {backend})")
+        try:
+            self._model = load_model(
+                backend,
+                settings.EMBEDDING_MODEL_PATH,
+                onnx_path=settings.EMBEDDING_ONNX_PATH,
+                num_threads=settings.EMBEDDING_NUM_THREADS
+            )
+            return
+        except Exception as e:
+            logger.error(f"Failed to load embedding model: {e}")
+
+        if backend != "torch":
+            # 向量与缓存键中的后端不一致, 禁用缓存
+            self.cache = None
+            self.query_cache = None
             try:
-                self._model = SentenceTransformer(settings.EMBEDDING_MODEL_PATH)
+                logger.warning(f"Embedding backend {backend} unavailable, falling back to torch")
+                self._model = load_model("torch", settings.EMBEDDING_MODEL_PATH, num_threads=settings.EMBEDDING_NUM_THREADS)
+                return
             except Exception as e:
                 logger.error(f"Failed to load embedding model: {e}")
-                # Fallback for development if model not found
-                logger.warning("Using mock embedding model (random)")
-                class MockModel:
-                    def encode(self, texts):
-                        import numpy as np
-                        return np.random.rand(len(texts), 768).tolist()
-                self._model = MockModel()
-        return self._model
 
-    def encode(self, texts: List[str]) -> List[List[float]]:
+        # Fallback for development if model not found
+        logger.warning("Using mock embedding model (random)")
+        # 随机向量不能进入缓存
+        self.cache = None
+        self.query_cache = None
+        class MockModel:
+            def encode(self, texts, **kwargs):
+                return np.random.rand(len(texts), settings.MILVUS_DIMENSION).astype(np.float32)
+        self._model = MockModel()
+
+    def preload(self):
         """
-        Generate embeddings for a list of texts
+        加载模型和分词器并切换为只读推理模式, 不做推理
+
+        供 prefork 父进程在 fork 前调用: 子进程以写时复制方式共享权重, 推理不写参数, 权重页保持共享
         """
+        started = time.perf_counter()
         model = self._get_model()
-        embeddings = model.encode(texts)
-        if hasattr(embeddings, "tolist"):
-            return embeddings.tolist()
+        self._get_tokenizer()
+        if hasattr(model, "eval"):
+            model.eval()
+        if hasattr(model, "parameters"):
+            for param in model.parameters():
+                param.requires_grad_(False)
+        logger.info(f"Embedding model preloaded in {time.perf_counter() - started:.2f}s")
+
+    def warmup(self):
+        """
+        预加载模型和分词器并完成一次推理, 使首个查询不承担模型加载和首次推理的开销
+        """
+        started = time.perf_counter()
+        self.preload()
+        self._get_model().encode(["warmup"], convert_to_numpy=True, show_progress_bar=False)
+        logger.info(f"Embedding model warmed up in {time.perf_counter() - started:.2f}s")
+
+    def _get_tokenizer(self):
+        """
+        获取嵌入模型的分词器: 已加载模型时直接复用, 否则只加载分词器 (分块阶段不需要加载整个模型)
+        """
+        if self._tokenizer is None:
+            tokenizer = getattr(self._model, "tokenizer", None)
+            if tokenizer is None:
+                path = settings.EMBEDDING_MODEL_PATH
+                candidates = [path]
+                if "/" not in path and not os.path.isdir(path):
+                    candidates.append(f"sentence-transformers/{path}")
+                for candidate in candidates:
+                    try:
+                        from transformers import AutoTokenizer
+                        tokenizer = AutoTokenizer.from_pretrained(candidate)
+                        break
+                    except Exception as e:
+                        logger.warning(f"Failed to load tokenizer {candidate}: {e}")
+            if tokenizer is None:
+                logger.warning("Tokenizer unavailable, token counts fall back to character counts")
+            self._tokenizer = tokenizer or False
+        return self._tokenizer or None
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        """
+        用嵌入模型的分词器批量计算 token 数 (一次调用), 分词器不可用时退化为字符数
+        """
+        tokenizer = self._get_tokenizer()
+        if tokenizer is None or not texts:
+            return [len(text) for text in texts]
+        encoded = tokenizer(
+            texts,
+            add_special_tokens=False,
+            return_attention_mask=False,
+            return_token_type_ids=False
+        )
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def _dimension(self, model) -> int:
+        get_dimension = getattr(model, "get_sentence_embedding_dimension", None)
+        return (get_dimension() if get_dimension else None) or settings.MILVUS_DIMENSION
+
+    def encode(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """
+        批量生成文本向量, 返回 (len(texts), dim) 的连续 float32 数组, 行顺序与输入一致
+
+        先查向量缓存, 未命中的文本 (同一调用内去重) 按 token 长度排序后分微批次编码,
+        同一批次内长度相近, 减少 padding 浪费并限制单次调用的内存峰值
+        """
+        batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        if not texts:
+            return np.empty((0, self._dimension(self._get_model())), dtype=np.float32)
+
+        started = time.perf_counter()
+        cache = self.cache
+        keys, cached = cache.lookup(texts) if cache is not None else (None, {})
+
+        # 未命中的文本按缓存键分组, 重复出现的文本只编码一次
+        pending: Dict[Any, List[int]] = {}
+        for i in range(len(texts)):
+            if i not in cached:
+                pending.setdefault(keys[i] if keys else i, []).append(i)
+        misses = [rows[0] for rows in pending.values()]
+
+        encoded, tokens = None, 0
+        if misses:
+            # 全部命中缓存时不加载模型
+            encoded, tokens = self._encode_batches(self._get_model(), [texts[i] for i in misses], batch_size)
+            if cache is not None:
+                cache.store([keys[i] for i in misses], encoded)
+
+        dim = encoded.shape[1] if encoded is not None else len(next(iter(cached.values())))
+        embeddings = np.empty((len(texts), dim), dtype=np.float32)
+        for i, vector in cached.items():
+            embeddings[i] = vector
+        for j, rows in enumerate(pending.values()):
+            embeddings[rows] = encoded[j]
+
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        self.last_stats = {
+            "texts": len(texts),
+            "encoded": len(misses),
+            "cache_hits": len(cached),
+            "tokens": tokens,
+            "batch_size": batch_size,
+            "seconds": elapsed,
+            "texts_per_second": len(texts) / elapsed,
+            "tokens_per_second": tokens / elapsed
+        }
+        logger.info(
+            f"Encoded {len(texts)} texts in {elapsed:.2f}s ({len(cached)} cache hits, {len(misses)} encoded, "
+            f"{tokens} tokens): {len(texts) / elapsed:.1f} texts/s, {tokens / elapsed:.0f} tokens/s"
+        )
         return embeddings
 
+    def encode_uncached(self, texts: List[str]) -> np.ndarray:
+        """
+        不经过缓存直接按长度分批编码 (供嵌入服务的微批次调用)
+        """
+        if not texts:
+            return np.empty((0, self._dimension(self._get_model())), dtype=np.float32)
+        return self._encode_batches(self._get_model(), texts, settings.EMBEDDING_BATCH_SIZE)[0]
+
+    def _encode_batches(self, model, texts: List[str], batch_size: int):
+        """
+        按 token 长度排序分批调用模型, 返回 (向量数组, token 总数)
+        """
+        lengths = np.asarray(self.count_tokens(texts))
+        # 稳定排序, 长文本在前: 首个批次即可暴露内存峰值
+        order = np.argsort(-lengths, kind="stable")
+
+        embeddings = None
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            batch = model.encode(
+                [texts[i] for i in idx],
+                batch_size=len(idx),
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+            batch = np.asarray(batch, dtype=np.float32)
+            if embeddings is None:
+                embeddings = np.empty((len(texts), batch.shape[1]), dtype=np.float32)
+            embeddings[idx] = batch
+        return embeddings, int(lengths.sum())
+
+    def encode_query(self, text: str) -> np.ndarray:
+        """
+        生成单条查询的向量 (float32 一维数组, 只读共享, 调用方不应修改)
+
+        检索专用的快速路径: 先查进程内 LRU, 再查 Redis 中其他 API 进程编码过的结果,
+        都未命中时交给本机嵌入服务 (未配置或不可用时直接调用本进程的模型, 跳过批量编码的分词计数和排序)
+        """
+        cache = self.query_cache
+        if cache is None:
+            return self._encode_one(text)
+
+        keys, found = cache.lookup([text])
+        if found:
+            return found[0]
+
+        vector = self._shared_get(keys[0])
+        if vector is None:
+            vector = self._encode_one(text)
+            self._shared_set(keys[0], vector)
+        cache.store(keys, vector[None, :])
+        return vector
+
+    def _encode_one(self, text: str) -> np.ndarray:
+        if self.server is not None and time.monotonic() >= self._server_retry_at:
+            try:
+                return self.server.encode([text])[0]
+            except (OSError, RuntimeError) as e:
+                logger.warning(f"Embedding server unavailable, encoding locally: {e}")
+                self._server_retry_at = time.monotonic() + 30
+        embeddings = self._get_model().encode([text], batch_size=1, convert_to_numpy=True, show_progress_bar=False)
+        return np.asarray(embeddings, dtype=np.float32)[0]
+
+    def _shared_client(self):
+        """
+        获取共享查询向量用的 Redis 客户端; 连接失败后暂停访问一段时间, 避免每次查询都等待超时
+        """
+        if settings.QUERY_EMBEDDING_REDIS_TTL <= 0 or time.monotonic() < self._redis_retry_at:
+            return None
+        if self._redis is None:
+            self._redis = get_redis_client()
+        return self._redis
+
+    def _shared_failed(self, e: Exception):
+        logger.warning(f"Query embedding Redis cache unavailable: {e}")
+        self._redis_retry_at = time.monotonic() + 30
+
+    def _shared_get(self, key: bytes) -> Optional[np.ndarray]:
+        client = self._shared_client()
+        if client is None:
+            return None
+        try:
+            value = client.get(f"{self.QUERY_KEY_PREFIX}:{key.hex()}")
+        except Exception as e:
+            self._shared_failed(e)
+            return None
+        if value is None:
+            return None
+        return np.frombuffer(base64.b64decode(value), dtype=np.float32)
+
+    def _shared_set(self, key: bytes, vector: np.ndarray):
+        client = self._shared_client()
+        if client is None:
+            return
+        try:
+            client.set(
+                f"{self.QUERY_KEY_PREFIX}:{key.hex()}",
+                base64.b64encode(vector.astype(np.float32).tobytes()).decode("ascii"),
+                ex=settings.QUERY_EMBEDDING_REDIS_TTL
+            )
+        except Exception as e:
+            self._shared_failed(e)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        当前进程的向量缓存命中统计
+        """
+        return {
+            "chunks": self.cache.stats() if self.cache is not None else {},
+            "queries": self.query_cache.stats() if self.query_cache is not None else {}
+        }
+
+    def server_stats(self) -> Dict[str, Any]:
+        """
+        本机嵌入服务的队列深度与批次大小统计, 未配置时返回空字典
+        """
+        if self.server is None:
+            return {}
+        try:
+            return self.server.stats()
+        except (OSError, RuntimeError) as e:
+            return {"error": str(e)}
+
 embedding_service = EmbeddingService()
@@ -1,7 +1,7 @@
 """
 知识图谱服务，负责实体识别和关系抽取
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 from app.utils.logger import logger
 from app.infrastructure.nebula import nebula_client
 import re
@@ -69,50 +69,74 @@ class KGService:
         """
         将实体和关系插入到图谱中
         """
+        self.insert_graph_batch([(doc_id, entities, relations)])
+
+    def insert_graph_batch(self, items: List[Tuple[str, List[Dict[str, Any]], List[Dict[str, Any]]]]):
+        """
+        批量插入多个文档的实体和关系 (多行 INSERT 语句)
+
+        items: [(doc_id, entities, relations), ...]
+        """
+        quote = self.nebula_client.quote
         try:
-            # 插入实体
-            for entity in entities:
-                # 使用唯一ID：实体名的哈希值
-                entity_id = f"ent_{hash(entity['name'])}"
-                self.nebula_client._execute(f"USE {self.nebula_client.space_name};")
-                self.nebula_client._execute(
-                    f'INSERT VERTEX IF NOT EXISTS entity(name, type) VALUES "{entity_id}":("{entity["name"]}", "{entity["type"]}");'
-                )
-                
-                # 建立文档与实体的关系
-                self.nebula_client._execute(
-                    f'INSERT EDGE IF NOT EXISTS relationship(relation) VALUES "{doc_id}"->"{entity_id}":("MENTIONS");'
-                )
-            
-            # 插入关系
-            for relation in relations:
-                source_id = f"ent_{hash(relation['source'])}"
-                target_id = f"ent_{hash(relation['target'])}"
-                self.nebula_client._execute(
-                    f'INSERT EDGE IF NOT EXISTS relationship(relation) VALUES "{source_id}"->"{target_id}":("{relation["relation"]}");'
-                )
-            
-            logger.info(f"Inserted {len(entities)} entities and {len(relations)} relations for document {doc_id}")
+            vertex_rows = {}
+            mention_rows = {}
+            relation_rows = {}
+            for doc_id, entities, relations in items:
+                for entity in entities:
+                    # 使用唯一ID：实体名的哈希值
+                    entity_id = f"ent_{hash(entity['name'])}"
+                    vertex_rows[entity_id] = f'{quote(entity_id)}:({quote(entity["name"])}, {quote(entity["type"])})'
+                    # 建立文档与实体的关系
+                    mention_rows[(doc_id, entity_id)] = f'{quote(doc_id)}->{quote(entity_id)}:("MENTIONS")'
+
+                for relation in relations:
+                    source_id = f"ent_{hash(relation['source'])}"
+                    target_id = f"ent_{hash(relation['target'])}"
+                    relation_rows[(source_id, target_id, relation["relation"])] = (
+                        f'{quote(source_id)}->{quote(target_id)}:({quote(relation["relation"])})'
+                    )
+
+            self.nebula_client.insert_rows("INSERT VERTEX IF NOT EXISTS entity(name, type)", list(vertex_rows.values()))
+            self.nebula_client.insert_rows("INSERT EDGE IF NOT EXISTS relationship(relation)", list(mention_rows.values()))
+            self.nebula_client.insert_rows("INSERT EDGE IF NOT EXISTS relationship(relation)", list(relation_rows.values()))
+
+            logger.info(f"Inserted {len(vertex_rows)} entities and {len(relation_rows)} relations for {len(items)} documents")
             
         except Exception as e:
             logger.error(f"Failed to insert entities and relations: {e}")
-    
-    def build_knowledge_graph(self, doc_id: str, chunks: List[Dict[str, Any]]):
-        """
-        构建知识图谱
-        """
-        logger.info(f"Building knowledge graph for document {doc_id}")
-        
+
+    def _extract_graph(self, chunks: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        entities = []
+        relations = []
         for chunk in chunks:
             text = chunk["content"]
             
             # 提取实体
-            entities = self.extract_entities(text)
+            chunk_entities = self.extract_entities(text)
             
             # 提取关系
-            relations = self.extract_relations(text, entities)
-            
-            # 插入实体和关系
-            self.insert_entities_and_relations(doc_id, entities, relations)
+            relations.extend(self.extract_relations(text, chunk_entities))
+            entities.extend(chunk_entities)
+        return entities, relations
+    
+    def build_knowledge_graph(self, doc_id: str, chunks: List[Dict[str, Any]]):
+        """
+        构建知识图谱
+        """
+        logger.info(f"Building knowledge graph for document {doc_id}")
+        self.build_knowledge_graph_batch([(doc_id, chunks)])
+
+    def build_knowledge_graph_batch(self, docs: List[Tuple[str, List[Dict[str, Any]]]]):
+        """
+        批量构建多个文档的知识图谱, 抽取结果合并后一次性写入
+        """
+        items = []
+        for doc_id, chunks in docs:
+            entities, relations = self._extract_graph(chunks)
+            items.append((doc_id, entities, relations))
+
+        # 插入实体和关系
+        self.insert_graph_batch(items)
 
 kg_service = KGService()
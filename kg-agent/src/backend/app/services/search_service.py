@@ -2,10 +2,16 @@ from typing import List, Optional
 from app.models import SearchQuery, SearchResponse, SearchResultItem, SearchMode
 from app.utils.logger import logger
 from app.services.embedding_service import embedding_service
-from app.infrastructure.milvus import milvus_client
+from app.infrastructure.vector_store import vector_store
+from app.services.centroid_service import centroid_service
 from app.infrastructure.elasticsearch import es_client
+from app.utils.search_filters import parse_filters
+from app.exceptions import ValidationError
+from app.config import get_settings
 import time
 
+settings = get_settings()
+
 class SearchService:
     def search(self, query: SearchQuery) -> SearchResponse:
         """
@@ -15,15 +21,31 @@ class SearchService:
         logger.info(f"Executing search query: {query.query} with mode {query.mode}")
         
         results = []
+        # 过滤条件下推到各检索后端, 条件无效时直接报错
+        filters = parse_filters(query.filters)
         
         # 1. Vector Search (Milvus)
         if query.mode in [SearchMode.VECTOR, SearchMode.HYBRID]:
             try:
-                embedding = embedding_service.encode([query.query])[0]
-                milvus_results = milvus_client.search(embedding, top_k=query.top_k)
+                embedding = embedding_service.encode_query(query.query).tolist()
+                candidate_docs = query.candidate_docs if query.candidate_docs is not None else settings.TWO_STAGE_DOC_CANDIDATES
+                if candidate_docs and centroid_service.enabled:
+                    # 两阶段检索: 先按文档向量选出候选文档, 再只检索这些文档的分块
+                    milvus_results = centroid_service.search(
+                        embedding, top_k=query.top_k, doc_candidates=candidate_docs,
+                        chunk_candidates=query.candidate_chunks or settings.TWO_STAGE_CHUNK_CANDIDATES,
+                        effort=query.search_effort, filters=filters
+                    )
+                else:
+                    milvus_results = vector_store.search(
+                        embedding, top_k=query.top_k, effort=query.search_effort, filters=filters
+                    )
                 
                 for hits in milvus_results:
                     for hit in hits:
+                        # 指定相似度阈值时在融合前应用 (distance 为余弦相似度)
+                        if query.threshold is not None and hit.distance < query.threshold:
+                            continue
                         results.append(SearchResultItem(
                             id=str(hit.entity.get("doc_id")),
                             content=hit.entity.get("content"),
@@ -31,13 +53,16 @@ class SearchService:
                             source="vector",
                             metadata={"chunk_index": hit.entity.get("chunk_index")}
                         ))
+            except ValidationError:
+                # 过滤条件对该集合无效 (早于属性字段创建), 返回给调用方而不是当作无结果
+                raise
             except Exception as e:
                 logger.error(f"Vector search failed: {e}")
 
         # 2. Fulltext Search (ES)
         if query.mode in [SearchMode.FULLTEXT, SearchMode.HYBRID]:
             try:
-                es_hits = es_client.search(query.query, top_k=query.top_k)
+                es_hits = es_client.search(query.query, top_k=query.top_k, filters=filters)
                 for hit in es_hits:
                     source = hit['_source']
                     results.append(SearchResultItem(
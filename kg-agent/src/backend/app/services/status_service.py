@@ -0,0 +1,191 @@
+"""
+文档处理状态服务，在 Redis 中维护每个文档的流水线状态记录
+"""
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models import ProcessingStatus, PipelineStage
+from app.utils.cache_manager import get_redis_client
+from app.utils.logger import logger
+
+
+class StatusService:
+    KEY_PREFIX = "kg:doc_status"
+    BATCH_KEY_PREFIX = "kg:batch_status"
+
+    def _key(self, doc_id: str) -> str:
+        return f"{self.KEY_PREFIX}:{doc_id}"
+
+    def _batch_key(self, batch_id: str) -> str:
+        return f"{self.BATCH_KEY_PREFIX}:{batch_id}"
+
+    def _write(self, doc_id: str, fields: Dict[str, Any]):
+        """
+        写入状态字段 (值以 JSON 编码), Redis 不可用时只记录告警, 不中断流水线
+        """
+        fields["updated_at"] = datetime.utcnow().isoformat()
+        mapping = {k: json.dumps(v, default=str) for k, v in fields.items()}
+        try:
+            get_redis_client().hset(self._key(doc_id), mapping=mapping)
+        except Exception as e:
+            logger.warning(f"Failed to update status for document {doc_id}: {e}")
+
+    def init(self, doc_id: str, **fields):
+        """
+        创建文档状态记录
+        """
+        self._write(doc_id, {
+            "status": ProcessingStatus.PENDING.value,
+            "stage": PipelineStage.QUEUED.value,
+            "retries": 0,
+            "error": None,
+            **fields
+        })
+
+    def init_many(self, records: List[Tuple[str, Dict[str, Any]]]):
+        """
+        批量创建文档状态记录 (单次 Redis pipeline 往返)
+        """
+        now = datetime.utcnow().isoformat()
+        try:
+            pipe = get_redis_client().pipeline(transaction=False)
+            for doc_id, fields in records:
+                record = {
+                    "status": ProcessingStatus.PENDING.value,
+                    "stage": PipelineStage.QUEUED.value,
+                    "retries": 0,
+                    "error": None,
+                    "updated_at": now,
+                    **fields
+                }
+                pipe.hset(self._key(doc_id), mapping={k: json.dumps(v, default=str) for k, v in record.items()})
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to create status records for {len(records)} documents: {e}")
+
+    def update(
+        self,
+        doc_id: str,
+        status: Optional[ProcessingStatus] = None,
+        stage: Optional[PipelineStage] = None,
+        **fields
+    ):
+        """
+        更新文档状态/阶段及附加字段
+        """
+        if status is not None:
+            fields["status"] = ProcessingStatus(status).value
+        if stage is not None:
+            fields["stage"] = PipelineStage(stage).value
+        self._write(doc_id, fields)
+
+    def mark_completed(self, doc_id: str, **fields):
+        self.update(
+            doc_id,
+            status=ProcessingStatus.COMPLETED,
+            stage=PipelineStage.DONE,
+            error=None,
+            processed_at=datetime.utcnow().isoformat(),
+            **fields
+        )
+
+    def mark_failed(self, doc_id: str, stage: Optional[PipelineStage], error: str):
+        self.update(doc_id, status=ProcessingStatus.FAILED, stage=stage, error=error)
+
+    def delete(self, doc_id: str):
+        """
+        删除文档状态记录
+        """
+        try:
+            get_redis_client().delete(self._key(doc_id))
+        except Exception as e:
+            logger.warning(f"Failed to delete status for document {doc_id}: {e}")
+
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取文档状态记录, 不存在时返回 None
+        """
+        try:
+            raw = get_redis_client().hgetall(self._key(doc_id))
+        except Exception as e:
+            logger.warning(f"Failed to read status for document {doc_id}: {e}")
+            return None
+        if not raw:
+            return None
+        return {k: json.loads(v) for k, v in raw.items()}
+
+    def get_many(self, doc_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        批量获取文档状态记录 (单次 Redis pipeline 往返), 读取失败或不存在的为 None
+        """
+        try:
+            pipe = get_redis_client().pipeline(transaction=False)
+            for doc_id in doc_ids:
+                pipe.hgetall(self._key(doc_id))
+            raws = pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to read status for {len(doc_ids)} documents: {e}")
+            return {doc_id: None for doc_id in doc_ids}
+        return {
+            doc_id: {k: json.loads(v) for k, v in raw.items()} if raw else None
+            for doc_id, raw in zip(doc_ids, raws)
+        }
+
+    def init_batch(self, batch_id: str, total: int, **fields):
+        """
+        创建批量导入记录, completed/failed 计数由各微批次原子累加
+
+        内容重复而跳过的文档计入 completed, 同时单独累加到 duplicates
+        """
+        mapping = {
+            "batch_id": batch_id,
+            "total": total,
+            "completed": 0,
+            "failed": 0,
+            "duplicates": 0,
+            "created_at": datetime.utcnow().isoformat(),
+            **{k: json.dumps(v, default=str) for k, v in fields.items()}
+        }
+        try:
+            get_redis_client().hset(self._batch_key(batch_id), mapping=mapping)
+        except Exception as e:
+            logger.warning(f"Failed to create batch record {batch_id}: {e}")
+
+    def incr_batch(self, batch_id: str, completed: int = 0, failed: int = 0, duplicates: int = 0):
+        try:
+            pipe = get_redis_client().pipeline()
+            for field, amount in (("completed", completed), ("failed", failed), ("duplicates", duplicates)):
+                if amount:
+                    pipe.hincrby(self._batch_key(batch_id), field, amount)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to update batch record {batch_id}: {e}")
+
+    def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取批量导入的聚合进度, 不存在时返回 None
+        """
+        try:
+            raw = get_redis_client().hgetall(self._batch_key(batch_id))
+        except Exception as e:
+            logger.warning(f"Failed to read batch record {batch_id}: {e}")
+            return None
+        if not raw:
+            return None
+
+        counters = ("total", "completed", "failed", "duplicates")
+        record = {k: (int(v) if k in counters else v) for k, v in raw.items()}
+        for key in set(record) - set(counters) - {"batch_id", "created_at"}:
+            record[key] = json.loads(record[key])
+
+        done = record["completed"] + record["failed"]
+        record["pending"] = max(record["total"] - done, 0)
+        record["progress"] = round(done / record["total"], 4) if record["total"] else 1.0
+        if done >= record["total"]:
+            record["status"] = ProcessingStatus.FAILED.value if record["failed"] == record["total"] and record["total"] else ProcessingStatus.COMPLETED.value
+        else:
+            record["status"] = ProcessingStatus.PROCESSING.value if done else ProcessingStatus.PENDING.value
+        return record
+
+status_service = StatusService()
@@ -1,4 +1,11 @@
-from app.tasks.document import process_document_pipeline, extract_text, chunk_text
-from app.tasks.index import index_chunks
+from app.tasks.document import (
+    process_document_pipeline, build_pipeline, extract_text, chunk_text, extract_and_chunk,
+    process_batch, build_batch_pipeline, prepare_batch_document
+)
+from app.tasks.index import index_chunks, reindex_chunks, index_batch
 
-__all__ = ["process_document_pipeline", "extract_text", "chunk_text", "index_chunks"]
+__all__ = [
+    "process_document_pipeline", "build_pipeline", "extract_text", "chunk_text",
+    "extract_and_chunk", "process_batch", "build_batch_pipeline", "prepare_batch_document",
+    "index_chunks", "reindex_chunks", "index_batch"
+]
@@ -1,64 +1,286 @@
 from app.celery_app import celery_app
+from app.config import get_settings
 from app.utils.logger import logger
-from app.utils.text_processor import text_processor
-from app.models import Document, ProcessingStatus, DocumentType
-from celery import chain
-from typing import List, Dict, Any
-import time
+from app.utils.text_processor import text_processor, prefetch, EXTRACTOR_VERSION
+from app.utils.spill_store import spill_store
+from app.utils.parse_cache import parse_cache
+from app.utils.file_handler import calculate_file_hash
+from app.models import DocumentType, ProcessingStatus, PipelineStage
+from app.services.status_service import status_service
+from app.services.embedding_service import embedding_service
+from app.tasks import routing
+from celery import chain, chord
+from typing import List, Dict, Any, Optional
+import os
 
-@celery_app.task(bind=True)
-def process_document_pipeline(self, doc_id: str, file_path: str):
+settings = get_settings()
+
+class PipelineTask(celery_app.Task):
+    """
+    流水线阶段任务基类
+
+    统一各阶段的重试策略, 并在阶段开始/重试/失败时更新文档状态记录。
+    阶段任务通过关键字参数 doc_id 关联文档。
+    """
+    stage: Optional[PipelineStage] = None
+    autoretry_for = (Exception,)
+    # 文件缺失或解析失败属于确定性错误, 重试无意义
+    dont_autoretry_for = (FileNotFoundError, ValueError)
+    max_retries = settings.PIPELINE_MAX_RETRIES
+    retry_backoff = True
+    retry_backoff_max = 60
+    retry_jitter = True
+
+    def before_start(self, task_id, args, kwargs):
+        doc_id = kwargs.get("doc_id")
+        if doc_id and self.stage:
+            status_service.update(
+                doc_id,
+                status=ProcessingStatus.PROCESSING,
+                stage=self.stage,
+                task_id=task_id
+            )
+
+    def on_retry(self, exc, task_id, args, kwargs, einfo):
+        doc_id = kwargs.get("doc_id")
+        if doc_id:
+            status_service.update(doc_id, retries=self.request.retries + 1, error=str(exc))
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        doc_id = kwargs.get("doc_id")
+        if doc_id:
+            status_service.mark_failed(doc_id, self.stage, str(exc))
+
+def _detect_doc_type(file_path: str) -> DocumentType:
+    ext = file_path.lower().split('.')[-1]
+    if ext == 'pdf': return DocumentType.PDF
+    if ext in ['doc', 'docx']: return DocumentType.DOCX
+    if ext == 'md': return DocumentType.MARKDOWN
+    if ext == 'html': return DocumentType.HTML
+    return DocumentType.TXT
+
+def _iter_source_pages(file_path: str, doc_type: str, content_hash: Optional[str] = None):
+    """
+    按页提取文本: 优先读取解析缓存, 未命中时后台线程解析并边产出边写入缓存
+
+    content_hash 为上传/导入时已计算的文件 SHA-256, 未提供时才重新计算
+    """
+    if not parse_cache.enabled:
+        return prefetch(text_processor.iter_pages(file_path, DocumentType(doc_type)), settings.EXTRACT_PREFETCH_PAGES)
+
+    content_hash = content_hash or calculate_file_hash(file_path, "sha256")
+    key = parse_cache.make_key(content_hash, DocumentType(doc_type).value, EXTRACTOR_VERSION)
+    cached = parse_cache.get(key)
+    if cached is not None:
+        logger.info(f"Parse cache hit for {file_path}")
+        return cached
+    pages = prefetch(text_processor.iter_pages(file_path, DocumentType(doc_type)), settings.EXTRACT_PREFETCH_PAGES)
+    return parse_cache.write_through(key, pages)
+
+def build_pipeline(doc_id: str, file_path: str, doc_type: Optional[DocumentType] = None, update: bool = False,
+                   content_hash: Optional[str] = None):
+    """
+    构建 提取 -> 分块 -> 索引 的任务链
+
+    小文件 (<= PIPELINE_FUSE_MAX_BYTES) 在同一个任务内完成提取和分块, 减少一次 broker 往返。
+    update=True 时最后一个阶段为增量索引 (只重建变化的分块)。
+    各阶段按文档的调度级别路由到对应队列 (见 app.tasks.routing)。
+    """
+    from app.tasks.index import index_chunks, reindex_chunks
+
+    doc_type = DocumentType(doc_type or _detect_doc_type(file_path))
+    file_size = os.path.getsize(file_path)
+    job_class = routing.classify(file_size, doc_type)
+    extract_route = routing.route(job_class, "extract")
+
+    fuse_limit = settings.PIPELINE_FUSE_MAX_BYTES
+    if fuse_limit and file_size <= fuse_limit:
+        stages = [
+            extract_and_chunk.s(file_path, doc_type.value, doc_id=doc_id, content_hash=content_hash).set(**extract_route)
+        ]
+    else:
+        stages = [
+            extract_text.s(file_path, doc_type.value, doc_id=doc_id, content_hash=content_hash).set(**extract_route),
+            chunk_text.s(doc_id=doc_id).set(**extract_route),
+        ]
+    index_task = reindex_chunks if update else index_chunks
+    return chain(*stages, index_task.s(doc_id=doc_id).set(**routing.route(job_class, "index")))
+
+def build_batch_pipeline(batch_id: str, docs: List[Dict[str, Any]]):
+    """
+    构建一个微批次的 扇出(提取+分块) -> 汇聚(批量索引) chord
+
+    docs: [{"doc_id", "file_path", "doc_type", "file_size", "content_hash"}, ...]
+
+    扇出任务走 bulk 队列 (预估代价过大的文档走 large 队列), 汇聚索引走 bulk 索引队列
+    """
+    from app.tasks.index import index_batch
+
+    header = [
+        prepare_batch_document.s(
+            doc["file_path"], doc["doc_type"], doc_id=doc["doc_id"], content_hash=doc.get("content_hash")
+        ).set(
+            **routing.route(routing.classify(doc.get("file_size") or 0, doc["doc_type"], bulk=True), "extract")
+        )
+        for doc in docs
+    ]
+    body = index_batch.s(batch_id=batch_id, doc_ids=[doc["doc_id"] for doc in docs]).set(
+        **routing.route(routing.BULK, "index")
+    )
+    return chord(header, body)
+
+@celery_app.task(bind=True, priority=routing.PRIORITIES[routing.INTERACTIVE])
+def process_document_pipeline(self, doc_id: str, file_path: str, update: bool = False,
+                              content_hash: Optional[str] = None):
     """
     文档处理流水线入口
+
+    只负责编排任务链并立即返回, 不在 worker 内同步等待其他阶段的结果。
     """
-    logger.info(f"Starting processing pipeline for document {doc_id}")
-    
+    logger.info(f"Starting {'update' if update else 'processing'} pipeline for document {doc_id}")
+
     try:
-        # Determine doc type
-        ext = file_path.lower().split('.')[-1]
-        doc_type = DocumentType.TXT
-        if ext == 'pdf': doc_type = DocumentType.PDF
-        elif ext in ['doc', 'docx']: doc_type = DocumentType.DOCX
-        elif ext == 'md': doc_type = DocumentType.MARKDOWN
-        elif ext == 'html': doc_type = DocumentType.HTML
-
-        # 1. 文本提取
-        text = extract_text.delay(file_path, doc_type).get()
-        
-        # 2. 文本分块
-        chunks = chunk_text.delay(text).get()
-        
-        # 3. 触发索引构建 (异步)
-        from app.tasks.index import index_chunks
-        index_chunks.delay(doc_id, chunks)
-        
-        return {"status": "processing_started", "doc_id": doc_id}
-        
+        result = build_pipeline(doc_id, file_path, update=update, content_hash=content_hash).apply_async()
+        return {"status": "processing_started", "doc_id": doc_id, "task_id": result.id}
+
     except Exception as e:
         logger.error(f"Pipeline failed for {doc_id}: {str(e)}")
-        # TODO: Update document status to FAILED
+        status_service.mark_failed(doc_id, PipelineStage.QUEUED, str(e))
         raise e
 
-@celery_app.task
-def extract_text(file_path: str, doc_type: str) -> str:
+@celery_app.task(base=PipelineTask, stage=PipelineStage.EXTRACTING)
+def extract_text(file_path: str, doc_type: str, doc_id: str, content_hash: Optional[str] = None) -> Dict[str, Any]:
     """
-    真实文本提取任务 (基于 LangChain)
+    文本提取任务 (原生解析器逐页流式提取, 命中解析缓存时直接读取)
+
+    逐页提取并逐页写入落盘存储, 只返回引用 (路径 + 校验和)
     """
     logger.info(f"Extracting text from {file_path} ({doc_type})")
     try:
-        return text_processor.load_document(file_path, DocumentType(doc_type))
+        pages = _iter_source_pages(file_path, doc_type, content_hash)
+        return spill_store.write(doc_id, "pages", ({"page_number": page, "text": text} for page, text in pages))
     except Exception as e:
         logger.error(f"Extraction failed: {str(e)}")
         raise e
 
-@celery_app.task
-def chunk_text(text: str) -> List[Dict[str, Any]]:
+@celery_app.task(base=PipelineTask, stage=PipelineStage.CHUNKING)
+def chunk_text(pages_ref: Dict[str, Any], doc_id: str) -> Dict[str, Any]:
     """
-    真实文本分块任务 (基于 LangChain RecursiveCharacterTextSplitter)
+    文本分块任务 (基于字符区间的 SpanChunker)
+
+    逐页读取提取结果增量分块, 不在内存中拼接全文
     """
-    logger.info(f"Chunking text length: {len(text)}")
     try:
-        return text_processor.split_text(text)
+        logger.info(f"Chunking {pages_ref['count']} pages of document {doc_id}")
+        pages = ((record.get("page_number"), record["text"]) for record in spill_store.iter_records(pages_ref))
+        return spill_store.write(doc_id, "chunks", text_processor.iter_chunks(pages, embedding_service.count_tokens))
     except Exception as e:
         logger.error(f"Chunking failed: {str(e)}")
         raise e
+
+@celery_app.task(bind=True, priority=routing.PRIORITIES[routing.BULK])
+def process_batch(self, batch_id: str, manifest_ref: Dict[str, Any]):
+    """
+    批量导入入口: 读取清单, 跳过内容重复的文件, 创建文档状态记录, 按 BATCH_MICRO_SIZE 分发微批次
+    """
+    from app.services.document_service import document_service
+
+    manifest = spill_store.read(manifest_ref)
+    for doc in manifest:
+        # 服务端导入的文件在这里才计算哈希, 上传的文件在接收时已计算
+        if not doc.get("content_hash"):
+            doc["content_hash"] = calculate_file_hash(doc["file_path"], "sha256")
+    # 状态记录先于内容哈希登记创建 (见 DocumentService.claim_content)
+    status_service.init_many([
+        (doc["doc_id"], {k: v for k, v in doc.items() if k != "doc_id"} | {"batch_id": batch_id})
+        for doc in manifest
+    ])
+
+    docs, duplicates = [], []
+    for doc in manifest:
+        existing_id = document_service.claim_content(doc["content_hash"], doc["doc_id"], doc.get("tenant"))
+        if existing_id:
+            duplicates.append((doc, existing_id))
+        else:
+            docs.append(doc)
+    logger.info(f"Dispatching batch {batch_id} with {len(docs)} documents ({len(duplicates)} duplicates skipped)")
+
+    status_service.init_many([
+        (doc["doc_id"], {k: v for k, v in doc.items() if k != "doc_id"} | {
+            "batch_id": batch_id,
+            "status": ProcessingStatus.COMPLETED.value,
+            "stage": PipelineStage.DONE.value,
+            "duplicate_of": existing_id
+        })
+        for doc, existing_id in duplicates
+    ])
+    if duplicates:
+        status_service.incr_batch(batch_id, completed=len(duplicates), duplicates=len(duplicates))
+
+    size = max(settings.BATCH_MICRO_SIZE, 1)
+    for i in range(0, len(docs), size):
+        build_batch_pipeline(batch_id, docs[i:i + size]).apply_async()
+
+    spill_store.delete(batch_id)
+    return {
+        "status": "processing_started",
+        "batch_id": batch_id,
+        "total": len(docs),
+        "duplicates": len(duplicates)
+    }
+
+def _mark_chunking(pages, doc_id: str):
+    """
+    提取与分块交替进行, 第一页进入分块时更新阶段
+    """
+    started = False
+    for page in pages:
+        if not started:
+            status_service.update(doc_id, stage=PipelineStage.CHUNKING)
+            started = True
+        yield page
+
+def _extract_and_chunk(file_path: str, doc_type: str, doc_id: str, content_hash: Optional[str] = None) -> Dict[str, Any]:
+    # 后台线程解析后续页面的同时, 当前线程分块并写入已解析的页面
+    pages = _mark_chunking(_iter_source_pages(file_path, doc_type, content_hash), doc_id)
+    return spill_store.write(doc_id, "chunks", text_processor.iter_chunks(pages, embedding_service.count_tokens))
+
+@celery_app.task(base=PipelineTask, stage=PipelineStage.EXTRACTING)
+def extract_and_chunk(file_path: str, doc_type: str, doc_id: str, content_hash: Optional[str] = None) -> Dict[str, Any]:
+    """
+    小文件快速通道: 在同一进程内完成文本提取和分块
+    """
+    logger.info(f"Extracting and chunking {file_path} ({doc_type}) in-process")
+    try:
+        return _extract_and_chunk(file_path, doc_type, doc_id, content_hash)
+    except Exception as e:
+        logger.error(f"Extract+chunk failed: {str(e)}")
+        raise e
+
+@celery_app.task(bind=True, base=PipelineTask, stage=PipelineStage.EXTRACTING, autoretry_for=())
+def prepare_batch_document(self, file_path: str, doc_type: str, doc_id: str,
+                           content_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    批量导入的扇出阶段: 提取+分块
+
+    最终失败时返回 None 而不是抛出异常, 避免单个文档中断整个微批次的 chord
+    """
+    try:
+        return _extract_and_chunk(file_path, doc_type, doc_id, content_hash)
+    except Exception as e:
+        transient = not isinstance(e, self.dont_autoretry_for)
+        if transient and self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=2 ** self.request.retries)
+        logger.error(f"Batch document {doc_id} failed to prepare: {str(e)}")
+        status_service.mark_failed(doc_id, PipelineStage.EXTRACTING, str(e))
+        return None
+
+@celery_app.task
+def gc_spill_store() -> int:
+    """
+    定时清理过期的流水线中间结果
+    """
+    removed = spill_store.gc(settings.SPILL_TTL_SECONDS)
+    if removed:
+        logger.info(f"Removed {removed} stale spill directories")
+    return removed
@@ -1,45 +1,249 @@
 from app.celery_app import celery_app
 from app.utils.logger import logger
-from typing import List, Dict, Any
+from app.models import PipelineStage
+from app.services.status_service import status_service
+from app.services.content_registry import content_registry
+from app.tasks.document import PipelineTask
+from app.utils.spill_store import spill_store
+from app.utils.chunk_diff import chunk_hash, diff_chunks
+from app.utils.search_filters import document_attributes
+from typing import List, Dict, Any, Optional
+import numpy as np
 
 # Import Infrastructure Clients
 from app.services.embedding_service import embedding_service
-from app.infrastructure.milvus import milvus_client
+from app.infrastructure.vector_store import vector_store
 from app.infrastructure.elasticsearch import es_client
 from app.infrastructure.nebula import nebula_client
 from app.services.kg_service import kg_service
+from app.services.centroid_service import centroid_service
 
-@celery_app.task
-def index_chunks(doc_id: str, chunks: List[Dict[str, Any]]):
+def graph_fields(record: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    图谱中 Document 顶点的属性 (文件名与类型), 取自文档状态记录
+    """
+    record = record or {}
+    return {key: record[key] for key in ("filename", "doc_type") if record.get(key)}
+
+@celery_app.task(bind=True, base=PipelineTask, stage=PipelineStage.INDEXING)
+def index_chunks(self, chunks_ref: Dict[str, Any], doc_id: str):
     """
     构建索引任务 (ES + Milvus + Nebula)
+
+    作为任务链的最后一个阶段, chunks_ref 为上一阶段写入落盘存储的分块引用。
+    向量写入进程内共享的缓冲, 与其他文档合并批量写入; 在标记完成前等待写入确认。
     """
-    logger.info(f"Indexing {len(chunks)} chunks for document {doc_id}")
-    
+    vectors_written = None
     try:
+        chunks = spill_store.read(chunks_ref)
+        logger.info(f"Indexing {len(chunks)} chunks for document {doc_id}")
+
+        # 重试时先清理上一次尝试可能已写入的向量, 避免重复
+        if self.request.retries:
+            vector_store.delete_documents([doc_id])
+
         # 1. Generate Embeddings
         logger.info("Generating embeddings...")
         texts = [c['content'] for c in chunks]
         embeddings = embedding_service.encode(texts)
+        # 文档级可过滤属性, 随全文和每个分块写入
+        record = status_service.get(doc_id) or {}
+        attributes = document_attributes(record)
         
         # 2. Index into Elasticsearch
         # Concat full content for ES
         full_content = "\n\n".join(texts)
-        es_client.index_document(doc_id, full_content, metadata={"chunk_count": len(chunks)})
+        es_client.index_document(doc_id, full_content, metadata={"chunk_count": len(chunks)}, attributes=attributes)
         
-        # 3. Index into Milvus
-        milvus_client.insert_chunks(doc_id, chunks, embeddings)
+        # 3. Index into Milvus (buffered)
+        vectors_written = vector_store.insert_batch_async([(doc_id, chunks, embeddings, attributes)])
         
         # 4. Construct Graph & Index into Nebula
-        nebula_client.insert_structure(doc_id, chunks)
+        nebula_client.insert_structure(doc_id, chunks, **graph_fields(record))
         
         # 5. Build Knowledge Graph
         logger.info("Building knowledge graph...")
         kg_service.build_knowledge_graph(doc_id, chunks)
-        
+
+        vectors_written.result()
+        # 6. 文档级向量 (两阶段检索的第一阶段)
+        centroid_service.set_documents([(doc_id, embeddings, attributes)])
         logger.info(f"Indexing completed for document {doc_id}")
+        content_registry.set_chunk_hashes(doc_id, [chunk_hash(t) for t in texts])
+        status_service.mark_completed(doc_id, chunk_count=len(chunks))
+        spill_store.delete(doc_id)
         return {"status": "indexed", "doc_id": doc_id, "chunk_count": len(chunks)}
         
     except Exception as e:
         logger.error(f"Indexing failed for {doc_id}: {e}")
+        # 尚未写入的向量不再写入, 重试时重新生成
+        if vectors_written is not None:
+            vectors_written.cancel()
+        raise e
+
+@celery_app.task(bind=True, base=PipelineTask, stage=PipelineStage.INDEXING)
+def reindex_chunks(self, chunks_ref: Dict[str, Any], doc_id: str):
+    """
+    文档更新的增量索引任务
+
+    按分块内容哈希与上一版本比对: 只对新增/变化的分块生成向量并写入, 位置变化的分块复用已存向量,
+    旧版本多出的分块从 Milvus / Nebula 删除; ES 中的全文整体覆盖。
+    """
+    try:
+        chunks = spill_store.read(chunks_ref)
+        texts = [c['content'] for c in chunks]
+        new_hashes = [chunk_hash(t) for t in texts]
+        previous = content_registry.get_chunk_hashes(doc_id)
+
+        # 没有上一版本的哈希记录, 或重试时 (上一次尝试可能已删除部分旧分块), 退化为全量重建
+        full_rebuild = previous is None or self.request.retries > 0
+        if full_rebuild:
+            vector_store.delete_documents([doc_id])
+        diff = diff_chunks([] if full_rebuild else previous, new_hashes)
+        logger.info(
+            f"Re-indexing document {doc_id}: {len(diff.added)} added, {len(diff.moved)} moved, "
+            f"{len(diff.removed)} removed, {len(diff.unchanged)} unchanged"
+        )
+
+        # 1. 位置变化的分块复用已存向量, 取不到的与新增分块一起重新生成
+        record = status_service.get(doc_id) or {}
+        attributes = document_attributes(record)
+        rewritten = diff.rewritten
+        # 文档级向量的增量修正需要被删除分块的旧向量, 与复用的向量一并读取
+        wanted = list(diff.moved.values()) + (diff.removed if centroid_service.enabled else [])
+        stored = vector_store.get_chunk_vectors(doc_id, wanted, attributes)
+        vectors = {new: stored[old] for new, old in diff.moved.items() if old in stored}
+        to_embed = [i for i in rewritten if i not in vectors]
+        if to_embed:
+            vectors.update(zip(to_embed, embedding_service.encode([texts[i] for i in to_embed])))
+
+        # 2. Milvus: 删除旧位置, 按新位置写入
+        vector_store.delete_chunks(doc_id, diff.stale)
+        if rewritten:
+            vector_store.insert_chunks(
+                doc_id, [chunks[i] for i in rewritten], np.stack([vectors[i] for i in rewritten]), attributes
+            )
+
+        # 文档级向量: 按新增/删除的分块增量修正; 全量重建, 缺少之前的状态或旧向量时按全部分块重新计算
+        if centroid_service.enabled:
+            removed = [stored[i] for i in diff.removed if i in stored]
+            if full_rebuild or len(removed) < len(diff.removed) or not centroid_service.update_document(
+                    doc_id, [vectors[i] for i in diff.added], removed, attributes):
+                current = vector_store.get_chunk_vectors(doc_id, diff.unchanged, attributes)
+                current.update(vectors)
+                centroid_service.set_documents([(doc_id, [current[i] for i in sorted(current)], attributes)])
+
+        # 3. Elasticsearch 以文档为单位存储, 整体覆盖
+        es_client.index_document(doc_id, "\n\n".join(texts), metadata={"chunk_count": len(chunks)}, attributes=attributes)
+
+        # 4. Nebula 的 Chunk 顶点只按索引区分, 只需补齐或删除尾部
+        old_count = len(previous or [])
+        nebula_client.insert_structure(doc_id, chunks[old_count:], **graph_fields(record))
+        nebula_client.delete_chunks(doc_id, list(range(len(chunks), old_count)))
+
+        # 5. 只对新增分块抽取实体关系
+        added_chunks = [chunks[i] for i in diff.added]
+        if added_chunks:
+            kg_service.build_knowledge_graph(doc_id, added_chunks)
+
+        content_registry.set_chunk_hashes(doc_id, new_hashes)
+        status_service.mark_completed(
+            doc_id,
+            chunk_count=len(chunks),
+            chunks_added=len(diff.added),
+            chunks_moved=len(diff.moved),
+            chunks_removed=len(diff.removed)
+        )
+        spill_store.delete(doc_id)
+        return {
+            "status": "reindexed",
+            "doc_id": doc_id,
+            "chunk_count": len(chunks),
+            "added": len(diff.added),
+            "moved": len(diff.moved),
+            "removed": len(diff.removed)
+        }
+
+    except Exception as e:
+        logger.error(f"Re-indexing failed for {doc_id}: {e}")
         raise e
+
+class BatchIndexTask(PipelineTask):
+    """
+    批量索引任务基类: 状态记录在任务体内按文档更新, 失败时整批标记为失败
+    """
+    def before_start(self, task_id, args, kwargs):
+        pass
+
+    def on_retry(self, exc, task_id, args, kwargs, einfo):
+        logger.warning(f"Retrying batch index for {len(kwargs.get('doc_ids') or [])} documents: {exc}")
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        doc_ids = kwargs.get("doc_ids") or []
+        for doc_id in doc_ids:
+            status_service.mark_failed(doc_id, self.stage, str(exc))
+        if kwargs.get("batch_id"):
+            status_service.incr_batch(kwargs["batch_id"], failed=len(doc_ids))
+
+@celery_app.task(bind=True, base=BatchIndexTask, stage=PipelineStage.INDEXING)
+def index_batch(self, chunk_refs: List[Optional[Dict[str, Any]]], batch_id: str, doc_ids: List[str]):
+    """
+    微批次汇聚索引任务: 一次 embedding 调用, ES bulk, 缓冲的 Milvus insert, 多行 Nebula INSERT
+
+    chunk_refs 为 chord 头部各文档的分块引用 (与 doc_ids 顺序一致), 准备失败的文档为 None
+    """
+    docs = []
+    for doc_id, ref in zip(doc_ids, chunk_refs):
+        if ref is not None:
+            docs.append((doc_id, spill_store.read(ref)))
+    failed = len(doc_ids) - len(docs)
+    logger.info(f"Indexing micro-batch of {len(docs)} documents for batch {batch_id} ({failed} failed to prepare)")
+
+    for doc_id, _ in docs:
+        status_service.update(doc_id, stage=PipelineStage.INDEXING)
+
+    # 重试时先清理上一次尝试可能已写入的向量, 避免重复
+    if self.request.retries:
+        vector_store.delete_documents([doc_id for doc_id, _ in docs])
+
+    texts = [c['content'] for _, chunks in docs for c in chunks]
+    # (n, dim) float32 数组, 各文档取行切片视图, 不转换为 Python 列表
+    embeddings = embedding_service.encode(texts)
+    records = status_service.get_many([doc_id for doc_id, _ in docs])
+
+    es_docs = []
+    vector_items = []
+    offset = 0
+    for doc_id, chunks in docs:
+        doc_texts = texts[offset:offset + len(chunks)]
+        attributes = document_attributes(records.get(doc_id))
+        es_docs.append({
+            "doc_id": doc_id,
+            "content": "\n\n".join(doc_texts),
+            "metadata": {"chunk_count": len(chunks), "batch_id": batch_id},
+            "attributes": attributes
+        })
+        vector_items.append((doc_id, chunks, embeddings[offset:offset + len(chunks)], attributes))
+        offset += len(chunks)
+
+    es_client.bulk_index_documents(es_docs)
+    vectors_written = vector_store.insert_batch_async(vector_items)
+    try:
+        nebula_client.insert_structure_batch([
+            {"doc_id": doc_id, "chunks": chunks, **graph_fields(records.get(doc_id))} for doc_id, chunks in docs
+        ])
+        kg_service.build_knowledge_graph_batch(docs)
+        vectors_written.result()
+        centroid_service.set_documents([(doc_id, doc_embeddings, attributes)
+                                        for doc_id, _, doc_embeddings, attributes in vector_items])
+    except Exception:
+        vectors_written.cancel()
+        raise
+
+    for doc_id, chunks in docs:
+        content_registry.set_chunk_hashes(doc_id, [chunk_hash(c['content']) for c in chunks])
+        status_service.mark_completed(doc_id, chunk_count=len(chunks))
+        spill_store.delete(doc_id)
+    status_service.incr_batch(batch_id, completed=len(docs), failed=failed)
+
+    return {"status": "indexed", "batch_id": batch_id, "indexed": len(docs), "failed": failed}
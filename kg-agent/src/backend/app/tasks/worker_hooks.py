@@ -0,0 +1,88 @@
+"""
+Celery worker 生命周期钩子: 嵌入模型预加载与预热, 退出前写入缓冲的向量
+
+- worker_init (主进程, fork 之前): 加载模型和分词器并冻结 GC 追踪的对象,
+  prefork 子进程以写时复制方式共享权重, 不再各自加载
+- worker_process_init (每个 prefork 子进程): 做一次推理预热, 首个文档不承担冷启动开销;
+  onnx 后端的会话不能跨 fork 使用, 改为由每个子进程各自加载
+- worker_process_shutdown: 写入向量存储写入缓冲中剩余的行, 关闭 PDF 解析进程池
+  (prefork 子进程以 os._exit 退出, 不会执行 atexit)
+
+prefork 池的主进程只加载不推理: 在父进程中初始化过的 OpenMP / tokenizers 线程池在 fork 后的子进程中可能死锁。
+"""
+import gc
+import os
+
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
+
+from app.config import get_settings
+from app.services.embedding_backends import fork_safe
+from app.utils.logger import logger
+
+settings = get_settings()
+
+def _is_prefork(worker) -> bool:
+    pool_cls = getattr(worker, "pool_cls", None)
+    name = pool_cls if isinstance(pool_cls, str) else getattr(pool_cls, "__module__", "")
+    return "prefork" in (name or "")
+
+@worker_init.connect
+def preload_embedding_model(sender=None, **kwargs):
+    """
+    主进程启动时加载嵌入模型
+    """
+    if not settings.CELERY_PRELOAD_EMBEDDING:
+        return
+
+    from app.services.embedding_service import embedding_service
+
+    if not _is_prefork(sender):
+        # threads / solo 池不 fork, 直接在本进程完成预热
+        embedding_service.warmup()
+        return
+    if not fork_safe(settings.EMBEDDING_BACKEND):
+        logger.info(f"Embedding backend {settings.EMBEDDING_BACKEND} is not fork-safe, loading in worker processes")
+        return
+
+    # 子进程中 tokenizers 并行可能死锁, fork 前关闭
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    embedding_service.preload()
+    # 将已加载的对象移出 GC 追踪, 子进程的 GC 不再写这些对象所在的页, 保持写时复制共享
+    gc.freeze()
+    logger.info(f"Froze {gc.get_freeze_count()} objects before forking worker processes")
+
+@worker_process_init.connect
+def warmup_embedding_model(**kwargs):
+    """
+    prefork 子进程启动时做一次推理预热
+    """
+    if not settings.CELERY_PRELOAD_EMBEDDING:
+        return
+
+    from app.services.embedding_service import embedding_service
+
+    try:
+        embedding_service.warmup()
+    except Exception as e:
+        logger.warning(f"Embedding warmup failed in worker process {os.getpid()}: {e}")
+
+@worker_process_shutdown.connect
+def close_vector_store(**kwargs):
+    """
+    子进程退出前写入缓冲的向量
+    """
+    from app.infrastructure.vector_store import vector_store
+
+    try:
+        vector_store.close()
+    except Exception as e:
+        logger.warning(f"Failed to write buffered vectors in worker process {os.getpid()}: {e}")
+
+@worker_process_shutdown.connect
+def close_pdf_pool(**kwargs):
+    """
+    子进程退出前关闭本进程的 PDF 解析进程池
+    """
+    from app.utils.text_processor import shutdown_pdf_pool
+
+    shutdown_pdf_pool()
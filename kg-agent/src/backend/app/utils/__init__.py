@@ -9,12 +9,54 @@ from .file_handler import (
     storage_manager,
     get_file_storage,
     calculate_file_hash,
+    save_and_hash,
     safe_filename
 )
 
 from .text_processor import (
     TextProcessor,
-    text_processor
+    text_processor,
+    prefetch
+)
+
+from .spill_store import (
+    SpillStore,
+    spill_store
+)
+
+from .parse_cache import (
+    ParseCache,
+    parse_cache
+)
+
+from .embedding_cache import (
+    EmbeddingCache,
+    embedding_cache
+)
+
+from .vector_eval import (
+    exact_top_k,
+    recall_at_k
+)
+
+from .quantization import (
+    QuantizedVectors,
+    binary_codes,
+    hamming_distances,
+    int8_codes,
+    int8_scores
+)
+
+from .search_filters import (
+    FieldFilter,
+    parse_filters,
+    document_attributes
+)
+
+from .chunk_diff import (
+    ChunkDiff,
+    chunk_hash,
+    diff_chunks
 )
 
 from .cache_manager import (
@@ -25,6 +67,7 @@ from .cache_manager import (
     CacheManager,
     cache_manager,
     get_cache,
+    get_redis_client,
     generate_cache_key,
     cached,
     async_cached,
@@ -60,11 +103,46 @@ __all__ = [
     'storage_manager',
     'get_file_storage',
     'calculate_file_hash',
+    'save_and_hash',
     'safe_filename',
 
     # 文本处理
     'TextProcessor',
     'text_processor',
+    'prefetch',
+
+    # 中间结果落盘
+    'SpillStore',
+    'spill_store',
+
+    # 解析结果缓存
+    'ParseCache',
+    'parse_cache',
+
+    # 向量缓存
+    'EmbeddingCache',
+    'embedding_cache',
+
+    # 向量检索召回率评估
+    'exact_top_k',
+    'recall_at_k',
+
+    # 向量量化
+    'QuantizedVectors',
+    'binary_codes',
+    'hamming_distances',
+    'int8_codes',
+    'int8_scores',
+
+    # 检索过滤条件
+    'FieldFilter',
+    'parse_filters',
+    'document_attributes',
+
+    # 分块增量比对
+    'ChunkDiff',
+    'chunk_hash',
+    'diff_chunks',
 
     # 缓存管理
     'CacheBackend',
@@ -74,6 +152,7 @@ __all__ = [
     'CacheManager',
     'cache_manager',
     'get_cache',
+    'get_redis_client',
     'generate_cache_key',
     'cached',
     'async_cached',
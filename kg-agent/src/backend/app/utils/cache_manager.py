@@ -406,6 +406,28 @@ def get_cache() -> CacheBackend:
     return cache_manager.get_cache()
 
 
+@lru_cache_decorator(maxsize=1)
+def get_redis_client() -> redis.Redis:
+    """获取共享的Redis客户端（快捷函数）
+
+    用于需要原子操作（哈希、计数器、SETNX等）的场景，
+    返回的客户端自动解码为字符串。
+
+    Returns:
+        redis.Redis: Redis客户端
+    """
+    return redis.Redis(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        db=settings.REDIS_DB,
+        password=settings.REDIS_PASSWORD,
+        decode_responses=True,
+        socket_connect_timeout=5,
+        socket_timeout=5,
+        retry_on_timeout=True
+    )
+
+
 def generate_cache_key(prefix: str, *args, **kwargs) -> str:
     """生成缓存键
 
@@ -0,0 +1,80 @@
+"""
+分块级增量比对
+
+文档更新时按分块内容哈希比较新旧版本，只有新增/变化的分块需要重新向量化写入，
+内容未变但位置变化的分块复用已有向量，旧版本多出的分块从各存储中删除。
+"""
+
+import hashlib
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence
+
+
+def chunk_hash(content: str) -> str:
+    """计算分块内容的 SHA-256
+
+    Args:
+        content: 分块文本
+
+    Returns:
+        str: 十六进制哈希值
+    """
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class ChunkDiff:
+    """新旧分块序列的比对结果（均为分块索引）"""
+    unchanged: List[int] = field(default_factory=list)       # 位置和内容都未变化
+    moved: Dict[int, int] = field(default_factory=dict)      # 新索引 -> 旧索引, 内容相同但位置变化
+    added: List[int] = field(default_factory=list)           # 新版本中需要重新向量化的分块
+    removed: List[int] = field(default_factory=list)         # 旧版本中不再存在的分块
+
+    @property
+    def stale(self) -> List[int]:
+        """需要从存储中删除的旧索引（删除后按新索引重新写入或彻底移除）"""
+        return sorted(self.removed + list(self.moved.values()))
+
+    @property
+    def rewritten(self) -> List[int]:
+        """需要按新索引写入的分块"""
+        return sorted(self.added + list(self.moved))
+
+
+def diff_chunks(old_hashes: Sequence[str], new_hashes: Sequence[str]) -> ChunkDiff:
+    """比对新旧版本的分块哈希序列
+
+    相同位置内容相同的分块视为未变化；其余分块按内容哈希匹配（重复内容按多重集合处理），
+    匹配成功的视为移动，未匹配的新分块为新增，未匹配的旧分块为删除。
+
+    Args:
+        old_hashes: 旧版本分块哈希（按索引排列）
+        new_hashes: 新版本分块哈希（按索引排列）
+
+    Returns:
+        ChunkDiff: 比对结果
+    """
+    diff = ChunkDiff()
+    remaining_old: Dict[str, deque] = defaultdict(deque)
+    pending_new = []
+
+    for index, new_hash in enumerate(new_hashes):
+        if index < len(old_hashes) and old_hashes[index] == new_hash:
+            diff.unchanged.append(index)
+        else:
+            pending_new.append(index)
+
+    for index, old_hash in enumerate(old_hashes):
+        if index >= len(new_hashes) or new_hashes[index] != old_hash:
+            remaining_old[old_hash].append(index)
+
+    for index in pending_new:
+        candidates = remaining_old.get(new_hashes[index])
+        if candidates:
+            diff.moved[index] = candidates.popleft()
+        else:
+            diff.added.append(index)
+
+    diff.removed = sorted(i for indexes in remaining_old.values() for i in indexes)
+    return diff
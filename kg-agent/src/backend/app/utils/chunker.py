@@ -0,0 +1,135 @@
+"""
+原生分块器
+
+单次扫描原文，直接计算分块在原字符串中的 (start, end) 区间，不构造中间 Document 对象，
+也不对分隔符切分后的片段反复拼接。切分点优先级：段落 > 换行 > 句末标点（中英文）> 空白 > 硬切分。
+"""
+
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# 句末标点（含中文全角标点及其后的右引号/右括号），英文句点要求后接空白
+_SENTENCE_END = re.compile(r"[。！？；!?;…]+[”’」』）)]*|\.(?=\s)")
+# 重叠区内允许作为下一分块起点的位置
+_BOUNDARY = re.compile(r"[\s。！？；!?;…，,、]")
+
+TokenCounter = Callable[[List[str]], List[int]]
+
+
+class SpanChunker:
+    """基于字符区间的分块器"""
+
+    def __init__(self, chunk_size: int = 512, chunk_overlap: int = 64):
+        """初始化分块器
+
+        Args:
+            chunk_size: 分块最大字符数
+            chunk_overlap: 相邻分块最大重叠字符数
+        """
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def spans(self, text: str) -> List[Tuple[int, int]]:
+        """计算分块区间
+
+        Args:
+            text: 原文
+
+        Returns:
+            List[Tuple[int, int]]: 按顺序排列的 (start, end) 区间，首尾空白已去除
+        """
+        spans = []
+        length = len(text)
+        start = self._skip_space(text, 0, length)
+        while start < length:
+            window_end = start + self.chunk_size
+            if window_end >= length:
+                stop, overlap = length, False
+            else:
+                stop, overlap = self._find_break(text, start, window_end)
+
+            end = stop
+            while end > start and text[end - 1].isspace():
+                end -= 1
+            if end > start:
+                spans.append((start, end))
+            if stop >= length:
+                break
+
+            # 在段落/换行处切分的分块之间不重叠, 段落内部切分时保留重叠
+            next_start = self._next_start(text, start, stop) if overlap else stop
+            start = self._skip_space(text, next_start, length)
+        return spans
+
+    def split(self, text: str) -> List[str]:
+        """切分文本，返回分块内容列表"""
+        return [text[start:end] for start, end in self.spans(text)]
+
+    def _find_break(self, text: str, start: int, window_end: int) -> Tuple[int, bool]:
+        # 返回 (切分位置, 是否需要重叠); 切分点不早于窗口的 1/4 处，避免产生碎片分块
+        low = start + self.chunk_size // 4
+
+        for separator in ("\n\n", "\n"):
+            position = text.rfind(separator, low, window_end)
+            if position != -1:
+                return position, False
+
+        last_sentence = None
+        for match in _SENTENCE_END.finditer(text, low, window_end):
+            last_sentence = match
+        if last_sentence is not None:
+            return last_sentence.end(), True
+
+        position = text.rfind(" ", low, window_end)
+        if position != -1:
+            return position, True
+
+        return window_end, True
+
+    def _next_start(self, text: str, start: int, stop: int) -> int:
+        # 在重叠区内找最靠前的边界作为下一分块起点，找不到时按字符重叠
+        low = max(stop - self.chunk_overlap, start + 1)
+        match = _BOUNDARY.search(text, low, stop)
+        if match is not None:
+            return match.end()
+        return low
+
+    @staticmethod
+    def _skip_space(text: str, position: int, length: int) -> int:
+        while position < length and text[position].isspace():
+            position += 1
+        return position
+
+
+def count_chars(texts: List[str]) -> List[int]:
+    """默认的 token 计数：字符数"""
+    return [len(text) for text in texts]
+
+
+def build_chunks(
+    contents: List[str],
+    start_index: int = 0,
+    page_numbers: Optional[List[Optional[int]]] = None,
+    token_counter: Optional[TokenCounter] = None
+) -> List[Dict[str, Any]]:
+    """将分块内容组装为流水线使用的分块字典，token 数一次批量计算
+
+    Args:
+        contents: 分块内容
+        start_index: 第一个分块的索引
+        page_numbers: 各分块起始页码，None 表示不附带页码
+        token_counter: 批量 token 计数函数，默认按字符数
+
+    Returns:
+        List[Dict[str, Any]]: 分块字典列表
+    """
+    token_counts = (token_counter or count_chars)(contents) if contents else []
+    chunks = []
+    for offset, (content, token_count) in enumerate(zip(contents, token_counts)):
+        chunk = {"content": content, "index": start_index + offset, "token_count": token_count}
+        if page_numbers is not None:
+            chunk["page_number"] = page_numbers[offset]
+        chunks.append(chunk)
+    return chunks
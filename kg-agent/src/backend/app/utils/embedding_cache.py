@@ -0,0 +1,299 @@
+"""
+向量缓存
+
+按 模型标识 + 规范化文本哈希 寻址，两级缓存：
+- 进程内 LRU：同一 worker 内重复出现的文本（页眉、免责声明、模板段落）直接命中
+- 磁盘存储：追加写入的 float32 向量文件，以内存映射方式读取，所有 worker 共享
+
+磁盘存储只追加不淘汰，达到大小上限后停止写入（已有条目仍可命中）。
+"""
+
+import fcntl
+import hashlib
+import json
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import get_settings
+from app.utils.logger import logger
+
+settings = get_settings()
+
+KEY_BYTES = 16
+ROW_DTYPE = np.float32
+
+
+def normalize_text(text: str) -> str:
+    """规范化文本：NFKC 归一化并合并空白字符
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        str: 规范化后的文本
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+class DiskVectorStore:
+    """追加写入、内存映射读取的定长向量存储
+
+    目录下包含 vectors.f32（按行存放的 float32 向量）、keys.bin（与行一一对应的定长键）和 meta.json（向量维度）。
+    写入在文件锁内先写向量再写键，键文件的长度即为有效行数，因此读取方无需加锁。
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        """初始化磁盘向量存储
+
+        Args:
+            directory: 存储目录
+            max_bytes: 向量文件大小上限（字节）
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.dim: Optional[int] = None
+        self._rows: Dict[bytes, int] = {}
+        self._row_count = 0
+        self._mmap: Optional[np.memmap] = None
+        self._full = False
+        self._lock = threading.Lock()
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.directory / "vectors.f32"
+
+    @property
+    def _keys_path(self) -> Path:
+        return self.directory / "keys.bin"
+
+    @property
+    def _meta_path(self) -> Path:
+        return self.directory / "meta.json"
+
+    def _refresh(self):
+        # 读取其他进程追加的键
+        if self.dim is None:
+            try:
+                self.dim = json.loads(self._meta_path.read_text())["dim"]
+            except FileNotFoundError:
+                return
+        try:
+            size = self._keys_path.stat().st_size
+        except FileNotFoundError:
+            return
+        row_count = size // KEY_BYTES
+        if row_count <= self._row_count:
+            return
+        with open(self._keys_path, "rb") as f:
+            f.seek(self._row_count * KEY_BYTES)
+            data = f.read((row_count - self._row_count) * KEY_BYTES)
+        for row, offset in enumerate(range(0, len(data), KEY_BYTES), start=self._row_count):
+            self._rows.setdefault(data[offset:offset + KEY_BYTES], row)
+        self._row_count = row_count
+        self._mmap = None
+
+    def get(self, keys: Sequence[bytes]) -> Dict[int, np.ndarray]:
+        """批量读取向量
+
+        Args:
+            keys: 缓存键列表
+
+        Returns:
+            Dict[int, np.ndarray]: 命中的 {keys 中的位置: 向量}
+        """
+        with self._lock:
+            if any(key not in self._rows for key in keys):
+                self._refresh()
+            found = {i: self._rows[key] for i, key in enumerate(keys) if key in self._rows}
+            if not found:
+                return {}
+            if self._mmap is None:
+                self._mmap = np.memmap(self._vectors_path, dtype=ROW_DTYPE, mode="r", shape=(self._row_count, self.dim))
+            return {i: np.array(self._mmap[row]) for i, row in found.items()}
+
+    def put(self, keys: Sequence[bytes], vectors: np.ndarray):
+        """追加写入尚未存储的向量
+
+        Args:
+            keys: 缓存键列表
+            vectors: 与 keys 一一对应的 (n, dim) 向量数组
+        """
+        with self._lock:
+            self._refresh()
+            if self._full:
+                return
+            dim = vectors.shape[1]
+            if self.dim is not None and self.dim != dim:
+                logger.warning(f"Embedding cache {self.directory} stores dim {self.dim}, got {dim}; not caching")
+                return
+
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self.directory / ".lock", "w") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                if not self._meta_path.exists():
+                    self._meta_path.write_text(json.dumps({"dim": dim}))
+                self.dim = dim
+                self._refresh()
+
+                new_rows = {}
+                for i, key in enumerate(keys):
+                    if key not in self._rows and key not in new_rows:
+                        new_rows[key] = i
+                if not new_rows:
+                    return
+                row_bytes = dim * np.dtype(ROW_DTYPE).itemsize
+                if (self._row_count + len(new_rows)) * row_bytes > self.max_bytes:
+                    self._full = True
+                    logger.warning(f"Embedding cache {self.directory} reached {self.max_bytes} bytes, disk writes stopped")
+                    return
+
+                # 截掉中断的写入留下的残行, 保证向量行与键一一对应
+                with open(self._vectors_path, "ab") as f:
+                    f.truncate(self._row_count * row_bytes)
+                    f.write(np.ascontiguousarray(vectors[list(new_rows.values())], dtype=ROW_DTYPE).tobytes())
+                with open(self._keys_path, "ab") as f:
+                    f.truncate(self._row_count * KEY_BYTES)
+                    f.write(b"".join(new_rows))
+                self._refresh()
+
+
+class EmbeddingCache:
+    """向量缓存：进程内 LRU + 磁盘内存映射存储"""
+
+    def __init__(self, base_dir: str, model_id: str, lru_size: int = 10000, max_bytes: int = 0):
+        """初始化向量缓存
+
+        Args:
+            base_dir: 磁盘缓存根目录，每个模型一个子目录
+            model_id: 模型标识，参与缓存键计算
+            lru_size: 进程内 LRU 条目数，0 表示禁用
+            max_bytes: 磁盘缓存大小上限（字节），0 表示禁用
+        """
+        self.model_id = model_id
+        self.lru_size = lru_size
+        self._lru: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.disk: Optional[DiskVectorStore] = None
+        if max_bytes > 0:
+            slug = re.sub(r"[^\w.-]+", "_", model_id).strip("_") or "default"
+            self.disk = DiskVectorStore(Path(base_dir).resolve() / slug, max_bytes)
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def key(self, text: str) -> bytes:
+        """计算缓存键
+
+        Args:
+            text: 原始文本
+
+        Returns:
+            bytes: 模型标识与规范化文本的哈希
+        """
+        data = f"{self.model_id}\0{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha256(data).digest()[:KEY_BYTES]
+
+    def lookup(self, texts: Sequence[str]) -> Tuple[List[bytes], Dict[int, np.ndarray]]:
+        """批量查询缓存
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            Tuple[List[bytes], Dict[int, np.ndarray]]: (每个文本的缓存键, 命中的 {位置: 向量})
+        """
+        keys = [self.key(text) for text in texts]
+        found: Dict[int, np.ndarray] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._lru.get(key)
+                if vector is not None:
+                    self._lru.move_to_end(key)
+                    found[i] = vector
+            memory_hits = len(found)
+
+        disk_found: Dict[int, np.ndarray] = {}
+        if self.disk is not None and len(found) < len(keys):
+            missing = [i for i in range(len(keys)) if i not in found]
+            try:
+                disk_found = {missing[j]: v for j, v in self.disk.get([keys[i] for i in missing]).items()}
+            except (OSError, ValueError) as e:
+                logger.warning(f"Failed to read embedding cache: {e}")
+            found.update(disk_found)
+            self._remember((keys[i], v) for i, v in disk_found.items())
+
+        with self._lock:
+            self.memory_hits += memory_hits
+            self.disk_hits += len(disk_found)
+            self.misses += len(keys) - len(found)
+        return keys, found
+
+    def store(self, keys: Sequence[bytes], vectors: np.ndarray):
+        """写入新生成的向量
+
+        Args:
+            keys: 缓存键列表
+            vectors: 与 keys 一一对应的 (n, dim) 向量数组
+        """
+        if not len(keys):
+            return
+        # 复制每一行, 避免缓存条目引用调用方的整块数组
+        self._remember((key, np.array(vector, dtype=ROW_DTYPE)) for key, vector in zip(keys, vectors))
+        if self.disk is not None:
+            try:
+                self.disk.put(keys, vectors)
+            except OSError as e:
+                logger.warning(f"Failed to write embedding cache: {e}")
+
+    def _remember(self, items):
+        if self.lru_size <= 0:
+            return
+        with self._lock:
+            for key, vector in items:
+                self._lru[key] = vector
+                self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        """获取进程内累计命中统计
+
+        Returns:
+            Dict[str, float]: 命中数、未命中数与命中率
+        """
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+                "lru_entries": len(self._lru)
+            }
+
+
+def cache_model_id() -> str:
+    """当前配置的模型标识：不同推理后端（量化）产生的向量略有差异，需要分开缓存
+
+    Returns:
+        str: 模型路径，非 torch 后端附加后端名
+    """
+    if settings.EMBEDDING_BACKEND == "torch":
+        return settings.EMBEDDING_MODEL_PATH
+    return f"{settings.EMBEDDING_MODEL_PATH}@{settings.EMBEDDING_BACKEND}"
+
+
+# 全局向量缓存实例
+embedding_cache = EmbeddingCache(
+    settings.EMBEDDING_CACHE_DIR,
+    cache_model_id(),
+    lru_size=settings.EMBEDDING_CACHE_LRU_SIZE,
+    max_bytes=settings.EMBEDDING_CACHE_MAX_BYTES
+)
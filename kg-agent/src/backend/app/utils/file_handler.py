@@ -379,6 +379,32 @@ def calculate_file_hash(file_path: Union[str, Path], algorithm: str = "md5") ->
     return hasher.hexdigest()
 
 
+def save_and_hash(file_obj: BinaryIO, file_path: Union[str, Path], algorithm: str = "sha256") -> Tuple[str, int]:
+    """边写入边计算哈希，避免保存后再次读取文件
+
+    Args:
+        file_obj: 文件对象（二进制模式）
+        file_path: 目标路径
+        algorithm: 哈希算法（md5, sha1, sha256）
+
+    Returns:
+        Tuple[哈希值, 文件大小]
+    """
+    if algorithm not in ["md5", "sha1", "sha256"]:
+        raise ValueError(f"Unsupported algorithm: {algorithm}")
+
+    hasher = getattr(hashlib, algorithm)()
+    file_size = 0
+
+    with open(file_path, 'wb') as f:
+        while chunk := file_obj.read(8192):
+            f.write(chunk)
+            hasher.update(chunk)
+            file_size += len(chunk)
+
+    return hasher.hexdigest(), file_size
+
+
 def safe_filename(filename: str) -> str:
     """生成安全的文件名
 
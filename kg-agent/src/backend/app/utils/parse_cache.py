@@ -0,0 +1,186 @@
+"""
+解析结果缓存
+
+按 文件内容哈希 + 文档类型 + 提取器版本 寻址，以 gzip 压缩的 JSON Lines（每页一行）保存提取出的文本。
+调整分块参数或更换嵌入模型后重新处理文档时直接读取缓存，跳过最慢的解析阶段。
+缓存总大小超过上限时按最近访问时间（mtime）淘汰。写入时只累加本进程估计的总大小，
+估计值超过上限或写入一定条数后才遍历目录统计并淘汰（其他进程写入的条目在遍历时计入）。
+"""
+
+import gzip
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
+
+from app.config import get_settings
+from app.utils.logger import logger
+
+settings = get_settings()
+
+Page = Tuple[Optional[int], str]
+
+
+class ParseCache:
+    """内容寻址的解析结果磁盘缓存"""
+
+    # 每写入该数量的条目重新遍历目录一次, 计入其他进程写入的条目
+    SCAN_EVERY_WRITES = 64
+    # 写入触发的淘汰降到上限的该比例, 缓存写满后不会每次写入都遍历目录
+    EVICT_LOW_WATER = 0.9
+
+    def __init__(self, base_dir: str = "./data/parse_cache", max_bytes: int = 0):
+        """初始化解析缓存
+
+        Args:
+            base_dir: 缓存根目录
+            max_bytes: 缓存总大小上限（字节），0 表示禁用缓存
+        """
+        self.base_dir = Path(base_dir).resolve()
+        self.max_bytes = max_bytes
+        # 本进程估计的缓存总大小, None 表示尚未遍历统计
+        self._approx_bytes: Optional[int] = None
+        self._writes_since_scan = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(file_hash: str, doc_type: str, version: int) -> str:
+        """生成缓存键
+
+        Args:
+            file_hash: 文件内容 SHA-256
+            doc_type: 文档类型
+            version: 提取器版本，提取逻辑变化时递增使旧缓存失效
+
+        Returns:
+            str: 缓存键
+        """
+        return f"{file_hash}-{doc_type}-v{version}"
+
+    def _path(self, key: str) -> Path:
+        return self.base_dir / key[:2] / f"{key}.jsonl.gz"
+
+    def get(self, key: str) -> Optional[Iterator[Page]]:
+        """读取缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            Optional[Iterator[Page]]: 命中时返回 (页码, 文本) 迭代器，未命中返回 None
+        """
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            # 更新 mtime 作为最近访问时间
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return self._read(path)
+
+    def _read(self, path: Path) -> Iterator[Page]:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    yield record["page_number"], record["text"]
+        except (OSError, EOFError, ValueError) as e:
+            path.unlink(missing_ok=True)
+            # 抛出 OSError 使任务按可重试错误处理，重试时缓存未命中
+            raise OSError(f"Corrupt parse cache entry {path.name}: {e}") from e
+
+    def write_through(self, key: str, pages: Iterable[Page]) -> Iterator[Page]:
+        """边产出页面边写入缓存，全部产出后原子替换到位
+
+        Args:
+            key: 缓存键
+            pages: (页码, 文本) 迭代器
+
+        Returns:
+            Iterator[Page]: 与输入相同的页面迭代器
+        """
+        if not self.enabled:
+            yield from pages
+            return
+
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.parent / f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        completed = False
+        try:
+            with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+                for page_number, text in pages:
+                    f.write(json.dumps({"page_number": page_number, "text": text}, ensure_ascii=False) + "\n")
+                    yield page_number, text
+            os.replace(tmp_path, path)
+            completed = True
+        finally:
+            if not completed:
+                tmp_path.unlink(missing_ok=True)
+
+        self._record_write(path)
+
+    def _record_write(self, path: Path):
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self._writes_since_scan += 1
+            if self._approx_bytes is not None:
+                self._approx_bytes += size
+            due = (
+                self._approx_bytes is None
+                or self._approx_bytes > self.max_bytes
+                or self._writes_since_scan >= self.SCAN_EVERY_WRITES
+            )
+        if due:
+            self.evict(int(self.max_bytes * self.EVICT_LOW_WATER))
+
+    def evict(self, target_bytes: Optional[int] = None) -> int:
+        """遍历缓存目录统计总大小，超过上限时按最近访问时间淘汰
+
+        Args:
+            target_bytes: 淘汰到的目标大小，默认为上限
+
+        Returns:
+            int: 淘汰的条目数
+        """
+        if not self.enabled or not self.base_dir.exists():
+            return 0
+
+        entries = []
+        total = 0
+        for path in self.base_dir.glob("*/*.jsonl.gz"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        removed = 0
+        if total > self.max_bytes:
+            target = self.max_bytes if target_bytes is None else target_bytes
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                removed += 1
+        with self._lock:
+            self._approx_bytes = total
+            self._writes_since_scan = 0
+        if removed:
+            logger.info(f"Evicted {removed} parse cache entries, {total} bytes remain")
+        return removed
+
+
+# 全局解析缓存实例
+parse_cache = ParseCache(settings.PARSE_CACHE_DIR, settings.PARSE_CACHE_MAX_BYTES)
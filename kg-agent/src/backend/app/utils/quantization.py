@@ -0,0 +1,150 @@
+"""
+向量量化
+
+向量检索的第一阶段在紧凑编码上近似打分, 只对得分最高的候选行读取 float32 原向量重新打分:
+- binary: 每维只保留符号位, 768 维压缩为 96 字节 (1/32), 以 Hamming 距离近似余弦距离
+- int8: 每行按最大绝对值缩放到 [-127, 127], 压缩为约 1/4, 以编码与查询向量的内积近似余弦相似度
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+QUANTIZATION_TYPES = ("none", "binary", "int8")
+# 每块编码转换出的临时数组大小, 保持在 CPU 缓存量级时比一次性转换整个矩阵快得多
+SCORE_BLOCK_BYTES = 1 << 20
+
+# numpy < 2.0 没有 bitwise_count, 按字节查表
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def binary_codes(vectors: np.ndarray) -> np.ndarray:
+    """按维度符号编码为位串
+
+    Args:
+        vectors: (n, dim) 或 (dim,) 的向量
+
+    Returns:
+        np.ndarray: (n, ceil(dim / 8)) 或 (ceil(dim / 8),) 的 uint8 数组
+    """
+    return np.packbits(np.asarray(vectors) > 0, axis=-1)
+
+
+def hamming_distances(codes: np.ndarray, query_code: np.ndarray) -> np.ndarray:
+    """计算每行位串与查询位串的 Hamming 距离
+
+    Args:
+        codes: (n, nbytes) 的 binary_codes 结果
+        query_code: (nbytes,) 的查询位串
+
+    Returns:
+        np.ndarray: (n,) 的距离, 越小越相似
+    """
+    xor = np.bitwise_xor(codes, query_code)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(xor).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT_TABLE[xor].sum(axis=1, dtype=np.int32)
+
+
+def int8_codes(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """按行对称标量量化为 int8
+
+    Args:
+        vectors: (n, dim) 的向量
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (n, dim) 的 int8 编码与 (n,) 的 float32 缩放系数, 原向量约为 codes * scales[:, None]
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def int8_scores(codes: np.ndarray, scales: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """计算 int8 编码与 float32 查询向量的近似内积
+
+    Args:
+        codes: (n, dim) 的 int8 编码
+        scales: (n,) 的缩放系数
+        query: (dim,) 的查询向量
+
+    Returns:
+        np.ndarray: (n,) 的近似内积, 越大越相似
+    """
+    return (codes.astype(np.float32) @ np.asarray(query, dtype=np.float32)) * scales
+
+
+class QuantizedVectors:
+    """
+    按行追加的量化编码, 容量按倍数增长; 提供第一阶段的近似得分
+    """
+
+    def __init__(self, kind: str, dim: int):
+        if kind not in ("binary", "int8"):
+            raise ValueError(f"Unknown quantization '{kind}', expected binary or int8")
+        self.kind = kind
+        self.dim = dim
+        width = (dim + 7) // 8 if kind == "binary" else dim
+        self._codes = np.empty((0, width), dtype=np.uint8 if kind == "binary" else np.int8)
+        self._scales = np.empty(0, dtype=np.float32)
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def nbytes(self) -> int:
+        """已使用的编码字节数 (不含预留容量)"""
+        per_row = self._codes.shape[1] * self._codes.itemsize + (4 if self.kind == "int8" else 0)
+        return self._count * per_row
+
+    def append(self, vectors: np.ndarray):
+        """追加 (n, dim) 的向量 (已归一化)"""
+        if not len(vectors):
+            return
+        if self.kind == "binary":
+            codes, scales = binary_codes(vectors), None
+        else:
+            codes, scales = int8_codes(vectors)
+        end = self._count + len(codes)
+        if end > len(self._codes):
+            capacity = max(end, len(self._codes) * 2, 1024)
+            grown = np.empty((capacity, self._codes.shape[1]), dtype=self._codes.dtype)
+            grown[:self._count] = self._codes[:self._count]
+            self._codes = grown
+            if self.kind == "int8":
+                grown_scales = np.empty(capacity, dtype=np.float32)
+                grown_scales[:self._count] = self._scales[:self._count]
+                self._scales = grown_scales
+        self._codes[self._count:end] = codes
+        if scales is not None:
+            self._scales[self._count:end] = scales
+        self._count = end
+
+    def scores(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """近似得分, 越大越相似; 分块计算以限制临时数组的大小
+
+        Args:
+            query: (dim,) 的查询向量 (已归一化)
+            rows: 只计算这些行, None 时计算全部行
+
+        Returns:
+            np.ndarray: binary 为负的 Hamming 距离, int8 为近似内积
+        """
+        codes = self._codes[:self._count] if rows is None else self._codes[rows]
+        scales = None
+        if self.kind == "int8":
+            scales = self._scales[:self._count] if rows is None else self._scales[rows]
+        else:
+            query_code = binary_codes(query)
+        scores = np.empty(len(codes), dtype=np.float32)
+        block_rows = max(1, SCORE_BLOCK_BYTES // (codes.shape[1] * 4))
+        for start in range(0, len(codes), block_rows):
+            block = codes[start:start + block_rows]
+            if scales is None:
+                scores[start:start + len(block)] = -hamming_distances(block, query_code)
+            else:
+                scores[start:start + len(block)] = int8_scores(block, scales[start:start + len(block)], query)
+        return scores
@@ -0,0 +1,173 @@
+"""
+检索过滤条件
+
+将 SearchQuery.filters 解析为统一的条件列表, 再下推到各检索后端:
+- Milvus: 布尔表达式 (expr), 在 ANN 检索时预过滤
+- Elasticsearch: bool 查询的 filter 子句 (不参与打分, 可缓存)
+- 进程内向量索引: 按行属性生成掩码
+
+支持的字段为文档级属性, 在写入时随每个分块保存:
+    doc_id / doc_type / tenant / source: 等值 ("pdf") 或集合 (["pdf", "docx"])
+    created_at: 范围 ({"gte": "2024-01-01", "lt": "2024-07-01"}), 取值为 ISO 时间或 Unix 秒
+"""
+
+import json
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from app.exceptions import ValidationError
+
+KEYWORD_FIELDS = ("doc_id", "doc_type", "tenant", "source")
+TIME_FIELDS = ("created_at",)
+# 随分块写入向量存储的文档属性 (doc_id 已单独存储)
+ATTRIBUTE_FIELDS = ("doc_type", "tenant", "source", "created_at")
+
+
+@dataclass
+class FieldFilter:
+    """单个字段上的过滤条件"""
+    field: str
+    values: Optional[List[str]] = None   # 关键字字段: 取值集合
+    gte: Optional[int] = None            # 时间字段: Unix 秒, 闭区间下界
+    lte: Optional[int] = None            # 时间字段: Unix 秒, 闭区间上界
+
+    def matches(self, value: Any) -> bool:
+        """判断单个属性值是否满足条件"""
+        if self.values is not None:
+            return value in self.values
+        if value is None:
+            return False
+        return (self.gte is None or value >= self.gte) and (self.lte is None or value <= self.lte)
+
+
+def to_epoch(value: Any) -> int:
+    """将 ISO 时间字符串 / datetime / Unix 秒转换为 Unix 秒 (无时区的时间按 UTC 处理)
+
+    Args:
+        value: 时间值
+
+    Returns:
+        int: Unix 秒
+    """
+    if isinstance(value, bool):
+        raise ValueError(f"invalid time value: {value!r}")
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+    raise ValueError(f"invalid time value: {value!r}")
+
+
+def parse_filters(filters: Optional[Dict[str, Any]]) -> List[FieldFilter]:
+    """解析检索请求中的过滤条件
+
+    Args:
+        filters: {字段: 取值 | 取值列表 | {"gte"/"gt"/"lte"/"lt": 时间}}
+
+    Returns:
+        List[FieldFilter]: 条件列表, 各条件之间为 AND 关系
+
+    Raises:
+        ValidationError: 字段不支持或取值格式错误
+    """
+    conditions = []
+    for field, spec in (filters or {}).items():
+        try:
+            if field in KEYWORD_FIELDS:
+                values = spec if isinstance(spec, list) else [spec]
+                if not values or not all(isinstance(v, (str, int)) and not isinstance(v, bool) for v in values):
+                    raise ValueError("expected a value or a non-empty list of values")
+                conditions.append(FieldFilter(field, values=[str(v) for v in values]))
+            elif field in TIME_FIELDS:
+                if not isinstance(spec, dict) or not spec or set(spec) - {"gte", "gt", "lte", "lt"}:
+                    raise ValueError("expected a range such as {\"gte\": ..., \"lt\": ...}")
+                condition = FieldFilter(field)
+                if "gte" in spec:
+                    condition.gte = to_epoch(spec["gte"])
+                if "gt" in spec:
+                    condition.gte = max(condition.gte or -2 ** 63, to_epoch(spec["gt"]) + 1)
+                if "lte" in spec:
+                    condition.lte = to_epoch(spec["lte"])
+                if "lt" in spec:
+                    condition.lte = min(condition.lte if condition.lte is not None else 2 ** 63 - 1, to_epoch(spec["lt"]) - 1)
+                conditions.append(condition)
+            else:
+                raise ValueError(f"supported fields: {', '.join(KEYWORD_FIELDS + TIME_FIELDS)}")
+        except ValueError as e:
+            raise ValidationError(
+                message="检索过滤条件无效",
+                details={"field": field, "value": spec, "reason": str(e)}
+            )
+    return conditions
+
+
+def milvus_expr(conditions: List[FieldFilter]) -> str:
+    """生成 Milvus 布尔表达式, 无条件时返回空字符串
+
+    Args:
+        conditions: parse_filters 的结果
+
+    Returns:
+        str: 如 'tenant in ["hr"] and created_at >= 1704067200'
+    """
+    clauses = []
+    for condition in conditions:
+        if condition.values is not None:
+            clauses.append(f"{condition.field} in {json.dumps(condition.values, ensure_ascii=False)}")
+            continue
+        if condition.gte is not None:
+            clauses.append(f"{condition.field} >= {condition.gte}")
+        if condition.lte is not None:
+            clauses.append(f"{condition.field} <= {condition.lte}")
+    return " and ".join(clauses)
+
+
+def es_filter_clauses(conditions: List[FieldFilter]) -> List[Dict[str, Any]]:
+    """生成 Elasticsearch bool 查询的 filter 子句
+
+    Args:
+        conditions: parse_filters 的结果
+
+    Returns:
+        List[Dict[str, Any]]: terms / range 子句
+    """
+    clauses = []
+    for condition in conditions:
+        if condition.values is not None:
+            clauses.append({"terms": {condition.field: condition.values}})
+            continue
+        bounds = {}
+        if condition.gte is not None:
+            bounds["gte"] = condition.gte
+        if condition.lte is not None:
+            bounds["lte"] = condition.lte
+        clauses.append({"range": {condition.field: dict(bounds, format="epoch_second")}})
+    return clauses
+
+
+def document_attributes(record: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """从文档状态记录中取出随分块写入的可过滤属性
+
+    Args:
+        record: status_service 中的文档状态记录
+
+    Returns:
+        Dict[str, Any]: doc_type / tenant / source 为字符串 (缺失时为空串), created_at 为 Unix 秒
+    """
+    record = record or {}
+    created_at = record.get("created_at")
+    try:
+        created_at = to_epoch(created_at) if created_at is not None else None
+    except ValueError:
+        created_at = None
+    return {
+        "doc_type": str(record.get("doc_type") or ""),
+        "tenant": str(record.get("tenant") or ""),
+        "source": str(record.get("source") or ""),
+        "created_at": created_at if created_at is not None else int(datetime.now(timezone.utc).timestamp())
+    }
@@ -0,0 +1,145 @@
+"""
+流水线中间结果存储（Claim-Check）
+
+Celery 各阶段之间不再通过 broker / result backend 传递全文和分块内容，
+而是将阶段输出写入本地落盘目录，只传递引用（路径 + 校验和）。
+所有 worker 需要共享同一个 SPILL_DIR（同机部署或共享卷）。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List
+
+from app.config import get_settings
+from app.utils.file_handler import safe_filename
+
+settings = get_settings()
+
+
+class SpillStore:
+    """按 (doc_id, stage) 组织的 JSON Lines 落盘存储"""
+
+    def __init__(self, base_dir: str = "./data/spill"):
+        """初始化落盘存储
+
+        Args:
+            base_dir: 存储根目录
+        """
+        self.base_dir = Path(base_dir).resolve()
+
+    def _doc_dir(self, doc_id: str) -> Path:
+        return self.base_dir / safe_filename(doc_id)
+
+    def write(self, doc_id: str, stage: str, records: Iterable[Any]) -> Dict[str, Any]:
+        """写入阶段输出
+
+        先写临时文件再原子替换，写入过程中计算 SHA-256。
+
+        Args:
+            doc_id: 文档ID
+            stage: 阶段名称，如 "text"、"chunks"
+            records: 可 JSON 序列化的记录序列，每条记录占一行
+
+        Returns:
+            Dict[str, Any]: 引用，包含 doc_id、stage、path、sha256、size、count
+        """
+        doc_dir = self._doc_dir(doc_id)
+        doc_dir.mkdir(parents=True, exist_ok=True)
+        path = doc_dir / f"{safe_filename(stage)}.jsonl"
+        tmp_path = doc_dir / f".{path.name}.{os.getpid()}.tmp"
+
+        hasher = hashlib.sha256()
+        size = 0
+        count = 0
+        with open(tmp_path, "wb") as f:
+            for record in records:
+                line = json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+                f.write(line)
+                hasher.update(line)
+                size += len(line)
+                count += 1
+        os.replace(tmp_path, path)
+
+        return {
+            "doc_id": doc_id,
+            "stage": stage,
+            "path": str(path),
+            "sha256": hasher.hexdigest(),
+            "size": size,
+            "count": count,
+        }
+
+    def _verify(self, ref: Dict[str, Any]) -> Path:
+        path = Path(ref["path"]).resolve()
+        if not path.is_relative_to(self.base_dir):
+            raise ValueError(f"Invalid spill reference path: {ref['path']}")
+        if not path.exists():
+            raise FileNotFoundError(f"Spill payload not found: {path}")
+
+        hasher = hashlib.sha256()
+        with open(path, "rb") as f:
+            while block := f.read(1024 * 1024):
+                hasher.update(block)
+        if hasher.hexdigest() != ref["sha256"]:
+            raise ValueError(f"Spill payload checksum mismatch: {path}")
+        return path
+
+    def iter_records(self, ref: Dict[str, Any]) -> Iterator[Any]:
+        """校验后逐条读取阶段输出
+
+        Args:
+            ref: write() 返回的引用
+
+        Returns:
+            Iterator[Any]: 记录迭代器
+        """
+        path = self._verify(ref)
+        with open(path, "rb") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def read(self, ref: Dict[str, Any]) -> List[Any]:
+        """校验后读取全部记录"""
+        return list(self.iter_records(ref))
+
+    def delete(self, doc_id: str) -> bool:
+        """删除文档的全部中间结果"""
+        doc_dir = self._doc_dir(doc_id)
+        if not doc_dir.exists():
+            return False
+        shutil.rmtree(doc_dir, ignore_errors=True)
+        return True
+
+    def gc(self, max_age: int) -> int:
+        """清理超过指定时间未更新的中间结果（失败或中断的流水线遗留）
+
+        Args:
+            max_age: 最大保留时间（秒）
+
+        Returns:
+            int: 清理的文档目录数
+        """
+        if not self.base_dir.exists():
+            return 0
+
+        cutoff = time.time() - max_age
+        removed = 0
+        for doc_dir in self.base_dir.iterdir():
+            if not doc_dir.is_dir():
+                continue
+            try:
+                mtimes = [p.stat().st_mtime for p in doc_dir.iterdir()] or [doc_dir.stat().st_mtime]
+            except FileNotFoundError:
+                continue
+            if max(mtimes) < cutoff:
+                shutil.rmtree(doc_dir, ignore_errors=True)
+                removed += 1
+        return removed
+
+
+# 全局落盘存储实例
+spill_store = SpillStore(settings.SPILL_DIR)
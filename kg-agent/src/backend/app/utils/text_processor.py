@@ -1,67 +1,313 @@
 from langchain_community.document_loaders import (
-    TextLoader, 
-    PyPDFLoader, 
     UnstructuredWordDocumentLoader,
     UnstructuredMarkdownLoader
 )
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from typing import List, Dict, Any
+from pypdf import PdfReader
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import deque
+from contextlib import closing
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from xml.etree import ElementTree
+import itertools
+import math
+import multiprocessing
+import queue
+import threading
 import os
+import zipfile
 from app.models import DocumentType
+from app.config import get_settings
+from app.utils.logger import logger
+from app.utils.chunker import SpanChunker, TokenCounter, build_chunks
+
+settings = get_settings()
+
+# 纯文本按空行切成约该大小的段落组逐段产出
+TEXT_SECTION_SIZE = 64 * 1024
+
+# 提取结果发生变化时 (更换解析库/调整提取逻辑) 递增, 使解析缓存失效
+EXTRACTOR_VERSION = 2
+
+# WordprocessingML 命名空间
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# 进程池不可用 (无法创建子进程 / 子进程异常退出 / 已关闭) 时抛出的错误, 出现时退回串行解析
+PDF_POOL_ERRORS = (BrokenProcessPool, OSError, RuntimeError, AssertionError)
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_lock = threading.Lock()
+
+def get_pdf_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    本进程共享的 PDF 解析进程池, 首次使用时创建, 之后各文档复用
+
+    以 spawn 方式启动子进程: worker 进程中已加载 torch 等带线程状态的库, 在 (预取) 线程中 fork 不安全
+    """
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pdf_pool
+
+def shutdown_pdf_pool(pool: Optional[ProcessPoolExecutor] = None):
+    """
+    关闭共享进程池, 下次使用时重新创建; 指定 pool 时只在它仍是当前的共享池时关闭
+    """
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None or (pool is not None and pool is not _pdf_pool):
+            return
+        executor, _pdf_pool = _pdf_pool, None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def _pdf_page_text(reader: PdfReader, index: int) -> Tuple[int, str]:
+    return index + 1, reader.pages[index].extract_text()
+
+def _extract_pdf_range(file_path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """
+    提取 PDF 第 [start, stop) 页的文本, 在进程池子进程中执行
+    """
+    reader = PdfReader(file_path)
+    return [_pdf_page_text(reader, index) for index in range(start, stop)]
 
 class TextProcessor:
     def __init__(self):
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=512,
-            chunk_overlap=64,
-            length_function=len,
-            is_separator_regex=False,
-        )
+        self.chunk_size = 512
+        self.chunker = SpanChunker(chunk_size=self.chunk_size, chunk_overlap=64)
 
     def load_document(self, file_path: str, doc_type: DocumentType) -> str:
         """
         根据文档类型加载并提取文本
         """
+        return "\n\n".join(text for _, text in self.iter_pages(file_path, doc_type))
+
+    def iter_pages(self, file_path: str, doc_type: DocumentType) -> Iterator[Tuple[Optional[int], str]]:
+        """
+        按页 (或章节) 流式提取文本, 解析一页产出一页, 不在内存中拼接全文
+
+        返回 (页码, 文本) 迭代器, 没有分页信息的格式页码为 None
+        """
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
+        return self._iter_pages(file_path, DocumentType(doc_type))
 
+    def _iter_pages(self, file_path: str, doc_type: DocumentType) -> Iterator[Tuple[Optional[int], str]]:
         try:
             if doc_type == DocumentType.PDF:
-                loader = PyPDFLoader(file_path)
-                pages = loader.load()
-                return "\n\n".join([p.page_content for p in pages])
-                
+                yield from self._iter_pdf_pages(file_path)
+
             elif doc_type == DocumentType.DOCX:
-                loader = UnstructuredWordDocumentLoader(file_path)
-                docs = loader.load()
-                return "\n\n".join([d.page_content for d in docs])
-                
+                yield from self._iter_docx_pages(file_path)
+
             elif doc_type == DocumentType.MARKDOWN:
                 loader = UnstructuredMarkdownLoader(file_path)
-                docs = loader.load()
-                return "\n\n".join([d.page_content for d in docs])
-                
-            else: # Default to TextLoader
-                loader = TextLoader(file_path, encoding='utf-8')
-                docs = loader.load()
-                return "\n\n".join([d.page_content for d in docs])
-                
+                for doc in loader.lazy_load():
+                    yield None, doc.page_content
+
+            else: # Plain text is read section by section instead of TextLoader
+                yield from self._iter_text_sections(file_path)
+
         except Exception as e:
             raise ValueError(f"Failed to load document {file_path}: {str(e)}")
 
-    def split_text(self, text: str) -> List[Dict[str, Any]]:
+    def _iter_pdf_pages(self, file_path: str) -> Iterator[Tuple[Optional[int], str]]:
+        reader = PdfReader(file_path)
+        page_count = len(reader.pages)
+        workers = min(settings.PDF_EXTRACT_WORKERS, os.cpu_count() or 1)
+
+        next_index = 0
+        if workers > 1 and page_count >= settings.PDF_PARALLEL_MIN_PAGES:
+            try:
+                with closing(self._iter_pdf_parallel(file_path, page_count, workers)) as pages:
+                    for page in pages:
+                        yield page
+                        next_index = page[0]
+            except PDF_POOL_ERRORS as e:
+                # 已产出的页面不再重复, 其余页面在本进程内串行解析
+                logger.warning(f"Parallel PDF extraction failed ({e!r}), extracting from page {next_index + 1} serially")
+
+        for index in range(next_index, page_count):
+            yield _pdf_page_text(reader, index)
+
+    def _iter_pdf_parallel(self, file_path: str, page_count: int, workers: int) -> Iterator[Tuple[Optional[int], str]]:
+        """
+        按页码区间切分 PDF 提交到共享进程池, 按提交顺序取回结果, 保证页面顺序与串行提取一致
+
+        在途区间数不超过 workers * 2, 内存占用有界; 进程池损坏时将其丢弃, 错误交给调用方退回串行解析
+        """
+        executor = get_pdf_pool(workers)
+        range_size = max(math.ceil(page_count / (workers * 4)), 1)
+        ranges = iter([(start, min(start + range_size, page_count)) for start in range(0, page_count, range_size)])
+        pending = deque()
+        try:
+            for start, stop in itertools.islice(ranges, workers * 2):
+                pending.append(executor.submit(_extract_pdf_range, file_path, start, stop))
+            logger.info(f"Extracting {page_count} PDF pages with {workers} processes")
+            while pending:
+                pages = pending.popleft().result()
+                next_range = next(ranges, None)
+                if next_range is not None:
+                    pending.append(executor.submit(_extract_pdf_range, file_path, *next_range))
+                yield from pages
+        except PDF_POOL_ERRORS:
+            shutdown_pdf_pool(executor)
+            raise
+        finally:
+            # 提前结束 (消费端停止或出错) 时撤销本文档尚未开始的区间, 进程池继续供其他文档使用
+            for future in pending:
+                future.cancel()
+
+    def _iter_docx_pages(self, file_path: str) -> Iterator[Tuple[Optional[int], str]]:
+        """
+        以 iterparse 逐段解析 word/document.xml, 段落处理完即释放, 按分页符切分页面
+
+        分页以段落为粒度: 段落含 Word 上次排版记录的分页位置 (lastRenderedPageBreak) 或上一段含手动分页符时,
+        该段从新的一页开始。没有分页符的长文档按 TEXT_SECTION_SIZE 切分。
+        旧版二进制 .doc 不是 zip 包, 仍由 UnstructuredWordDocumentLoader 整体解析。
+        """
+        if not zipfile.is_zipfile(file_path):
+            loader = UnstructuredWordDocumentLoader(file_path, mode="paged")
+            for doc in loader.lazy_load():
+                yield doc.metadata.get("page_number"), doc.page_content
+            return
+
+        page, buffer, size = 1, [], 0
+        break_pending, page_has_text = False, False
+        with zipfile.ZipFile(file_path) as archive, archive.open("word/document.xml") as xml:
+            for _, elem in ElementTree.iterparse(xml, events=("end",)):
+                if elem.tag != f"{W_NS}p":
+                    continue
+                parts, rendered_break, manual_break = [], False, False
+                for node in elem.iter():
+                    if node.tag == f"{W_NS}t":
+                        parts.append(node.text or "")
+                    elif node.tag == f"{W_NS}tab":
+                        parts.append("\t")
+                    elif node.tag == f"{W_NS}br":
+                        if node.get(f"{W_NS}type") == "page":
+                            manual_break = True
+                        else:
+                            parts.append("\n")
+                    elif node.tag == f"{W_NS}lastRenderedPageBreak":
+                        rendered_break = True
+                # 文本框中的段落嵌套在外层段落内, 已先于外层处理并清空, 不会重复计入
+                elem.clear()
+
+                if (rendered_break or break_pending) and page_has_text:
+                    if buffer:
+                        yield page, "\n\n".join(buffer)
+                        buffer, size = [], 0
+                    page, page_has_text = page + 1, False
+                break_pending = manual_break
+
+                text = "".join(parts)
+                if text.strip():
+                    page_has_text = True
+                    buffer.append(text)
+                    size += len(text)
+                    if size >= 4 * TEXT_SECTION_SIZE:
+                        yield page, "\n\n".join(buffer)
+                        buffer, size = [], 0
+        if buffer:
+            yield page, "\n\n".join(buffer)
+
+    def _iter_text_sections(self, file_path: str) -> Iterator[Tuple[Optional[int], str]]:
+        buffer, size = [], 0
+        with open(file_path, encoding='utf-8') as f:
+            for line in f:
+                buffer.append(line)
+                size += len(line)
+                # 优先在空行处切分, 过长的段落强制切分
+                if (size >= TEXT_SECTION_SIZE and not line.strip()) or size >= 4 * TEXT_SECTION_SIZE:
+                    yield None, "".join(buffer).rstrip("\n")
+                    buffer, size = [], 0
+        if buffer:
+            yield None, "".join(buffer).rstrip("\n")
+
+    def split_text(self, text: str, token_counter: Optional[TokenCounter] = None) -> List[Dict[str, Any]]:
         """
         将文本切分为 Chunks
+
+        token_counter 为批量 token 计数函数 (如嵌入模型分词器), 未提供时按字符数计
+        """
+        return build_chunks(self.chunker.split(text), token_counter=token_counter)
+
+    def iter_chunks(
+        self,
+        pages: Iterable[Tuple[Optional[int], str]],
+        token_counter: Optional[TokenCounter] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        增量分块: 逐页切分并立即产出, 内存占用与单页大小相关而与文档大小无关
+
+        页末不足半个分块的尾部并入下一页一起切分, 避免在分页处产生碎片分块;
+        分块的 page_number 为其起始页。每页的 token 数一次批量计算。
         """
-        chunks = self.text_splitter.create_documents([text])
-        
-        return [
-            {
-                "content": chunk.page_content,
-                "index": i,
-                "token_count": len(chunk.page_content) # Simple char count for now
-            }
-            for i, chunk in enumerate(chunks)
-        ]
+        index = 0
+        carry, carry_page = "", None
+        for page_number, text in pages:
+            if not text or not text.strip():
+                continue
+            if carry:
+                text = f"{carry}\n\n{text}"
+            pieces = self.chunker.split(text)
+            if not pieces:
+                continue
+
+            # 第一个分块从上一页并入的尾部开始
+            pages_of = [carry_page if (i == 0 and carry) else page_number for i in range(len(pieces))]
+            if len(pieces[-1]) < self.chunk_size // 2:
+                carry, carry_page = pieces.pop(), pages_of.pop()
+            else:
+                carry, carry_page = "", None
+
+            chunks = build_chunks(pieces, index, pages_of, token_counter)
+            index += len(chunks)
+            yield from chunks
+
+        if carry:
+            yield from build_chunks([carry], index, [carry_page], token_counter)
+
+def prefetch(iterable: Iterable[Any], depth: int = 8) -> Iterator[Any]:
+    """
+    在后台线程中提前消费迭代器 (最多缓存 depth 项), 使文档解析与下游的分块/写入重叠进行
+
+    生产端的异常会在消费端原样抛出; 消费端提前结束时后台线程随之停止。
+    """
+    done = object()
+    buffer = queue.Queue(maxsize=max(depth, 1))
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+            put((done, None))
+        except BaseException as e:
+            put((done, e))
+
+    thread = threading.Thread(target=produce, name="prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
 
 text_processor = TextProcessor()
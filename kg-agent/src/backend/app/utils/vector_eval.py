@@ -0,0 +1,75 @@
+"""
+向量检索召回率评估
+
+以精确 (暴力) 检索的结果为基准, 衡量近似索引及其检索参数的召回率。
+"""
+from typing import Sequence
+
+import numpy as np
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """
+    将向量按行归一化为单位长度的 float32 数组
+
+    Args:
+        vectors: (n, dim) 或 (dim,) 的向量
+
+    Returns:
+        np.ndarray: 归一化后的向量, 内积即余弦相似度
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.clip(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12, None)
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int, block_rows: int = 65536) -> np.ndarray:
+    """
+    按余弦相似度精确检索每个查询的 top-k 行号
+
+    Args:
+        corpus: (n, dim) 语料向量
+        queries: (q, dim) 查询向量
+        k: 每个查询返回的结果数
+        block_rows: 分块计算的语料行数, 限制相似度矩阵的内存占用
+
+    Returns:
+        np.ndarray: (q, min(k, n)) 的行号, 按相似度从高到低排列
+    """
+    corpus = normalize_rows(corpus)
+    queries = normalize_rows(queries).reshape(-1, corpus.shape[1])
+    k = min(k, len(corpus))
+    if k <= 0:
+        return np.empty((len(queries), 0), dtype=np.int64)
+    best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+    best_rows = np.empty((len(queries), 0), dtype=np.int64)
+    for start in range(0, len(corpus), block_rows):
+        scores = queries @ corpus[start:start + block_rows].T
+        rows = np.broadcast_to(np.arange(start, start + scores.shape[1]), scores.shape)
+        # 与上一块的 top-k 合并后重新取 top-k
+        scores = np.concatenate([best_scores, scores], axis=1)
+        rows = np.concatenate([best_rows, rows], axis=1)
+        top = np.argpartition(-scores, min(k, scores.shape[1]) - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, top, axis=1)
+        best_rows = np.take_along_axis(rows, top, axis=1)
+    order = np.argsort(-best_scores, axis=1, kind="stable")
+    return np.take_along_axis(best_rows, order, axis=1)
+
+def recall_at_k(found: Sequence[Sequence], truth: Sequence[Sequence], k: int) -> float:
+    """
+    平均 recall@k: 每个查询的前 k 个结果中, 属于精确检索前 k 个结果的比例
+
+    Args:
+        found: 每个查询的近似检索结果 (行号或主键)
+        truth: 每个查询的精确检索结果, 与 found 使用相同的标识
+
+    Returns:
+        float: 所有查询的平均召回率
+    """
+    if len(truth) == 0:
+        return 1.0
+    recalls = []
+    for approx, exact in zip(found, truth):
+        expected = set(list(exact)[:k])
+        if not expected:
+            recalls.append(1.0)
+            continue
+        recalls.append(len(expected & set(list(approx)[:k])) / len(expected))
+    return float(np.mean(recalls))
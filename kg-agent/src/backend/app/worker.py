@@ -0,0 +1,38 @@
+"""
+按 worker 组启动 Celery worker
+
+用法: python -m app.worker <interactive|bulk|large> [其他 celery worker 参数]
+
+组对应的队列和并发数来自 settings.CELERY_WORKER_GROUPS。
+"""
+import sys
+
+from app.celery_app import celery_app
+from app.config import get_settings
+
+settings = get_settings()
+
+def worker_argv(group: str, extra_args=None):
+    """
+    生成指定 worker 组的 celery worker 命令行参数
+    """
+    groups = settings.CELERY_WORKER_GROUPS
+    if group not in groups:
+        raise SystemExit(f"Unknown worker group '{group}', expected one of: {', '.join(groups)}")
+
+    config = groups[group]
+    argv = [
+        "worker",
+        "--loglevel=info",
+        f"--hostname={group}@%h",
+        f"--queues={','.join(config['queues'])}",
+        f"--concurrency={config.get('concurrency', 1)}",
+    ]
+    if config.get("pool"):
+        argv.append(f"--pool={config['pool']}")
+    return argv + list(extra_args or [])
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        raise SystemExit(__doc__)
+    celery_app.worker_main(worker_argv(sys.argv[1], sys.argv[2:]))
@@ -0,0 +1,120 @@
+"""
+文档级向量与两阶段检索测试
+"""
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+import numpy as np
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+from app.infrastructure.local_vector import LocalVectorIndex
+from app.services import centroid_service as centroid_module
+from app.services.centroid_service import CentroidService
+from app.utils.search_filters import parse_filters
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def hset(self, key, mapping):
+        self.ops.append(lambda: self.redis.data.__setitem__(key, {k: str(v) for k, v in mapping.items()}))
+
+    def delete(self, key):
+        self.ops.append(lambda: self.redis.data.pop(key, None))
+
+    def execute(self):
+        for op in self.ops:
+            op()
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+def chunks(count):
+    return [{"index": i, "content": f"chunk {i}"} for i in range(count)]
+
+class TestCentroidService(unittest.TestCase):
+    def setUp(self):
+        """
+        设置测试环境: 分块与文档向量均使用本地精确索引
+        """
+        self.base_dir = tempfile.mkdtemp()
+        self.chunk_store = LocalVectorIndex(os.path.join(self.base_dir, "chunks"), 4)
+        self.service = CentroidService()
+        self.service._store = LocalVectorIndex(os.path.join(self.base_dir, "centroids"), 4)
+        self.redis = FakeRedis()
+        for patcher in (
+            patch.object(centroid_module.settings, "DOC_CENTROIDS_ENABLED", True),
+            patch.object(centroid_module, "get_redis_client", lambda: self.redis),
+            patch.object(centroid_module, "vector_store", self.chunk_store)
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """
+        清理测试环境
+        """
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def centroid(self, doc_id):
+        return self.service.store.get_chunk_vectors(doc_id, [0]).get(0)
+
+    def test_incremental_update(self):
+        """
+        测试增量修正后的文档向量等于全部分块向量的均值, 没有状态时交给调用方全量计算
+        """
+        vectors = np.array([[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 1, 0]], dtype=np.float32)
+        self.service.set_documents([("doc-a", vectors, {"tenant": "hr"})])
+        self.assertTrue(np.allclose(self.centroid("doc-a"), [3 ** -0.5] * 3 + [0]))
+
+        added = np.array([[0, 0, 0, 1]], dtype=np.float32)
+        self.assertTrue(self.service.update_document("doc-a", added, vectors[:2], {"tenant": "hr"}))
+        self.assertTrue(np.allclose(self.centroid("doc-a"), [0, 0, 2 ** -0.5, 2 ** -0.5]))
+        self.assertEqual(self.service.store.count(), 1)
+
+        self.assertFalse(self.service.update_document("doc-b", added, [], None))
+        self.service.update_document("doc-a", [], np.concatenate([vectors[2:], added]), None)
+        self.assertIsNone(self.centroid("doc-a"))
+        self.assertEqual(self.redis.data, {})
+
+    def test_two_stage_search(self):
+        """
+        测试第二阶段只检索候选文档的分块, 结果与精确检索一致且不超过 top_k
+        """
+        rng = np.random.RandomState(0)
+        topics = np.eye(4, dtype=np.float32)
+        for i, topic in enumerate(topics):
+            vectors = topic + 0.1 * rng.normal(size=(5, 4)).astype(np.float32)
+            self.chunk_store.insert_chunks(f"doc-{i}", chunks(5), vectors, {"tenant": "hr" if i < 2 else "it"})
+            self.service.set_documents([(f"doc-{i}", vectors, {"tenant": "hr" if i < 2 else "it"})])
+
+        query = topics[1] + 0.05 * topics[0]
+        self.assertEqual(self.service.candidate_documents(query, 1), ["doc-1"])
+
+        hits = self.service.search(query, top_k=3, doc_candidates=2, chunk_candidates=10)[0]
+        flat = self.chunk_store.search(query, top_k=3)[0]
+        self.assertEqual([(h.entity.get("doc_id"), h.entity.get("chunk_index")) for h in hits],
+                         [(h.entity.get("doc_id"), h.entity.get("chunk_index")) for h in flat])
+
+        # 过滤条件同时作用于两个阶段
+        filters = parse_filters({"tenant": "it"})
+        candidates = self.service.candidate_documents(query, 1, filters)
+        self.assertIn(candidates[0], ("doc-2", "doc-3"))
+        hits = self.service.search(query, top_k=3, doc_candidates=1, filters=filters)[0]
+        self.assertEqual({h.entity.get("doc_id") for h in hits}, set(candidates))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+分块增量比对测试
+"""
+import unittest
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+from app.utils.chunk_diff import chunk_hash, diff_chunks
+
+class TestChunkDiff(unittest.TestCase):
+    def test_identical(self):
+        """
+        测试内容完全相同时无需重建
+        """
+        diff = diff_chunks(["a", "b", "c"], ["a", "b", "c"])
+
+        self.assertEqual(diff.unchanged, [0, 1, 2])
+        self.assertEqual(diff.stale, [])
+        self.assertEqual(diff.rewritten, [])
+
+    def test_changed_chunk(self):
+        """
+        测试单个分块内容变化
+        """
+        diff = diff_chunks(["a", "b", "c"], ["a", "x", "c"])
+
+        self.assertEqual(diff.unchanged, [0, 2])
+        self.assertEqual(diff.added, [1])
+        self.assertEqual(diff.removed, [1])
+        self.assertEqual(diff.moved, {})
+
+    def test_insert_shifts_following_chunks(self):
+        """
+        测试插入分块后, 后续分块复用旧向量而不是重新生成
+        """
+        diff = diff_chunks(["a", "b", "c"], ["a", "x", "b", "c"])
+
+        self.assertEqual(diff.unchanged, [0])
+        self.assertEqual(diff.added, [1])
+        self.assertEqual(diff.moved, {2: 1, 3: 2})
+        self.assertEqual(diff.removed, [])
+        self.assertEqual(diff.stale, [1, 2])
+        self.assertEqual(diff.rewritten, [1, 2, 3])
+
+    def test_removed_and_duplicate_chunks(self):
+        """
+        测试删除分块及重复内容按多重集合匹配
+        """
+        diff = diff_chunks(["a", "dup", "dup", "b"], ["dup", "b"])
+
+        self.assertEqual(diff.moved, {0: 1, 1: 3})
+        self.assertEqual(diff.added, [])
+        self.assertEqual(diff.removed, [0, 2])
+
+    def test_chunk_hash(self):
+        """
+        测试分块哈希对内容敏感
+        """
+        self.assertEqual(chunk_hash("内容"), chunk_hash("内容"))
+        self.assertNotEqual(chunk_hash("内容"), chunk_hash("内容 "))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+原生分块器测试
+"""
+import unittest
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+from app.utils.chunker import SpanChunker, build_chunks
+
+class TestSpanChunker(unittest.TestCase):
+    def setUp(self):
+        """
+        设置测试环境
+        """
+        self.chunker = SpanChunker(chunk_size=100, chunk_overlap=20)
+
+    def assert_valid_spans(self, text, spans):
+        # 区间有序, 不超长, 且覆盖全部非空白字符
+        covered = set()
+        for start, end in spans:
+            self.assertLessEqual(end - start, self.chunker.chunk_size)
+            self.assertFalse(text[start].isspace() or text[end - 1].isspace())
+            covered.update(range(start, end))
+        self.assertEqual(spans, sorted(spans))
+        self.assertTrue(all(i in covered for i, c in enumerate(text) if not c.isspace()))
+
+    def test_short_text(self):
+        """
+        测试短文本整体作为一个分块, 首尾空白去除
+        """
+        self.assertEqual(self.chunker.split("  hello world \n"), ["hello world"])
+        self.assertEqual(self.chunker.split("   "), [])
+
+    def test_paragraph_boundaries(self):
+        """
+        测试优先在段落处切分且段落之间不重叠
+        """
+        text = "\n\n".join(["a" * 60, "b" * 60, "c" * 60])
+        self.assertEqual(self.chunker.split(text), ["a" * 60, "b" * 60, "c" * 60])
+
+    def test_cjk_sentence_boundaries(self):
+        """
+        测试中文文本在句末标点处切分
+        """
+        text = "".join(f"这是第{i}个测试句子，用于验证分块。" for i in range(20))
+        spans = self.chunker.spans(text)
+        self.assert_valid_spans(text, spans)
+        for start, end in spans[:-1]:
+            self.assertEqual(text[end - 1], "。")
+
+    def test_hard_split_with_overlap(self):
+        """
+        测试没有任何边界时按长度硬切分并保留重叠
+        """
+        text = "x" * 250
+        spans = self.chunker.spans(text)
+        self.assert_valid_spans(text, spans)
+        self.assertEqual(spans[0], (0, 100))
+        self.assertEqual(spans[1][0], 80)
+
+    def test_build_chunks_batches_token_counts(self):
+        """
+        测试 token 数通过一次批量调用计算
+        """
+        calls = []
+
+        def counter(texts):
+            calls.append(list(texts))
+            return [len(t.split()) for t in texts]
+
+        chunks = build_chunks(["a b", "c d e"], start_index=3, page_numbers=[1, 2], token_counter=counter)
+
+        self.assertEqual(calls, [["a b", "c d e"]])
+        self.assertEqual(chunks, [
+            {"content": "a b", "index": 3, "token_count": 2, "page_number": 1},
+            {"content": "c d e", "index": 4, "token_count": 3, "page_number": 2},
+        ])
+
+if __name__ == "__main__":
+    unittest.main()
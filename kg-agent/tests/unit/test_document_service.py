@@ -3,18 +3,22 @@
 """
 import unittest
 import tempfile
+import shutil
 import os
 import sys
+import uuid
 
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src/backend'))
 
 from app.services.document_service import document_service
+from app.exceptions import ValidationError
+from app.config import get_settings
 from app.models import Document, DocumentType, ProcessingStatus
 
 # 模拟Celery任务，避免真实的Redis连接
 from unittest.mock import patch
-from app.tasks.document import process_document_pipeline
+from app.tasks.document import process_document_pipeline, process_batch
 
 # 在测试前模拟delay方法
 process_document_pipeline.delay = lambda *args, **kwargs: None
@@ -26,7 +30,8 @@ class TestDocumentService(unittest.TestCase):
         """
         # 创建临时文件用于测试
         self.test_file = tempfile.NamedTemporaryFile(suffix=".txt", delete=False)
-        self.test_file.write(b"Test document content")
+        # 上传按内容去重, 每个用例使用不同的内容
+        self.test_file.write(f"Test document content {uuid.uuid4()}".encode())
         self.test_file.close()
         
     def tearDown(self):
@@ -81,5 +86,189 @@ class TestDocumentService(unittest.TestCase):
         self.assertEqual(doc.id, "test_doc_123")
         self.assertEqual(doc.status, ProcessingStatus.COMPLETED)
 
+    def test_upload_duplicate_content(self):
+        """
+        测试重复内容上传直接返回已有文档, 不再入队处理
+        """
+        existing = {
+            "status": ProcessingStatus.COMPLETED.value,
+            "filename": "original.txt",
+            "file_path": "/tmp/original.txt",
+            "doc_type": DocumentType.TXT.value,
+            "file_size": 21
+        }
+        with patch("app.services.document_service.content_registry") as registry, \
+             patch("app.services.document_service.status_service") as status, \
+             patch.object(process_document_pipeline, "delay") as delay:
+            registry.claim.return_value = "existing_doc"
+            status.get.return_value = existing
+
+            with open(self.test_file.name, 'rb') as f:
+                doc = document_service.upload_document(f, "copy.txt")
+
+        self.assertEqual(doc.id, "existing_doc")
+        self.assertEqual(doc.status, ProcessingStatus.COMPLETED)
+        self.assertEqual(doc.metadata.extra["duplicate_of"], "existing_doc")
+        self.assertEqual(doc.metadata.extra["uploaded_filename"], "copy.txt")
+        registry.replace.assert_not_called()
+        # 登记前创建的状态记录随重复上传删除
+        status.delete.assert_called_once_with(status.init.call_args[0][0])
+        delay.assert_not_called()
+
+    def test_upload_after_failed_duplicate(self):
+        """
+        测试已有同内容文档处理失败时重新处理
+        """
+        with patch("app.services.document_service.content_registry") as registry, \
+             patch("app.services.document_service.status_service") as status, \
+             patch.object(process_document_pipeline, "delay") as delay:
+            registry.claim.return_value = "failed_doc"
+            registry.replace.side_effect = lambda content_hash, expected_id, doc_id, tenant=None: doc_id
+            status.get.side_effect = lambda doc_id: (
+                {"status": ProcessingStatus.FAILED.value} if doc_id == "failed_doc"
+                else {"status": ProcessingStatus.PENDING.value, "filename": "retry.txt"}
+            )
+
+            with open(self.test_file.name, 'rb') as f:
+                doc = document_service.upload_document(f.read(), "retry.txt")
+
+        self.assertNotEqual(doc.id, "failed_doc")
+        self.assertEqual(doc.status, ProcessingStatus.PENDING)
+        self.assertEqual(registry.replace.call_args[0][1:3], ("failed_doc", doc.id))
+        delay.assert_called_once()
+
+        if os.path.exists(doc.file_path):
+            os.remove(doc.file_path)
+
+    def test_update_document_sanitizes_filename(self):
+        """
+        测试新版本的文件名中的路径成分不会让文件写到上传目录之外
+        """
+        upload_root = os.path.abspath(get_settings().UPLOAD_FOLDER)
+        with patch("app.services.document_service.content_registry"), \
+             patch("app.services.document_service.status_service") as status, \
+             patch.object(process_document_pipeline, "delay"):
+            status.get.return_value = {"status": ProcessingStatus.COMPLETED.value, "filename": "a.txt"}
+            with open(self.test_file.name, 'rb') as f:
+                document_service.update_document("doc_1", f.read(), "../../escape.txt")
+
+        file_path = os.path.abspath(status.update.call_args.kwargs["file_path"])
+        self.addCleanup(os.remove, file_path)
+        self.assertEqual(os.path.dirname(file_path), upload_root)
+        self.assertTrue(os.path.exists(file_path))
+
+    def test_claim_content_stale_claim(self):
+        """
+        测试持有者没有状态记录的登记视为过期: 比较并设置接管, 并发接管失败时按重复处理
+        """
+        with patch("app.services.document_service.content_registry") as registry, \
+             patch("app.services.document_service.status_service") as status:
+            registry.claim.return_value = "orphan_doc"
+            status.get.return_value = None
+
+            registry.replace.return_value = "new_doc"
+            self.assertIsNone(document_service.claim_content("hash", "new_doc", "hr"))
+            registry.claim.assert_called_with("hash", "new_doc", "hr")
+            registry.replace.assert_called_with("hash", "orphan_doc", "new_doc", "hr")
+
+            # 其他上传先一步接管了登记
+            registry.replace.return_value = "other_doc"
+            self.assertEqual(document_service.claim_content("hash", "new_doc"), "other_doc")
+
+    def test_content_claims_scoped_by_tenant(self):
+        """
+        测试内容去重按租户隔离: 同一租户内重复, 不同租户 (以及未指定租户) 各自登记
+        """
+        store = {}
+
+        class FakeRedis:
+            def set(self, key, value, nx=False):
+                if nx and key in store:
+                    return None
+                store[key] = value
+                return True
+
+            def get(self, key):
+                return store.get(key)
+
+        with patch("app.services.content_registry.get_redis_client", return_value=FakeRedis()), \
+             patch("app.services.document_service.status_service") as status:
+            status.get.return_value = {"status": ProcessingStatus.COMPLETED.value}
+            self.assertIsNone(document_service.claim_content("hash", "doc_hr", "hr"))
+            self.assertEqual(document_service.claim_content("hash", "doc_hr_2", "hr"), "doc_hr")
+            self.assertIsNone(document_service.claim_content("hash", "doc_finance", "finance"))
+            self.assertIsNone(document_service.claim_content("hash", "doc_none"))
+
+        self.assertEqual(store, {
+            "kg:content:hr:hash": "doc_hr",
+            "kg:content:finance:hash": "doc_finance",
+            "kg:content:hash": "doc_none"
+        })
+
+    def test_upload_unsupported_type(self):
+        """
+        测试不支持的文件类型在保存前被拒绝
+        """
+        with self.assertRaises(ValidationError):
+            document_service.upload_document(b"MZ", "setup.exe")
+
+    def test_upload_attribute_too_long(self):
+        """
+        测试超过 Milvus 字段长度的 tenant / source 在接收文件前被拒绝
+        """
+        with patch("app.services.document_service.save_and_hash") as save, \
+             patch("app.services.document_service.status_service") as status:
+            with self.assertRaises(ValidationError) as ctx:
+                document_service.upload_document(b"content", "a.txt", tenant="t" * 65)
+            self.assertEqual(ctx.exception.details["field"], "tenant")
+            with self.assertRaises(ValidationError):
+                document_service.upload_batch([(None, "a.txt")], source="s" * 129)
+
+        save.assert_not_called()
+        status.init.assert_not_called()
+        self.assertEqual(document_service._attributes("t" * 64, "s" * 128)["tenant"], "t" * 64)
+
+    def test_import_manifest_outside_root(self):
+        """
+        测试清单导入拒绝批量导入根目录之外的路径: 同名前缀的兄弟目录与指向根目录之外的符号链接
+        """
+        root = tempfile.mkdtemp()
+        sibling = root + "-other"
+        os.makedirs(sibling)
+        self.addCleanup(shutil.rmtree, root, True)
+        self.addCleanup(shutil.rmtree, sibling, True)
+        outside = os.path.join(sibling, "secret.txt")
+        with open(outside, "w") as f:
+            f.write("secret")
+        os.symlink(outside, os.path.join(root, "link.txt"))
+
+        with patch.object(get_settings(), "BATCH_IMPORT_ROOT", root):
+            for path in (os.path.join("..", os.path.basename(sibling), "secret.txt"), "link.txt"):
+                with self.assertRaises(ValidationError):
+                    document_service.import_manifest(paths=[path])
+            # 目录导入跳过指向根目录之外的链接, 没有可处理的文件
+            with self.assertRaises(ValidationError):
+                document_service.import_manifest(directory=".")
+
+    def test_process_batch_reuses_upload_hash(self):
+        """
+        测试批量导入只为缺少内容哈希的清单条目 (服务端导入的文件) 计算哈希, 上传时已计算的不再读取文件
+        """
+        manifest = [
+            {"doc_id": "doc-uploaded", "file_path": "/data/a.txt", "content_hash": "hash-a"},
+            {"doc_id": "doc-imported", "file_path": "/data/b.txt"}
+        ]
+        with patch("app.tasks.document.spill_store") as spill, \
+             patch("app.tasks.document.status_service"), \
+             patch("app.tasks.document.build_batch_pipeline"), \
+             patch("app.tasks.document.calculate_file_hash", return_value="hash-b") as file_hash, \
+             patch.object(document_service, "claim_content", return_value=None) as claim:
+            spill.read.return_value = manifest
+            result = process_batch.run("batch-1", {"path": "manifest"})
+
+        file_hash.assert_called_once_with("/data/b.txt", "sha256")
+        self.assertEqual([call.args[0] for call in claim.call_args_list], ["hash-a", "hash-b"])
+        self.assertEqual(result["total"], 2)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,56 @@
+"""
+嵌入推理后端测试
+"""
+import unittest
+import os
+import sys
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+from app.services.embedding_backends import OnnxEmbeddingModel, compare_embeddings, load_model
+
+class TestEmbeddingBackends(unittest.TestCase):
+    def test_compare_identical(self):
+        """
+        测试与参考向量完全一致时精度指标为满分
+        """
+        reference = np.random.RandomState(0).rand(20, 8)
+        accuracy = compare_embeddings(reference, reference.copy())
+
+        self.assertAlmostEqual(accuracy["mean_cosine"], 1.0, places=5)
+        self.assertAlmostEqual(accuracy["min_cosine"], 1.0, places=5)
+        self.assertEqual(accuracy["neighbour_overlap"], 1.0)
+
+    def test_compare_perturbed(self):
+        """
+        测试加入噪声后余弦相似度下降
+        """
+        rng = np.random.RandomState(0)
+        reference = rng.rand(20, 8)
+        accuracy = compare_embeddings(reference, reference + rng.normal(scale=0.5, size=reference.shape))
+
+        self.assertLess(accuracy["min_cosine"], 1.0)
+        self.assertLessEqual(accuracy["neighbour_overlap"], 1.0)
+
+    def test_onnx_mean_pooling(self):
+        """
+        测试 ONNX 后端的均值池化忽略 padding 位置
+        """
+        model = OnnxEmbeddingModel.__new__(OnnxEmbeddingModel)
+        model.pooling = "mean"
+        hidden = np.array([[[1.0, 2.0], [3.0, 4.0], [100.0, 100.0]]])
+        mask = np.array([[1, 1, 0]])
+
+        self.assertEqual(model._pool(hidden, mask).tolist(), [[2.0, 3.0]])
+
+    def test_unknown_backend(self):
+        """
+        测试未知后端报错
+        """
+        with self.assertRaises(ValueError):
+            load_model("tensorrt", "all-MiniLM-L6-v2")
+
+if __name__ == "__main__":
+    unittest.main()
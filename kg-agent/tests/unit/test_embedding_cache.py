@@ -0,0 +1,80 @@
+"""
+向量缓存测试
+"""
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+from app.utils.embedding_cache import EmbeddingCache, normalize_text
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        """
+        设置测试环境
+        """
+        self.base_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        清理测试环境
+        """
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def make_cache(self, model_id="model-a", lru_size=10, max_bytes=1024 * 1024):
+        return EmbeddingCache(self.base_dir, model_id, lru_size=lru_size, max_bytes=max_bytes)
+
+    def test_normalize_text(self):
+        """
+        测试规范化合并空白并统一全角字符
+        """
+        self.assertEqual(normalize_text("  Ａ\tb\n\nc "), "A b c")
+
+    def test_disk_shared_across_instances(self):
+        """
+        测试磁盘缓存可被其他实例 (其他 worker 进程) 读取
+        """
+        writer = self.make_cache()
+        keys, found = writer.lookup(["foo", "bar"])
+        self.assertEqual(found, {})
+        vectors = np.arange(8, dtype=np.float32).reshape(2, 4)
+        writer.store(keys, vectors)
+
+        reader = self.make_cache(lru_size=0)
+        _, found = reader.lookup(["bar", "baz", "foo"])
+        self.assertEqual(sorted(found), [0, 2])
+        self.assertEqual(found[0].tolist(), vectors[1].tolist())
+        self.assertEqual(found[2].tolist(), vectors[0].tolist())
+        self.assertEqual(reader.stats()["disk_hits"], 2)
+        self.assertEqual(reader.stats()["misses"], 1)
+
+    def test_model_isolation(self):
+        """
+        测试不同模型的缓存互不命中
+        """
+        cache = self.make_cache("model-a")
+        keys, _ = cache.lookup(["foo"])
+        cache.store(keys, np.ones((1, 4), dtype=np.float32))
+
+        _, found = self.make_cache("model-b").lookup(["foo"])
+        self.assertEqual(found, {})
+
+    def test_disk_size_limit(self):
+        """
+        测试达到大小上限后停止写入磁盘, 已有条目仍可命中
+        """
+        cache = self.make_cache(lru_size=0, max_bytes=2 * 4 * 4)
+        keys, _ = cache.lookup(["a", "b", "c"])
+        cache.store(keys[:2], np.ones((2, 4), dtype=np.float32))
+        cache.store(keys[2:], np.ones((1, 4), dtype=np.float32))
+
+        _, found = cache.lookup(["a", "b", "c"])
+        self.assertEqual(sorted(found), [0, 1])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+本机嵌入服务测试
+"""
+import unittest
+import tempfile
+import shutil
+import threading
+import os
+import sys
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+from app.services.embedding_server import MicroBatcher, EmbeddingServer, EmbeddingClient
+
+class FakeEncoder:
+    """
+    以文本长度作为向量内容, 记录每次调用的批次大小
+    """
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(len(texts))
+        return np.array([[len(t), 1] for t in texts], dtype=np.float32)
+
+class TestEmbeddingServer(unittest.TestCase):
+    def setUp(self):
+        """
+        设置测试环境
+        """
+        self.encoder = FakeEncoder()
+        self.batcher = MicroBatcher(self.encoder, max_batch=64, max_wait=0.05)
+        self.batcher.start()
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        清理测试环境
+        """
+        self.batcher.stop()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_concurrent_requests_batched(self):
+        """
+        测试并发请求合并为一次编码调用, 并按请求拆分结果
+        """
+        futures = [self.batcher.submit(["a" * n, "b"]) for n in range(1, 6)]
+        results = [future.result(timeout=5) for future in futures]
+
+        self.assertEqual(self.encoder.calls, [10])
+        for n, result in enumerate(results, start=1):
+            self.assertEqual(result[:, 0].tolist(), [n, 1])
+        stats = self.batcher.stats()
+        self.assertEqual(stats["requests"], 5)
+        self.assertEqual(stats["batches"], 1)
+        self.assertEqual(stats["max_batch_size"], 10)
+
+    def test_round_trip_over_socket(self):
+        """
+        测试客户端通过 Unix socket 获取向量和统计信息
+        """
+        socket_path = os.path.join(self.tmp_dir, "embedding.sock")
+        server = EmbeddingServer(socket_path, self.batcher)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            client = EmbeddingClient(socket_path, timeout=5)
+            vectors = client.encode(["hello", "知识图谱"])
+            self.assertEqual(vectors.dtype, np.float32)
+            self.assertEqual(vectors.tolist(), [[5, 1], [4, 1]])
+            self.assertEqual(client.stats()["texts"], 2)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+向量编码服务测试
+"""
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+import numpy as np
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+from app.services.embedding_service import EmbeddingService
+from app.utils.embedding_cache import EmbeddingCache
+
+class FakeModel:
+    """
+    以文本长度作为向量内容的假模型, 记录每次调用的批次
+    """
+    def __init__(self):
+        self.batches = []
+
+    def get_sentence_embedding_dimension(self):
+        return 4
+
+    def encode(self, texts, **kwargs):
+        self.batches.append(list(texts))
+        return np.array([[len(t), 0, 0, 1] for t in texts], dtype=np.float64)
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+class TestEmbeddingService(unittest.TestCase):
+    def setUp(self):
+        """
+        设置测试环境
+        """
+        self.service = EmbeddingService()
+        self.model = FakeModel()
+        self.service._model = self.model
+        # 分词器不可用, token 数按字符数计算
+        self.service._tokenizer = False
+        self.cache_dir = tempfile.mkdtemp()
+        self.service.cache = EmbeddingCache(self.cache_dir, "fake-model", lru_size=100, max_bytes=1024 * 1024)
+        self.service.query_cache = EmbeddingCache(self.cache_dir, "fake-model", lru_size=100)
+        self.redis = FakeRedis()
+        self.service._redis = self.redis
+
+    def tearDown(self):
+        """
+        清理测试环境
+        """
+        self.service._model = None
+        self.service._tokenizer = None
+        del self.service.cache
+        del self.service.query_cache
+        del self.service._redis
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_encode_keeps_input_order(self):
+        """
+        测试按长度分批编码后结果仍与输入顺序一致
+        """
+        texts = ["a" * n for n in (3, 10, 1, 7, 5, 2, 9)]
+        embeddings = self.service.encode(texts, batch_size=3)
+
+        self.assertEqual(embeddings.dtype, np.float32)
+        self.assertTrue(embeddings.flags["C_CONTIGUOUS"])
+        self.assertEqual(embeddings.shape, (len(texts), 4))
+        self.assertEqual(embeddings[:, 0].tolist(), [len(t) for t in texts])
+
+        # 每个批次内的文本长度相近
+        self.assertEqual([[len(t) for t in batch] for batch in self.model.batches], [[10, 9, 7], [5, 3, 2], [1]])
+        self.assertEqual(self.service.last_stats["texts"], len(texts))
+        self.assertEqual(self.service.last_stats["tokens"], sum(len(t) for t in texts))
+
+    def test_encode_uses_cache(self):
+        """
+        测试重复文本只编码一次, 再次出现时命中缓存
+        """
+        first = self.service.encode(["header", "body text", "header"])
+        self.assertEqual(self.model.batches, [["body text", "header"]])
+        self.assertEqual(first[0].tolist(), first[2].tolist())
+
+        # 空白差异在规范化后视为同一文本
+        second = self.service.encode(["body  text ", "header"])
+        self.assertEqual(len(self.model.batches), 1)
+        self.assertEqual(self.service.last_stats["cache_hits"], 2)
+        self.assertEqual(second.tolist(), [first[1].tolist(), first[0].tolist()])
+        self.assertAlmostEqual(self.service.cache_stats()["chunks"]["hit_rate"], 2 / 5)
+
+        # 全部命中缓存时不加载模型
+        with patch.object(self.service, "_get_model", side_effect=AssertionError("model loaded")):
+            third = self.service.encode(["header", "body text"])
+        self.assertEqual(third.tolist(), [first[0].tolist(), first[1].tolist()])
+
+    def test_encode_query(self):
+        """
+        测试查询向量命中进程内缓存, 并通过 Redis 在进程间共享
+        """
+        with patch("app.services.embedding_service.settings.QUERY_EMBEDDING_REDIS_TTL", 60):
+            vector = self.service.encode_query("what is a graph")
+            self.assertEqual(vector.dtype, np.float32)
+            self.assertEqual(vector.tolist(), [15, 0, 0, 1])
+            self.assertEqual(self.service.encode_query("what is a graph").tolist(), vector.tolist())
+            self.assertEqual(len(self.model.batches), 1)
+            self.assertEqual(len(self.redis.data), 1)
+
+            # 模拟另一个 API 进程: 内存缓存为空, 从 Redis 取得向量
+            self.service.query_cache = EmbeddingCache(self.cache_dir, "fake-model", lru_size=100)
+            self.assertEqual(self.service.encode_query("what is a graph").tolist(), vector.tolist())
+            self.assertEqual(len(self.model.batches), 1)
+
+    def test_encode_empty(self):
+        """
+        测试空输入返回空数组且不调用模型
+        """
+        embeddings = self.service.encode([])
+
+        self.assertEqual(embeddings.shape, (0, 4))
+        self.assertEqual(self.model.batches, [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,220 @@
+"""
+进程内向量索引测试
+"""
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+from app.infrastructure import local_vector
+from app.infrastructure.local_vector import LocalVectorIndex, HNSWLIB_AVAILABLE
+from app.utils.search_filters import parse_filters
+
+DIM = 8
+
+def make_chunks(count, prefix="chunk"):
+    return [{"index": i, "content": f"{prefix} {i}"} for i in range(count)]
+
+class TestLocalVectorIndex(unittest.TestCase):
+    def setUp(self):
+        """
+        设置测试环境
+        """
+        self.base_dir = tempfile.mkdtemp()
+        self.rng = np.random.RandomState(0)
+
+    def tearDown(self):
+        """
+        清理测试环境
+        """
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def make_index(self, index_type="flat"):
+        return LocalVectorIndex(self.base_dir, DIM, index_type=index_type)
+
+    def test_insert_and_search(self):
+        """
+        测试精确检索返回余弦相似度最高的分块, 结果结构与 pymilvus 一致
+        """
+        index = self.make_index()
+        vectors = self.rng.rand(20, DIM).astype(np.float32)
+        index.insert_chunks("doc-a", make_chunks(20), vectors)
+
+        hits = index.search(vectors[7] * 3, top_k=3)[0]
+        self.assertEqual(len(hits), 3)
+        self.assertEqual(hits[0].entity.get("chunk_index"), 7)
+        self.assertEqual(hits[0].entity.get("doc_id"), "doc-a")
+        self.assertEqual(hits[0].entity.get("content"), "chunk 7")
+        self.assertAlmostEqual(hits[0].distance, 1.0, places=5)
+        self.assertGreaterEqual(hits[0].distance, hits[1].distance)
+
+    def test_delete_and_persistence(self):
+        """
+        测试按文档/分块删除, 以及其他实例 (其他进程) 读取同一目录
+        """
+        writer = self.make_index()
+        vectors = self.rng.rand(10, DIM).astype(np.float32)
+        writer.insert_batch([
+            ("doc-a", make_chunks(5), vectors[:5], None),
+            ("doc-b", make_chunks(5), vectors[5:], None)
+        ])
+        writer.delete_documents(["doc-a"])
+        writer.delete_chunks("doc-b", [0, 1])
+
+        reader = self.make_index()
+        self.assertEqual(reader.count(), 3)
+        hits = reader.search(vectors[0], top_k=10)[0]
+        self.assertEqual(sorted((h.entity.get("doc_id"), h.entity.get("chunk_index")) for h in hits),
+                         [("doc-b", 2), ("doc-b", 3), ("doc-b", 4)])
+
+        stored = reader.get_chunk_vectors("doc-b", [1, 2])
+        self.assertEqual(list(stored), [2])
+        np.testing.assert_allclose(stored[2], vectors[7] / np.linalg.norm(vectors[7]), rtol=1e-5)
+
+        # 写入方之后追加的行对读取方可见
+        writer.insert_chunks("doc-c", make_chunks(1), vectors[:1])
+        self.assertEqual(reader.count(), 4)
+
+    def test_compaction(self):
+        """
+        测试删除超过一半后压缩到新的 generation, 数据保持可检索
+        """
+        original = local_vector.COMPACT_MIN_ROWS
+        local_vector.COMPACT_MIN_ROWS = 4
+        self.addCleanup(setattr, local_vector, "COMPACT_MIN_ROWS", original)
+
+        index = self.make_index()
+        vectors = self.rng.rand(6, DIM).astype(np.float32)
+        index.insert_chunks("doc-a", make_chunks(3), vectors[:3])
+        index.insert_chunks("doc-b", make_chunks(3), vectors[3:])
+        index.delete_documents(["doc-a"])
+
+        self.assertEqual(sorted(os.listdir(self.base_dir)), [".lock", "CURRENT", "gen-1"])
+        hits = index.search(vectors[4], top_k=1)[0]
+        self.assertEqual((hits[0].entity.get("doc_id"), hits[0].entity.get("chunk_index")), ("doc-b", 1))
+
+    def test_delete_during_concurrent_compaction(self):
+        """
+        测试其他进程在删除前压缩时, 删除按压缩后的行号解析, 不会删错行
+        """
+        original = local_vector.COMPACT_MIN_ROWS
+        local_vector.COMPACT_MIN_ROWS = 4
+        self.addCleanup(setattr, local_vector, "COMPACT_MIN_ROWS", original)
+
+        index = self.make_index()
+        other = self.make_index()
+        vectors = self.rng.rand(8, DIM).astype(np.float32)
+        index.insert_batch([
+            ("doc-a", make_chunks(3), vectors[:3], None),
+            ("doc-b", make_chunks(3), vectors[3:6], None),
+            ("doc-c", make_chunks(2), vectors[6:], None)
+        ])
+        index.search(vectors[0], top_k=1)
+
+        # 在取得文件锁之前, 另一个实例删除 doc-a / doc-b 并压缩, 行号整体前移
+        file_lock = index._file_lock
+
+        def compact_then_lock():
+            index._file_lock = file_lock
+            other.delete_documents(["doc-a", "doc-b"])
+            return file_lock()
+
+        index._file_lock = compact_then_lock
+        index.delete_chunks("doc-c", [0])
+
+        self.assertIn("gen-1", os.listdir(self.base_dir))
+        reader = self.make_index()
+        hits = reader.search(vectors[7], top_k=10)[0]
+        self.assertEqual([(h.entity.get("doc_id"), h.entity.get("chunk_index")) for h in hits], [("doc-c", 1)])
+
+    def test_filtered_search(self):
+        """
+        测试按文档属性预过滤, 返回满足条件的最相似分块而不是全局 top_k 中的子集
+        """
+        index = self.make_index()
+        vectors = self.rng.rand(30, DIM).astype(np.float32)
+        index.insert_batch([
+            ("doc-a", make_chunks(10), vectors[:10], {"tenant": "hr", "doc_type": "pdf", "created_at": 100}),
+            ("doc-b", make_chunks(10), vectors[10:20], {"tenant": "it", "doc_type": "pdf", "created_at": 200}),
+            ("doc-c", make_chunks(10), vectors[20:], None)
+        ])
+
+        hits = index.search(vectors[3], top_k=5, filters=parse_filters({"tenant": "it"}))[0]
+        self.assertEqual(len(hits), 5)
+        self.assertTrue(all(h.entity.get("doc_id") == "doc-b" for h in hits))
+
+        filters = parse_filters({"doc_type": "pdf", "created_at": {"lt": 200}})
+        self.assertEqual({h.entity.get("doc_id") for h in index.search(vectors[15], top_k=20, filters=filters)[0]}, {"doc-a"})
+        self.assertEqual(index.search(vectors[0], top_k=5, filters=parse_filters({"tenant": "unknown"})), [[]])
+
+    def test_quantized_search(self):
+        """
+        测试量化编码第一阶段 + float32 重新打分: 返回的得分为精确余弦相似度, 并跳过已删除和被过滤的分块
+        """
+        vectors = self.rng.normal(size=(300, DIM)).astype(np.float32)
+        for quantization in ("binary", "int8"):
+            base_dir = os.path.join(self.base_dir, quantization)
+            index = LocalVectorIndex(base_dir, DIM, quantization=quantization, rescore_factor=8)
+            index.insert_batch([
+                ("doc-a", make_chunks(150), vectors[:150], {"tenant": "hr"}),
+                ("doc-b", make_chunks(150), vectors[150:], {"tenant": "it"})
+            ])
+            index.delete_chunks("doc-a", [7])
+
+            for i in (3, 42, 160):
+                hits = index.search(vectors[i], top_k=5)[0]
+                exact = index.search(vectors[i], top_k=5, exact=True)[0]
+                self.assertEqual(hits[0].entity.get("chunk_index"), i % 150)
+                self.assertAlmostEqual(hits[0].distance, 1.0, places=5)
+                self.assertEqual(hits[0].id, exact[0].id)
+                query = vectors[i] / np.linalg.norm(vectors[i])
+                for hit in hits:
+                    stored = vectors[hit.id] / np.linalg.norm(vectors[hit.id])
+                    self.assertAlmostEqual(hit.distance, float(stored @ query), places=5)
+            self.assertNotIn(7, [h.id for h in index.search(vectors[7], top_k=5)[0]])
+            hits = index.search(vectors[3], top_k=5, filters=parse_filters({"tenant": "it"}))[0]
+            self.assertEqual(len(hits), 5)
+            self.assertTrue(all(h.entity.get("doc_id") == "doc-b" for h in hits))
+
+    def test_memory_bytes(self):
+        """
+        测试第一阶段内存: 未量化为 float32 向量大小, binary 每维 1 比特, int8 每维 1 字节
+        """
+        vectors = self.rng.normal(size=(64, DIM)).astype(np.float32)
+        for quantization in ("none", "binary", "int8"):
+            index = LocalVectorIndex(os.path.join(self.base_dir, quantization), DIM, quantization=quantization)
+            index.insert_chunks("doc-a", make_chunks(64), vectors)
+            self.assertLessEqual(index.memory_bytes(), vectors.nbytes)
+            if quantization == "none":
+                self.assertEqual(index.memory_bytes(), vectors.nbytes)
+            else:
+                self.assertGreaterEqual(index.memory_bytes(), 64 * DIM // (8 if quantization == "binary" else 1))
+
+    @unittest.skipUnless(HNSWLIB_AVAILABLE, "hnswlib not installed")
+    def test_hnsw_matches_exact(self):
+        """
+        测试 HNSW 检索在小数据集上与精确检索结果一致, 并跳过已删除的分块
+        """
+        index = self.make_index("hnsw")
+        vectors = self.rng.rand(200, DIM).astype(np.float32)
+        index.insert_chunks("doc-a", make_chunks(200), vectors)
+        index.delete_chunks("doc-a", [5])
+        index.warmup()
+
+        for i in (3, 5, 42):
+            approx = [h.entity.get("chunk_index") for h in index.search(vectors[i], top_k=5)[0]]
+            exact = [h.entity.get("chunk_index") for h in index.search(vectors[i], top_k=5, exact=True)[0]]
+            self.assertEqual(approx, exact)
+            self.assertNotIn(5, approx)
+
+        # 过滤后剩余行较多时在图上带条件检索
+        filters = parse_filters({"doc_id": "doc-a"})
+        self.assertEqual(len(index.search(vectors[0], top_k=5, filters=filters)[0]), 5)
+
+if __name__ == "__main__":
+    unittest.main()
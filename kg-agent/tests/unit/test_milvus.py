@@ -0,0 +1,333 @@
+"""
+Milvus 客户端测试 (使用模拟的集合, 不连接 Milvus 服务)
+"""
+import unittest
+import json
+import os
+import sys
+import numpy as np
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+from pymilvus import connections, MilvusException
+
+# 模块导入时会创建默认客户端并尝试连接, 测试中直接判定为连接失败
+with patch.object(connections, "connect", side_effect=MilvusException(message="offline")):
+    from app.infrastructure import milvus
+from app.infrastructure.milvus import MilvusClient, build_search_params, partition_name
+from app.config import get_settings
+from app.utils.search_filters import parse_filters
+
+FIELDS = ("id", "doc_id", "chunk_index", "content", "embedding", "doc_type", "tenant", "source", "created_at")
+
+class FakePartition:
+    def __init__(self, name, description="", num_entities=0):
+        self.name = name
+        self.description = description
+        self.num_entities = num_entities
+        self.released = False
+
+    def release(self):
+        self.released = True
+
+class FakeCollection:
+    def __init__(self, index_type="IVF_FLAT", nlist=16):
+        self.schema = SimpleNamespace(fields=[SimpleNamespace(name=name, auto_id=name == "id") for name in FIELDS])
+        # 服务端返回的构建参数为 JSON 字符串
+        params = {"index_type": index_type, "metric_type": "COSINE", "params": f'{{"nlist": {nlist}}}'}
+        self.indexes = [SimpleNamespace(field_name="embedding", params=params)]
+        self._partitions = {milvus.DEFAULT_PARTITION: FakePartition(milvus.DEFAULT_PARTITION)}
+        # 每次 load 的分区列表 (None 表示整个集合)
+        self.loads = []
+        self.searches = []
+        self.inserts = []
+
+    def load(self, partition_names=None):
+        self.loads.append(partition_names)
+
+    @property
+    def partitions(self):
+        return list(self._partitions.values())
+
+    def has_partition(self, name):
+        return name in self._partitions
+
+    def create_partition(self, name, description=""):
+        self._partitions[name] = FakePartition(name, description)
+
+    def partition(self, name):
+        return self._partitions[name]
+
+    def insert(self, data, partition_name=None):
+        start = sum(len(columns[0]) for _, columns in self.inserts)
+        self.inserts.append((partition_name, data))
+        self._partitions[partition_name or milvus.DEFAULT_PARTITION].num_entities += len(data[0])
+        return SimpleNamespace(primary_keys=list(range(start, start + len(data[0]))))
+
+    def search(self, **kwargs):
+        self.searches.append(kwargs)
+        return [["hit"]]
+
+class MilvusTestCase(unittest.TestCase):
+    def setUp(self):
+        """
+        设置测试环境: 集合句柄由模拟的 Collection 构造, 记录构造次数
+        """
+        self.collections = []
+
+        def make_collection(name, using=None):
+            self.collections.append(FakeCollection())
+            return self.collections[-1]
+
+        for patcher in (
+            patch.object(milvus, "Collection", side_effect=make_collection),
+            patch.object(milvus.utility, "has_collection", return_value=True),
+            patch.object(MilvusClient, "_connect", return_value=False),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(MilvusClient._instances.pop, "test_chunks", None)
+        self.client = MilvusClient("test_chunks")
+
+class TestMilvusClient(MilvusTestCase):
+    def test_handle_reused(self):
+        """
+        测试正常路径复用常驻句柄, 集合只获取和加载一次
+        """
+        self.client.search([0.1, 0.2], top_k=1)
+        self.client.search([0.1, 0.2], top_k=1)
+
+        self.assertEqual(len(self.collections), 1)
+        self.assertEqual(self.collections[0].loads, [None])
+        self.assertEqual(len(self.collections[0].searches), 2)
+
+    def test_error_invalidates_and_retries_once(self):
+        """
+        测试 Milvus 报错时丢弃句柄, 重新获取后只重试一次
+        """
+        calls = []
+
+        def flaky(collection):
+            calls.append(collection)
+            if len(calls) == 1:
+                raise MilvusException(message="collection released")
+            return "ok"
+
+        self.assertEqual(self.client._call(flaky, load=True), "ok")
+        self.assertEqual(len(self.collections), 2)
+        self.assertEqual(calls, self.collections)
+        self.assertEqual(self.collections[1].loads, [None])
+
+        def failing(collection):
+            calls.append(collection)
+            raise MilvusException(message="still failing")
+
+        calls.clear()
+        with self.assertRaises(MilvusException):
+            self.client._call(failing)
+        self.assertEqual(len(calls), 2)
+
+    def test_no_retry_for_insert(self):
+        """
+        测试 retry=False (非幂等操作) 时只丢弃句柄并抛出异常
+        """
+        calls = []
+
+        def failing(collection):
+            calls.append(collection)
+            raise MilvusException(message="insert failed")
+
+        with self.assertRaises(MilvusException):
+            self.client._call(failing, retry=False)
+        self.assertEqual(len(calls), 1)
+        self.assertIsNone(self.client._collection)
+
+    def test_parameter_error_keeps_handle(self):
+        """
+        测试参数错误直接抛出, 不丢弃句柄也不重试
+        """
+        calls = []
+
+        def invalid(collection):
+            calls.append(collection)
+            raise MilvusException(code=milvus.PARAMETER_INVALID_CODE, message="nprobe out of range")
+
+        with self.assertRaises(MilvusException):
+            self.client._call(invalid)
+        self.assertEqual(len(calls), 1)
+        self.assertIs(self.client._collection, self.collections[0])
+
+    def test_nprobe_clamped_to_nlist(self):
+        """
+        测试 IVF 检索的 nprobe 截断到集合索引的聚类数
+        """
+        self.client.search([0.1, 0.2], top_k=1, effort=256)
+        self.assertEqual(self.client.nlist, 16)
+        self.assertEqual(self.collections[0].searches[0]["param"]["params"], {"nprobe": 16})
+
+        self.assertEqual(build_search_params("IVF_FLAT", 10, 8, nlist=16)["params"], {"nprobe": 8})
+        with patch.object(milvus.settings, "MILVUS_IVF_NLIST", 32):
+            self.assertEqual(build_search_params("IVF_SQ8", 10, 64)["params"], {"nprobe": 32})
+        self.assertEqual(build_search_params("HNSW", 100, 64, nlist=16)["params"], {"ef": 100})
+
+def columns(tenants):
+    count = len(tenants)
+    return {
+        "doc_id": [f"doc-{i}" for i in range(count)],
+        "chunk_index": list(range(count)),
+        "content": [f"chunk {i}" for i in range(count)],
+        "embedding": np.zeros((count, 2), dtype=np.float32),
+        "doc_type": ["txt"] * count,
+        "tenant": list(tenants),
+        "source": [""] * count,
+        "created_at": [0] * count
+    }
+
+class TestMilvusPartitions(MilvusTestCase):
+    def setUp(self):
+        """
+        设置测试环境: 按 tenant 分区
+        """
+        super().setUp()
+        self.client.partition_field = "tenant"
+        self.collection = self.client._get_collection()
+
+    def test_partition_name(self):
+        """
+        测试分区名只含字母/数字/下划线, 同一取值得到相同的分区名
+        """
+        name = partition_name("tenant", "人力资源部")
+        self.assertRegex(name, r"^tenant_[0-9a-f]{16}$")
+        self.assertEqual(name, partition_name("tenant", "人力资源部"))
+        self.assertNotEqual(name, partition_name("tenant", "财务部"))
+        self.assertNotEqual(name, partition_name("doc_type", "人力资源部"))
+
+    def test_insert_grouped_by_partition(self):
+        """
+        测试按取值分组写入各自的分区 (不存在时创建并记录原值), 主键按原行顺序返回
+        """
+        keys = self.client._insert_rows(columns(["hr", "finance", "hr"]))
+
+        hr, finance = partition_name("tenant", "hr"), partition_name("tenant", "finance")
+        self.assertEqual([(name, data[0]) for name, data in self.collection.inserts],
+                         [(hr, ["doc-0", "doc-2"]), (finance, ["doc-1"])])
+        self.assertEqual(keys, [0, 2, 1])
+        self.assertEqual(json.loads(self.collection.partition(hr).description), {"field": "tenant", "value": "hr"})
+
+        # 单个取值的批次整体写入, 已知分区不再检查
+        with patch.object(self.collection, "has_partition", side_effect=AssertionError("cached")):
+            self.assertEqual(self.client._insert_rows(columns(["hr", "hr"])), [3, 4])
+
+    def test_partition_limit(self):
+        """
+        测试分区数达到上限后新取值写入 _default 分区, 检索该取值时检索 _default
+        """
+        with patch.object(milvus.settings, "MILVUS_MAX_PARTITIONS", 2):
+            self.client._insert_rows(columns(["hr", "finance", "legal"]))
+            self.client._insert_rows(columns(["legal"]))
+
+        hr = partition_name("tenant", "hr")
+        self.assertEqual([p.name for p in self.collection.partitions], [milvus.DEFAULT_PARTITION, hr])
+        self.assertEqual([name for name, _ in self.collection.inserts],
+                         [hr, milvus.DEFAULT_PARTITION, milvus.DEFAULT_PARTITION])
+        self.assertEqual(self.client._partitions_for(self.collection, parse_filters({"tenant": "legal"})),
+                         [milvus.DEFAULT_PARTITION])
+
+    def test_partitions_for(self):
+        """
+        测试过滤条件对应的分区: 没有分区字段时检索整个集合, 没有分区的取值和有数据的 _default 分区一并检索
+        """
+        self.client._insert_rows(columns(["hr"]))
+        hr = partition_name("tenant", "hr")
+
+        self.assertIsNone(self.client._partitions_for(self.collection, None))
+        self.assertIsNone(self.client._partitions_for(self.collection, parse_filters({"doc_type": "pdf"})))
+        self.assertEqual(self.client._partitions_for(self.collection, parse_filters({"tenant": "hr"})), [hr])
+        self.assertEqual(self.client._partitions_for(self.collection, parse_filters({"tenant": ["hr", "new"]})),
+                         [hr, milvus.DEFAULT_PARTITION])
+
+        # 分区前写入的数据留在 _default 分区
+        self.client.invalidate()
+        collection = self.client._get_collection()
+        collection.partition(milvus.DEFAULT_PARTITION).num_entities = 10
+        collection.create_partition(hr)
+        self.assertEqual(self.client._partitions_for(collection, parse_filters({"tenant": "hr"})),
+                         [hr, milvus.DEFAULT_PARTITION])
+
+    def test_search_loads_partitions_on_demand(self):
+        """
+        测试带分区字段过滤的检索只加载用到的分区, 且只加载一次
+        """
+        self.client._insert_rows(columns(["hr", "finance"]))
+        hr = partition_name("tenant", "hr")
+
+        self.client.search([0.1, 0.2], top_k=1, filters=parse_filters({"tenant": "hr"}))
+        self.client.search([0.1, 0.2], top_k=1, filters=parse_filters({"tenant": "hr"}))
+        self.assertEqual(self.collection.loads, [[hr]])
+        self.assertEqual([s["partition_names"] for s in self.collection.searches], [[hr], [hr]])
+
+        # 不带分区字段时加载整个集合
+        self.client.search([0.1, 0.2], top_k=1)
+        self.assertEqual(self.collection.loads, [[hr], None])
+
+class TestPartitionAdminAPI(MilvusTestCase):
+    def setUp(self):
+        """
+        设置测试环境: 管理接口使用按 tenant 分区的模拟集合
+        """
+        super().setUp()
+        from flask import Flask
+        from app.api.admin import admin_bp
+        from app.error_handlers import register_error_handlers
+
+        self.client.partition_field = "tenant"
+        self.client._insert_rows(columns(["hr", "finance"]))
+        self.collection = self.client._get_collection()
+        vector_store_module = sys.modules["app.infrastructure.vector_store"]
+        for patcher in (
+            patch.object(vector_store_module, "vector_store", self.client),
+            patch.object(get_settings(), "VECTOR_STORE", "milvus"),
+            patch.object(get_settings(), "MILVUS_PARTITION_FIELD", "tenant"),
+            patch.object(milvus.utility, "load_state", return_value=SimpleNamespace(name="Loaded")),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        app = Flask(__name__)
+        app.register_blueprint(admin_bp)
+        register_error_handlers(app)
+        self.http = app.test_client()
+
+    def test_list_partitions(self):
+        """
+        测试列出分区及其对应的取值和行数
+        """
+        response = self.http.get("/api/admin/vector/partitions")
+        self.assertEqual(response.status_code, 200)
+        partitions = {p["name"]: p for p in response.get_json()["partitions"]}
+        hr = partitions[partition_name("tenant", "hr")]
+        self.assertEqual((hr["field"], hr["value"], hr["rows"], hr["load_state"]), ("tenant", "hr", 1, "Loaded"))
+        self.assertIsNone(partitions[milvus.DEFAULT_PARTITION]["value"])
+
+    def test_load_and_release(self):
+        """
+        测试按取值加载/释放分区, 不存在的取值忽略; 参数错误与未启用分区时返回 400
+        """
+        hr = partition_name("tenant", "hr")
+        response = self.http.post("/api/admin/vector/partitions/load", json={"values": ["hr", "missing"]})
+        self.assertEqual(response.get_json(), {"loaded": [hr]})
+        self.assertEqual(self.collection.loads, [[hr]])
+
+        response = self.http.post("/api/admin/vector/partitions/release", json={"values": ["hr"]})
+        self.assertEqual(response.get_json(), {"released": [hr]})
+        self.assertTrue(self.collection.partition(hr).released)
+        self.assertNotIn(hr, self.client._loaded_partitions)
+
+        self.assertEqual(self.http.post("/api/admin/vector/partitions/load", json={"values": []}).status_code, 400)
+        with patch.object(get_settings(), "MILVUS_PARTITION_FIELD", ""):
+            self.assertEqual(self.http.get("/api/admin/vector/partitions").status_code, 400)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+解析结果缓存测试
+"""
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+from app.utils.parse_cache import ParseCache
+
+PAGES = [(1, "第一页"), (2, "second page"), (None, "")]
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        """
+        设置测试环境
+        """
+        self.base_dir = tempfile.mkdtemp()
+        self.cache = ParseCache(self.base_dir, max_bytes=1024 * 1024)
+
+    def tearDown(self):
+        """
+        清理测试环境
+        """
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def test_miss_then_hit(self):
+        """
+        测试未命中时边产出边写入, 之后命中
+        """
+        key = ParseCache.make_key("ab" * 32, "pdf", 1)
+        self.assertIsNone(self.cache.get(key))
+
+        self.assertEqual(list(self.cache.write_through(key, iter(PAGES))), PAGES)
+        self.assertEqual(list(self.cache.get(key)), PAGES)
+
+        # 提取器版本变化后不再命中
+        self.assertIsNone(self.cache.get(ParseCache.make_key("ab" * 32, "pdf", 2)))
+
+    def test_failed_parse_not_cached(self):
+        """
+        测试解析中途失败时不留下缓存条目
+        """
+        def failing():
+            yield 1, "partial"
+            raise ValueError("parse error")
+
+        key = ParseCache.make_key("cd" * 32, "pdf", 1)
+        with self.assertRaises(ValueError):
+            list(self.cache.write_through(key, failing()))
+
+        self.assertIsNone(self.cache.get(key))
+        self.assertEqual([p for p in os.listdir(os.path.join(self.base_dir, key[:2]))], [])
+
+    def test_lru_eviction(self):
+        """
+        测试超过大小上限时淘汰最久未访问的条目
+        """
+        keys = [ParseCache.make_key(f"{i:02d}" * 32, "txt", 1) for i in range(3)]
+        for i, key in enumerate(keys):
+            list(self.cache.write_through(key, iter([(None, os.urandom(2000).hex())])))
+            path = self.cache._path(key)
+            os.utime(path, (1000 + i, 1000 + i))
+
+        # 访问最早的条目, 使其成为最近使用
+        list(self.cache.get(keys[0]))
+        sizes = [self.cache._path(key).stat().st_size for key in keys]
+        self.cache.max_bytes = sizes[0] + sizes[2]
+
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNotNone(self.cache.get(keys[2]))
+
+    def test_write_scans_incrementally(self):
+        """
+        测试写入只累加估计大小, 超过上限时才遍历目录, 并淘汰到低水位
+        """
+        keys = [ParseCache.make_key(f"{i:02d}" * 32, "txt", 1) for i in range(7)]
+
+        def write(key):
+            list(self.cache.write_through(key, iter([(None, os.urandom(2000).hex())])))
+
+        with patch.object(self.cache, "evict", wraps=self.cache.evict) as evict:
+            for key in keys[:5]:
+                write(key)
+            # 只有首次写入时遍历统计
+            self.assertEqual(evict.call_count, 1)
+
+            # 第 6 条使估计大小超过上限, 淘汰到低水位 (剩 4 条); 第 7 条写入后仍低于上限, 不再遍历
+            entry_size = self.cache._path(keys[0]).stat().st_size
+            self.cache.max_bytes = int(entry_size * 5.5)
+            write(keys[5])
+            self.assertEqual(evict.call_count, 2)
+            write(keys[6])
+            self.assertEqual(evict.call_count, 2)
+
+        remaining = [key for key in keys if self.cache._path(key).exists()]
+        self.assertEqual(len(remaining), 5)
+        self.assertIn(keys[5], remaining)
+        self.assertIn(keys[6], remaining)
+
+    def test_disabled(self):
+        """
+        测试上限为 0 时缓存禁用
+        """
+        cache = ParseCache(self.base_dir, max_bytes=0)
+        key = ParseCache.make_key("ef" * 32, "txt", 1)
+
+        self.assertEqual(list(cache.write_through(key, iter(PAGES))), PAGES)
+        self.assertIsNone(cache.get(key))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+向量量化测试
+"""
+import unittest
+import os
+import sys
+import numpy as np
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+from app.utils import quantization
+from app.utils.quantization import QuantizedVectors, binary_codes, hamming_distances, int8_codes, int8_scores
+
+class TestQuantization(unittest.TestCase):
+    def setUp(self):
+        """
+        设置测试环境
+        """
+        self.rng = np.random.RandomState(0)
+
+    def test_binary_hamming(self):
+        """
+        测试符号位编码的 Hamming 距离等于符号不同的维数, 查表实现与 bitwise_count 一致
+        """
+        vectors = self.rng.normal(size=(50, 20)).astype(np.float32)
+        codes = binary_codes(vectors)
+        self.assertEqual(codes.shape, (50, 3))
+
+        expected = ((vectors > 0) != (vectors[0] > 0)).sum(axis=1)
+        self.assertEqual(hamming_distances(codes, codes[0]).tolist(), expected.tolist())
+        table = quantization._POPCOUNT_TABLE[np.bitwise_xor(codes, codes[0])].sum(axis=1)
+        self.assertEqual(table.tolist(), expected.tolist())
+
+    def test_int8_scores(self):
+        """
+        测试 int8 编码的近似内积误差很小
+        """
+        vectors = self.rng.normal(size=(100, 64)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        codes, scales = int8_codes(vectors)
+        self.assertEqual(codes.dtype, np.int8)
+        self.assertLessEqual(np.abs(codes).max(), 127)
+
+        query = vectors[5]
+        self.assertLess(np.abs(int8_scores(codes, scales, query) - vectors @ query).max(), 0.02)
+        self.assertTrue(np.all(int8_codes(np.zeros((1, 4)))[0] == 0))
+
+    def test_quantized_vectors(self):
+        """
+        测试追加时容量增长, 分块计算与按行子集计算的得分一致
+        """
+        vectors = self.rng.normal(size=(3000, 16)).astype(np.float32)
+        for kind in ("binary", "int8"):
+            quantized = QuantizedVectors(kind, 16)
+            for start in range(0, 3000, 700):
+                quantized.append(vectors[start:start + 700])
+            self.assertEqual(len(quantized), 3000)
+            self.assertEqual(quantized.nbytes, 3000 * (2 if kind == "binary" else 20))
+
+            with patch.object(quantization, "SCORE_BLOCK_BYTES", 256):
+                scores = quantized.scores(vectors[10])
+            self.assertEqual(int(np.argmax(scores)), 10)
+            rows = np.array([10, 2999, 5])
+            self.assertTrue(np.allclose(quantized.scores(vectors[10], rows), scores[rows]))
+
+        with self.assertRaises(ValueError):
+            QuantizedVectors("pq", 16)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+"""
+摄取任务调度测试
+"""
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+from app.models import DocumentType
+from app.tasks import routing
+
+MB = 1024 * 1024
+
+class TestRouting(unittest.TestCase):
+    def setUp(self):
+        """
+        设置测试环境
+        """
+        patcher = patch.object(routing.settings, "INGEST_LARGE_COST", 50 * MB)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_classify(self):
+        """
+        测试按来源和预估代价分级
+        """
+        self.assertEqual(routing.classify(1 * MB, DocumentType.PDF), routing.INTERACTIVE)
+        self.assertEqual(routing.classify(1 * MB, DocumentType.PDF, bulk=True), routing.BULK)
+        self.assertEqual(routing.classify(500 * MB, DocumentType.PDF), routing.LARGE)
+        self.assertEqual(routing.classify(500 * MB, "pdf", bulk=True), routing.LARGE)
+        # 纯文本解析代价低, 同样大小不视为大文档
+        self.assertEqual(routing.classify(100 * MB, DocumentType.TXT), routing.INTERACTIVE)
+
+    def test_route(self):
+        """
+        测试交互式任务优先级高于批量任务, 且队列互相隔离
+        """
+        interactive = routing.route(routing.INTERACTIVE, "extract")
+        bulk = routing.route(routing.BULK, "extract")
+
+        self.assertNotEqual(interactive["queue"], bulk["queue"])
+        self.assertLess(interactive["priority"], bulk["priority"])
+        self.assertEqual(len(set(routing.all_queues())), len(routing.all_queues()))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+检索过滤条件测试
+"""
+import unittest
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+from app.exceptions import ValidationError
+from app.utils.search_filters import (
+    FieldFilter,
+    document_attributes,
+    es_filter_clauses,
+    milvus_expr,
+    parse_filters
+)
+
+class TestSearchFilters(unittest.TestCase):
+    def test_parse_and_translate(self):
+        """
+        测试等值/集合/时间范围条件转换为 Milvus 表达式和 ES filter 子句
+        """
+        conditions = parse_filters({
+            "tenant": "财务部",
+            "doc_type": ["pdf", "docx"],
+            "created_at": {"gte": "2024-01-01T00:00:00Z", "lt": 1719792000}
+        })
+
+        self.assertEqual(conditions, [
+            FieldFilter("tenant", values=["财务部"]),
+            FieldFilter("doc_type", values=["pdf", "docx"]),
+            FieldFilter("created_at", gte=1704067200, lte=1719791999)
+        ])
+        self.assertEqual(
+            milvus_expr(conditions),
+            'tenant in ["财务部"] and doc_type in ["pdf", "docx"] and created_at >= 1704067200 and created_at <= 1719791999'
+        )
+        self.assertEqual(es_filter_clauses(conditions), [
+            {"terms": {"tenant": ["财务部"]}},
+            {"terms": {"doc_type": ["pdf", "docx"]}},
+            {"range": {"created_at": {"gte": 1704067200, "lte": 1719791999, "format": "epoch_second"}}}
+        ])
+        self.assertEqual(milvus_expr(parse_filters(None)), "")
+
+    def test_invalid_filters(self):
+        """
+        测试不支持的字段和格式错误的取值
+        """
+        for filters in ({"author": "x"}, {"tenant": []}, {"created_at": "2024-01-01"}, {"created_at": {"after": 1}},
+                        {"created_at": {"gte": "yesterday"}}):
+            with self.assertRaises(ValidationError):
+                parse_filters(filters)
+
+    def test_document_attributes(self):
+        """
+        测试从状态记录中取出文档属性, 缺失的字段取默认值
+        """
+        attributes = document_attributes({"doc_type": "pdf", "tenant": "hr", "created_at": "2024-01-01T00:00:00"})
+        self.assertEqual(attributes, {"doc_type": "pdf", "tenant": "hr", "source": "", "created_at": 1704067200})
+        self.assertTrue(FieldFilter("created_at", gte=1704067200).matches(attributes["created_at"]))
+        self.assertGreater(document_attributes(None)["created_at"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
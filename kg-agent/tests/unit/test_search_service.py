@@ -0,0 +1,86 @@
+"""
+检索服务测试
+"""
+import unittest
+import importlib
+import os
+import sys
+import numpy as np
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+from flask import Flask
+from app.exceptions import ValidationError
+from app.error_handlers import register_error_handlers
+from app.api.search import search_bp
+from app.infrastructure.hits import SearchHit
+from app.models import SearchQuery, SearchMode
+
+search_module = importlib.import_module("app.services.search_service")
+
+def hit(doc_id, score):
+    return SearchHit(doc_id, score, {"doc_id": doc_id, "chunk_index": 0, "content": f"content of {doc_id}"})
+
+class TestSearchService(unittest.TestCase):
+    def setUp(self):
+        """
+        设置测试环境: 向量检索返回固定结果, 不连接外部服务
+        """
+        self.vector_store = MagicMock()
+        self.vector_store.search.return_value = [[hit("doc-a", 0.9), hit("doc-b", 0.3)]]
+        embedding = MagicMock()
+        embedding.encode_query.return_value = np.zeros(4, dtype=np.float32)
+        for patcher in (
+            patch.object(search_module, "vector_store", self.vector_store),
+            patch.object(search_module, "embedding_service", embedding),
+            # 只检查结果条目, 不校验结果模型中的文档元数据
+            patch.object(search_module, "SearchResultItem", SimpleNamespace),
+            patch.object(search_module, "SearchResponse", SimpleNamespace),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.service = search_module.SearchService()
+
+    def test_threshold_opt_in(self):
+        """
+        测试未指定阈值时不过滤向量结果, 指定时丢弃低于阈值的结果
+        """
+        response = self.service.search(SearchQuery(query="q", mode=SearchMode.VECTOR))
+        self.assertEqual([item.id for item in response.items], ["doc-a", "doc-b"])
+
+        response = self.service.search(SearchQuery(query="q", mode=SearchMode.VECTOR, threshold=0.5))
+        self.assertEqual([item.id for item in response.items], ["doc-a"])
+
+    def test_unsupported_filter_reaches_caller(self):
+        """
+        测试集合不支持的过滤字段作为参数错误返回给调用方, 而不是当作无结果
+        """
+        self.vector_store.search.side_effect = ValidationError(message="unsupported", details={"fields": ["tenant"]})
+        with self.assertRaises(ValidationError):
+            self.service.search(SearchQuery(query="q", mode=SearchMode.VECTOR, filters={"tenant": "hr"}))
+
+        # 其他后端错误仍按无结果处理
+        self.vector_store.search.side_effect = RuntimeError("milvus unavailable")
+        response = self.service.search(SearchQuery(query="q", mode=SearchMode.VECTOR))
+        self.assertEqual(response.total, 0)
+
+    def test_validation_error_response(self):
+        """
+        测试检索接口把参数错误返回为 400, 而不是 500
+        """
+        app = Flask(__name__)
+        app.register_blueprint(search_bp)
+        register_error_handlers(app)
+
+        error = ValidationError(message="向量集合不支持按这些字段过滤", details={"fields": ["tenant"]})
+        with patch.object(search_module.search_service, "search", side_effect=error):
+            response = app.test_client().post("/api/search/query", json={"query": "q", "filters": {"tenant": "hr"}})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()["error"]["details"], {"fields": ["tenant"]})
+
+if __name__ == "__main__":
+    unittest.main()
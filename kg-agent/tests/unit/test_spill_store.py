@@ -0,0 +1,83 @@
+"""
+流水线中间结果落盘存储测试
+"""
+import unittest
+import tempfile
+import shutil
+import os
+import sys
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+from app.utils.spill_store import SpillStore
+
+class TestSpillStore(unittest.TestCase):
+    def setUp(self):
+        """
+        设置测试环境
+        """
+        self.base_dir = tempfile.mkdtemp()
+        self.store = SpillStore(self.base_dir)
+
+    def tearDown(self):
+        """
+        清理测试环境
+        """
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def test_write_and_read(self):
+        """
+        测试写入后只返回小体积引用, 且可完整读回
+        """
+        records = [{"content": "x" * 10000, "index": i} for i in range(50)]
+        ref = self.store.write("doc_1", "chunks", records)
+
+        self.assertEqual(ref["count"], 50)
+        self.assertEqual(len(ref["sha256"]), 64)
+        self.assertNotIn("content", ref)
+        self.assertEqual(self.store.read(ref), records)
+
+    def test_checksum_mismatch(self):
+        """
+        测试落盘内容被篡改时读取失败
+        """
+        ref = self.store.write("doc_1", "text", [{"text": "hello"}])
+        with open(ref["path"], "ab") as f:
+            f.write(b"{}\n")
+
+        with self.assertRaises(ValueError):
+            self.store.read(ref)
+
+    def test_reference_outside_base_dir(self):
+        """
+        测试指向存储根目录之外 (包括同名前缀的兄弟目录) 的引用被拒绝
+        """
+        ref = self.store.write("doc_1", "text", [{"text": "hello"}])
+        sibling = self.base_dir.rstrip(os.sep) + "-other"
+        os.makedirs(sibling)
+        self.addCleanup(shutil.rmtree, sibling, True)
+        forged = os.path.join(sibling, "text.jsonl")
+        shutil.copy(ref["path"], forged)
+
+        with self.assertRaises(ValueError):
+            self.store.read(dict(ref, path=forged))
+
+    def test_delete_and_gc(self):
+        """
+        测试按文档删除以及过期清理
+        """
+        ref = self.store.write("doc_1", "text", [{"text": "a"}])
+        self.store.write("doc_2", "text", [{"text": "b"}])
+
+        self.assertTrue(self.store.delete("doc_1"))
+        self.assertFalse(os.path.exists(ref["path"]))
+
+        # doc_2 尚未过期
+        self.assertEqual(self.store.gc(max_age=3600), 0)
+        time.sleep(0.01)
+        self.assertEqual(self.store.gc(max_age=0), 1)
+
+if __name__ == "__main__":
+    unittest.main()
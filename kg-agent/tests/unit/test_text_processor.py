@@ -0,0 +1,213 @@
+"""
+流式文本提取与增量分块测试
+"""
+import unittest
+import tempfile
+import os
+import sys
+import zipfile
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+from app.models import DocumentType
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from app.utils.text_processor import TextProcessor, prefetch, shutdown_pdf_pool
+
+def write_pdf(path, page_count):
+    """
+    生成每页一行文本 "Page N" 的最小 PDF
+    """
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for n in range(1, page_count + 1):
+        stream = f"BT /F1 12 Tf 72 720 Td (Page {n}) Tj ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {page_count} >>".encode()
+
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    data += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(data)
+
+def write_docx(path, body):
+    """
+    生成只含 word/document.xml 的最小 DOCX, body 为 <w:body> 内的 XML
+    """
+    xml = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f'<w:body>{body}</w:body></w:document>'
+    )
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("word/document.xml", xml)
+
+def paragraph(text, page_break=None):
+    marker = {"manual": '<w:br w:type="page"/>', "rendered": "<w:lastRenderedPageBreak/>"}.get(page_break, "")
+    return f"<w:p><w:r>{marker if page_break == 'rendered' else ''}<w:t>{text}</w:t>" \
+           f"{marker if page_break == 'manual' else ''}</w:r></w:p>"
+
+class BreakingExecutor:
+    """
+    在同一进程内执行前 ok_ranges 个区间, 之后的区间以 BrokenProcessPool 失败的进程池替身
+    """
+    def __init__(self, ok_ranges):
+        self.ok_ranges = ok_ranges
+        self.submitted = 0
+
+    def submit(self, fn, *args):
+        future = Future()
+        if self.submitted < self.ok_ranges:
+            future.set_result(fn(*args))
+        else:
+            future.set_exception(BrokenProcessPool("worker died"))
+        self.submitted += 1
+        return future
+
+class TestTextProcessor(unittest.TestCase):
+    def setUp(self):
+        """
+        设置测试环境
+        """
+        self.processor = TextProcessor()
+        self.test_file = tempfile.NamedTemporaryFile(suffix=".txt", delete=False, mode="w", encoding="utf-8")
+        self.test_file.write("第一段内容\n\n第二段内容\n")
+        self.test_file.close()
+
+    def tearDown(self):
+        """
+        清理测试环境
+        """
+        if os.path.exists(self.test_file.name):
+            os.remove(self.test_file.name)
+
+    def test_iter_pages_text(self):
+        """
+        测试纯文本按段流式提取
+        """
+        pages = list(self.processor.iter_pages(self.test_file.name, DocumentType.TXT))
+
+        self.assertEqual(pages, [(None, "第一段内容\n\n第二段内容")])
+        self.assertEqual(self.processor.load_document(self.test_file.name, DocumentType.TXT), "第一段内容\n\n第二段内容")
+
+    def test_iter_pages_missing_file(self):
+        """
+        测试文件不存在时立即报错
+        """
+        with self.assertRaises(FileNotFoundError):
+            self.processor.iter_pages("/nonexistent/file.pdf", DocumentType.PDF)
+
+    def test_parallel_pdf_matches_serial(self):
+        """
+        测试进程池并行解析 PDF 与串行结果一致且页序不变
+        """
+        pdf_path = self.test_file.name[:-4] + ".pdf"
+        write_pdf(pdf_path, 12)
+        self.addCleanup(shutdown_pdf_pool)
+        try:
+            with patch("app.utils.text_processor.settings") as settings:
+                settings.PDF_EXTRACT_WORKERS = 1
+                settings.PDF_PARALLEL_MIN_PAGES = 1
+                serial = list(self.processor.iter_pages(pdf_path, DocumentType.PDF))
+
+                settings.PDF_EXTRACT_WORKERS = 2
+                with patch("app.utils.text_processor.os.cpu_count", return_value=2):
+                    parallel = list(self.processor.iter_pages(pdf_path, DocumentType.PDF))
+                    # 进程池在文档之间复用
+                    again = list(self.processor.iter_pages(pdf_path, DocumentType.PDF))
+        finally:
+            os.remove(pdf_path)
+
+        self.assertEqual([page for page, _ in serial], list(range(1, 13)))
+        self.assertIn("Page 12", serial[-1][1])
+        self.assertEqual(parallel, serial)
+        self.assertEqual(again, serial)
+
+    def test_parallel_pdf_pool_failure_falls_back(self):
+        """
+        测试进程池不可用或中途损坏时退回串行解析, 已产出的页面不重复
+        """
+        pdf_path = self.test_file.name[:-4] + ".pdf"
+        write_pdf(pdf_path, 12)
+        self.addCleanup(os.remove, pdf_path)
+        with patch("app.utils.text_processor.settings") as settings, \
+             patch("app.utils.text_processor.os.cpu_count", return_value=2):
+            settings.PDF_EXTRACT_WORKERS = 1
+            settings.PDF_PARALLEL_MIN_PAGES = 1
+            serial = list(self.processor.iter_pages(pdf_path, DocumentType.PDF))
+
+            settings.PDF_EXTRACT_WORKERS = 2
+            for ok_ranges in (0, 2):
+                with patch("app.utils.text_processor.get_pdf_pool", return_value=BreakingExecutor(ok_ranges)):
+                    self.assertEqual(list(self.processor.iter_pages(pdf_path, DocumentType.PDF)), serial)
+
+    def test_iter_pages_docx(self):
+        """
+        测试 DOCX 逐段流式解析: 按分页符切分页面, 手动分页后紧跟的排版分页记录不重复计页, 表格内段落按文档顺序产出
+        """
+        path = self.test_file.name + ".docx"
+        self.addCleanup(os.remove, path)
+        write_docx(path, "".join([
+            paragraph("第一页"),
+            "<w:tbl><w:tr><w:tc>" + paragraph("表格单元") + "</w:tc></w:tr></w:tbl>",
+            paragraph("第一页末尾", page_break="manual"),
+            paragraph("第二页", page_break="rendered"),
+            paragraph("第三页", page_break="rendered"),
+        ]))
+
+        pages = list(self.processor.iter_pages(path, DocumentType.DOCX))
+
+        self.assertEqual(pages, [(1, "第一页\n\n表格单元\n\n第一页末尾"), (2, "第二页"), (3, "第三页")])
+
+    def test_iter_chunks_page_numbers(self):
+        """
+        测试增量分块带页码且索引连续
+        """
+        page_one = "A" * 400 + "\n\n" + "B" * 400
+        page_two = "C" * 400
+        chunks = list(self.processor.iter_chunks([(1, page_one), (2, ""), (3, page_two)]))
+
+        self.assertEqual([c["index"] for c in chunks], list(range(len(chunks))))
+        self.assertEqual([c["page_number"] for c in chunks], [1, 1, 3])
+        self.assertEqual(chunks[-1]["content"], page_two)
+
+    def test_iter_chunks_merges_short_tail(self):
+        """
+        测试页末碎片并入下一页
+        """
+        chunks = list(self.processor.iter_chunks([(1, "短句"), (2, "下一页")]))
+
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(chunks[0]["page_number"], 1)
+        self.assertIn("短句", chunks[0]["content"])
+        self.assertIn("下一页", chunks[0]["content"])
+
+    def test_prefetch(self):
+        """
+        测试预取保持顺序并传递异常
+        """
+        self.assertEqual(list(prefetch(iter(range(100)), depth=4)), list(range(100)))
+
+        def failing():
+            yield 1
+            raise ValueError("parse error")
+
+        with self.assertRaises(ValueError):
+            list(prefetch(failing()))
+
+if __name__ == "__main__":
+    unittest.main()
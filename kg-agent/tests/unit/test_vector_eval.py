@@ -0,0 +1,38 @@
+"""
+向量检索召回率评估测试
+"""
+import unittest
+import os
+import sys
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+from app.utils.vector_eval import exact_top_k, recall_at_k
+
+class TestVectorEval(unittest.TestCase):
+    def test_exact_top_k_blocked(self):
+        """
+        测试分块计算的精确检索与一次性计算的结果一致
+        """
+        rng = np.random.RandomState(0)
+        corpus = rng.normal(size=(50, 8))
+        queries = rng.normal(size=(5, 8))
+
+        unit = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+        expected = np.argsort(-(queries @ unit.T), axis=1)[:, :4]
+        np.testing.assert_array_equal(exact_top_k(corpus, queries, 4, block_rows=7), expected)
+        self.assertEqual(exact_top_k(corpus[:3], queries, 10).shape, (5, 3))
+
+    def test_recall_at_k(self):
+        """
+        测试 recall@k 只统计前 k 个结果
+        """
+        truth = [[1, 2, 3], [4, 5, 6]]
+        self.assertEqual(recall_at_k(truth, truth, 3), 1.0)
+        self.assertAlmostEqual(recall_at_k([[1, 9, 2], [6, 0, 0]], truth, 3), (2 / 3 + 1 / 3) / 2)
+        self.assertEqual(recall_at_k([[2, 1, 9]], [[1, 2, 3]], 2), 1.0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+"""
+向量写入缓冲测试
+"""
+import unittest
+import os
+import sys
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+from app.infrastructure.write_buffer import WriteBuffer
+
+def rows(doc_id, count):
+    return {
+        "doc_id": [doc_id] * count,
+        "chunk_index": list(range(count)),
+        "embedding": np.zeros((count, 4), dtype=np.float32)
+    }
+
+class TestWriteBuffer(unittest.TestCase):
+    def setUp(self):
+        """
+        设置测试环境
+        """
+        self.inserted = []
+        self.flushes = 0
+
+    def insert(self, columns):
+        start = sum(len(c["doc_id"]) for c in self.inserted)
+        self.inserted.append(columns)
+        return list(range(start, start + len(columns["doc_id"])))
+
+    def flush(self):
+        self.flushes += 1
+
+    def make_buffer(self, **kwargs):
+        buffer = WriteBuffer(self.insert, **kwargs)
+        self.addCleanup(buffer.close)
+        return buffer
+
+    def test_batches_across_documents(self):
+        """
+        测试多个文档的行合并为一次写入, 各 Future 得到自己行的主键
+        """
+        buffer = self.make_buffer(max_rows=100, max_wait=60)
+        first = buffer.write(rows("doc-a", 3))
+        second = buffer.write(rows("doc-b", 2))
+        self.assertFalse(first.done())
+
+        buffer.drain()
+        self.assertEqual(len(self.inserted), 1)
+        self.assertEqual(self.inserted[0]["doc_id"], ["doc-a"] * 3 + ["doc-b"] * 2)
+        self.assertEqual(self.inserted[0]["embedding"].shape, (5, 4))
+        self.assertEqual(first.result(), [0, 1, 2])
+        self.assertEqual(second.result(), [3, 4])
+
+    def test_size_and_time_thresholds(self):
+        """
+        测试行数达到阈值时立即写入并按 batch_rows 分片, 未达到时由后台线程超时写入
+        """
+        buffer = self.make_buffer(max_rows=5, max_wait=60, batch_rows=4)
+        self.assertEqual(buffer.write(rows("doc-a", 6)).result(timeout=1), list(range(6)))
+        self.assertEqual([len(c["doc_id"]) for c in self.inserted], [4, 2])
+
+        buffer = self.make_buffer(max_rows=100, max_wait=0.05)
+        self.assertEqual(len(buffer.write(rows("doc-b", 1)).result(timeout=5)), 1)
+
+    def test_cancel_and_failure(self):
+        """
+        测试撤回的行不再写入, 写入失败时 Future 得到异常
+        """
+        buffer = self.make_buffer(max_rows=100, max_wait=60)
+        cancelled = buffer.write(rows("doc-a", 2))
+        kept = buffer.write(rows("doc-b", 1))
+        self.assertTrue(cancelled.cancel())
+        buffer.drain()
+        self.assertEqual(self.inserted[0]["doc_id"], ["doc-b"])
+        self.assertEqual(kept.result(), [0])
+
+        def fail(columns):
+            raise RuntimeError("milvus unavailable")
+
+        buffer = WriteBuffer(fail, max_rows=100, max_wait=60)
+        self.addCleanup(buffer.close)
+        failed = buffer.write(rows("doc-c", 1))
+        buffer.drain()
+        with self.assertRaises(RuntimeError):
+            failed.result()
+
+    def test_failure_isolated_to_entry(self):
+        """
+        测试整批写入失败后逐组重试, 只有出问题的一组失败, 已写入的行不重复写入
+        """
+        def insert(columns):
+            if "doc-bad" in columns["doc_id"]:
+                raise ValueError("content exceeds max length")
+            return self.insert(columns)
+
+        buffer = WriteBuffer(insert, max_rows=100, max_wait=60, batch_rows=2)
+        self.addCleanup(buffer.close)
+        first = buffer.write(rows("doc-a", 3))
+        bad = buffer.write(rows("doc-bad", 1))
+        last = buffer.write(rows("doc-c", 2))
+        buffer.drain()
+
+        # 第一个分片 (doc-a 的前两行) 已写入, 重试时 doc-a 只写入剩余的一行
+        self.assertEqual(first.result(), [0, 1, 2])
+        with self.assertRaises(ValueError):
+            bad.result()
+        self.assertEqual(last.result(), [3, 4])
+        written = [doc_id for columns in self.inserted for doc_id in columns["doc_id"]]
+        self.assertEqual(written, ["doc-a"] * 3 + ["doc-c"] * 2)
+        self.assertEqual(buffer.stats()["rows"], 5)
+
+    def test_periodic_flush(self):
+        """
+        测试按间隔显式 flush, 间隔为 0 时不 flush
+        """
+        buffer = self.make_buffer(max_rows=100, max_wait=60, flush_fn=self.flush, flush_interval=0.0)
+        buffer.write(rows("doc-a", 1))
+        buffer.drain()
+        self.assertEqual(self.flushes, 0)
+
+        buffer = self.make_buffer(max_rows=100, max_wait=60, flush_fn=self.flush, flush_interval=1e-6)
+        buffer.write(rows("doc-b", 1))
+        buffer.drain()
+        self.assertEqual(self.flushes, 1)
+        self.assertEqual(buffer.stats()["rows"], 1)
+
+if __name__ == "__main__":
+    unittest.main()